@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+UserModel = get_user_model()
+
+
+class EmailBackend(ModelBackend):
+    """
+    ``ModelBackend`` for the email logins.
+
+    ``login_page`` looks the user up itself (it tells an unknown email apart
+    from a wrong password) and passes the row as ``user``, so a login costs
+    one query. ``check_password`` rehashes the stored password with the first
+    of ``PASSWORD_HASHERS`` when it was made with another hasher or fewer
+    iterations.
+    """
+
+    def authenticate(self, request, email=None, password=None, user=None, **kwargs):
+        if password is None:
+            return None
+        if user is None:
+            email = email or kwargs.get(UserModel.USERNAME_FIELD) or kwargs.get("username")
+            if email is None:
+                return None
+            user = UserModel._default_manager.filter(email=email).first()
+            if user is None:
+                # hash anyway so an unknown email takes as long as a wrong password
+                UserModel().set_password(password)
+                return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
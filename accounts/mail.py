@@ -0,0 +1,136 @@
+"""
+Email outbox.
+
+Views call ``enqueue`` instead of sending: the message is stored as an
+``OutboxMessage`` in the same transaction as the change that triggered it,
+so no request waits on SMTP and nothing is sent for a rolled back change.
+
+``manage.py send_outbox`` drains the table with ``deliver``: it claims a
+batch of due messages, sends them over one connection of ``EMAIL_BACKEND``
+and records each outcome as soon as it is known, so a worker that dies
+mid-batch does not send the messages already out again. A batch that runs
+long renews its claim on the messages still to send. A failed message is
+retried after ``EMAIL_OUTBOX_RETRY_DELAY`` seconds, doubled per attempt up
+to ``EMAIL_OUTBOX_MAX_DELAY``, and marked failed after
+``EMAIL_OUTBOX_MAX_ATTEMPTS`` attempts.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboxMessage, OutboxStatus
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 6
+RETRY_DELAY = 60
+MAX_DELAY = 3600
+# how long a claimed batch is hidden from other workers
+CLAIM_SECONDS = 300
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue(message):
+    """Store ``message`` (an ``EmailMessage``) for delivery by the outbox worker."""
+    return OutboxMessage.objects.create(
+        subject=message.subject, body=message.body, from_email=message.from_email, to=list(message.to),
+    )
+
+
+def backoff(attempts):
+    """Delay before retrying a message that has failed ``attempts`` times."""
+    delay = _setting("EMAIL_OUTBOX_RETRY_DELAY", RETRY_DELAY) * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, _setting("EMAIL_OUTBOX_MAX_DELAY", MAX_DELAY)))
+
+
+def claim(batch_size, now):
+    """Return up to ``batch_size`` due messages, hidden from other workers for ``CLAIM_SECONDS``."""
+    with transaction.atomic():
+        ids = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxStatus.PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id").values_list("id", flat=True)[:batch_size]
+        )
+        OutboxMessage.objects.filter(pk__in=ids).update(next_attempt_at=now + timedelta(seconds=CLAIM_SECONDS))
+    return list(OutboxMessage.objects.filter(pk__in=ids).order_by("id"))
+
+
+def _extend_claim(messages):
+    """Hide the still pending ``messages`` for another ``CLAIM_SECONDS``; returns the new claim expiry."""
+    until = timezone.now() + timedelta(seconds=CLAIM_SECONDS)
+    OutboxMessage.objects.filter(
+        pk__in=[message.pk for message in messages], status=OutboxStatus.PENDING,
+    ).update(next_attempt_at=until)
+    return until
+
+
+def _sent(message):
+    sent_at = timezone.now()
+    OutboxMessage.objects.filter(pk=message.pk).update(
+        status=OutboxStatus.SENT, attempts=F("attempts") + 1, last_error="", sent_at=sent_at, updated_at=sent_at,
+    )
+
+
+def _failed(message, error):
+    attempts = message.attempts + 1
+    now = timezone.now()
+    if attempts >= _setting("EMAIL_OUTBOX_MAX_ATTEMPTS", MAX_ATTEMPTS):
+        changes = {"status": OutboxStatus.FAILED}
+        logger.error("Giving up on outbox message %s after %s attempts: %s", message.pk, attempts, error)
+    else:
+        changes = {"next_attempt_at": now + backoff(attempts)}
+        logger.warning("Outbox message %s failed (attempt %s): %s", message.pk, attempts, error)
+    OutboxMessage.objects.filter(pk=message.pk).update(
+        attempts=attempts, last_error=str(error), updated_at=now, **changes,
+    )
+
+
+def deliver(batch_size=None, now=None):
+    """Send one batch of due messages over a single connection; returns ``(sent, failed)``."""
+    now = now or timezone.now()
+    messages = claim(batch_size or _setting("EMAIL_OUTBOX_BATCH_SIZE", BATCH_SIZE), now)
+    claimed_until = now + timedelta(seconds=CLAIM_SECONDS)
+    sent = failed = 0
+    connection = get_connection()
+    try:
+        for position, message in enumerate(messages):
+            if timezone.now() >= claimed_until - timedelta(seconds=CLAIM_SECONDS / 2):
+                claimed_until = _extend_claim(messages[position:])
+            try:
+                connection.open()
+            except Exception as e:
+                # server unreachable: the rest of the batch is retried later
+                for pending in messages[position:]:
+                    _failed(pending, e)
+                failed += len(messages) - position
+                break
+            email = EmailMessage(message.subject, message.body, message.from_email, message.to, connection=connection)
+            try:
+                if not connection.send_messages([email]):
+                    raise RuntimeError("The email backend did not send the message.")
+            except Exception as e:
+                # the connection may be unusable now; open() starts a new one
+                connection.close()
+                _failed(message, e)
+                failed += 1
+            else:
+                _sent(message)
+                sent += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def purge(before):
+    """Delete messages sent before ``before``; returns the number removed."""
+    deleted, _ = OutboxMessage.objects.filter(status=OutboxStatus.SENT, sent_at__lt=before).delete()
+    return deleted
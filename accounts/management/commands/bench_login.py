@@ -0,0 +1,109 @@
+"""
+Report what a login costs:
+
+    python manage.py bench_login --repeat 20 --output login.json
+
+For every hasher in ``PASSWORD_HASHERS`` it times hashing and verifying a
+password; the first one is what new and rehashed passwords use. It then
+posts to ``login_page`` with the test client, as a temporary user hashed with
+that first hasher, and reports latency percentiles and queries for a
+successful login, a wrong password, an unknown email and an attempt refused
+by ``accounts.throttle``.
+"""
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hashers
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts import throttle
+from accounts.models import CustomUser
+from family.management.commands.benchmark import measure, percentile
+
+BENCH_USER = "login-bench@example.com"
+BENCH_PASSWORD = "Bench@12345"
+# a documentation address (RFC 5737), so the throttled scenario cannot hold up a real client
+BENCH_IP = "192.0.2.10"
+OFF = {scope: None for scope in throttle.RATES}
+
+
+def time_hasher(hasher, repeat):
+    timings = {"encode": [], "verify": []}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        encoded = hasher.encode(BENCH_PASSWORD, hasher.salt())
+        timings["encode"].append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        hasher.verify(BENCH_PASSWORD, encoded)
+        timings["verify"].append((time.perf_counter() - start) * 1000)
+    return {
+        f"{step}_{name}_ms": round(value(values), 2)
+        for step, values in timings.items()
+        for name, value in (("p50", statistics.median), ("p95", lambda v: percentile(v, 0.95)))
+    }
+
+
+def _post(email, password):
+    path = reverse("login_page")
+    return lambda client: client.post(path, {"email": email, "password": password}).status_code
+
+
+class Command(BaseCommand):
+    help = "Time the password hashers and the login view; prints or writes the results as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=10, help="Timed runs per hasher and scenario.")
+        parser.add_argument("--warmup", type=int, default=1, help="Untimed runs before measuring.")
+        parser.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        hashers = {}
+        for hasher in get_hashers():
+            try:
+                hashers[hasher.algorithm] = time_hasher(hasher, repeat)
+            except ValueError as e:
+                # the hasher's library is not installed
+                hashers[hasher.algorithm] = {"error": str(e)}
+                continue
+            self.stderr.write(f"{hasher.algorithm:28} verify p50 {hashers[hasher.algorithm]['verify_p50_ms']:9.2f} ms")
+
+        CustomUser.objects.filter(email=BENCH_USER).delete()
+        user = CustomUser.objects.create_user(email=BENCH_USER, password=BENCH_PASSWORD)
+        scenarios = [
+            ("login", _post(BENCH_USER, BENCH_PASSWORD), OFF),
+            ("wrong_password", _post(BENCH_USER, "wrong"), OFF),
+            ("unknown_email", _post("nobody@example.com", BENCH_PASSWORD), OFF),
+            # the warmup run takes the only token
+            ("throttled", _post(BENCH_USER, "wrong"), {**OFF, "login_ip": (1, 3600)}),
+        ]
+        results = {}
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+                for name, run, rates in scenarios:
+                    with override_settings(THROTTLE_RATES=rates):
+                        client = Client(REMOTE_ADDR=BENCH_IP, raise_request_exception=False)
+                        results[name] = measure(run, client, repeat, max(options["warmup"], 1))
+                    self.stderr.write(f"{name:28} p50 {results[name]['p50_ms']:9.2f} ms  {results[name]['queries']:5} queries")
+        finally:
+            throttle.reset("login_ip", BENCH_IP)
+            user.delete()
+
+        report = {
+            "created_at": timezone.now().isoformat(),
+            "hasher": get_hashers()[0].algorithm,
+            "repeat": repeat,
+            "hashers": hashers,
+            "results": results,
+        }
+        body = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                output.write(body + "\n")
+        else:
+            self.stdout.write(body)
@@ -0,0 +1,37 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from accounts.mail import deliver, purge
+
+
+class Command(BaseCommand):
+    help = "Send the queued emails in batches, retrying failures with backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, help="Messages sent per connection (EMAIL_OUTBOX_BATCH_SIZE).")
+        parser.add_argument("--loop", action="store_true", help="Keep polling the outbox instead of exiting once it is drained.")
+        parser.add_argument("--interval", type=float, default=5, help="Seconds to wait between polls with --loop.")
+        parser.add_argument("--purge-days", type=int, help="Also delete messages sent more than this many days ago.")
+
+    def handle(self, *args, **options):
+        if options["purge_days"] is not None:
+            deleted = purge(timezone.now() - timedelta(days=options["purge_days"]))
+            self.stdout.write(f"Purged {deleted} sent messages.")
+        while True:
+            total_sent = total_failed = 0
+            # drain everything that is due, one batch per connection
+            while True:
+                sent, failed = deliver(options["batch_size"])
+                total_sent, total_failed = total_sent + sent, total_failed + failed
+                if not sent and not failed:
+                    break
+            if total_sent or total_failed or not options["loop"]:
+                self.stdout.write(self.style.SUCCESS(f"Sent {total_sent}, failed {total_failed}."))
+            if not options["loop"]:
+                return
+            close_old_connections()
+            time.sleep(options["interval"])
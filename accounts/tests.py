@@ -1,3 +1,162 @@
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import throttle
+from .mail import backoff, deliver, enqueue
+from .models import CustomUser, OutboxMessage, OutboxStatus
+
+
+class OutboxTests(TestCase):
+    def queue(self, count=1):
+        for i in range(count):
+            enqueue(mail.EmailMessage(f"Subject {i}", "Body", "noreply@example.com", [f"user{i}@example.com"]))
+
+    def test_forgot_password_only_enqueues(self):
+        CustomUser.objects.create_user(email="user@example.com", password="Secret@123")
+        response = self.client.post(reverse("forgot_password"), {"email": "user@example.com"})
+
+        self.assertTrue(response.json()["success"])
+        self.assertEqual(len(mail.outbox), 0)
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.to, ["user@example.com"])
+        self.assertIn("/reset_password/", message.body)
+
+    def test_deliver_sends_batch_over_one_connection(self):
+        self.queue(3)
+        with mock.patch("accounts.mail.get_connection", wraps=mail.get_connection) as get_connection:
+            self.assertEqual(deliver(), (3, 0))
+        self.assertEqual(get_connection.call_count, 1)
+        self.assertEqual([m.subject for m in mail.outbox], ["Subject 0", "Subject 1", "Subject 2"])
+        self.assertFalse(OutboxMessage.objects.exclude(status=OutboxStatus.SENT).exists())
+        self.assertEqual(deliver(), (0, 0))
+
+    def test_messages_are_marked_sent_one_by_one(self):
+        self.queue(3)
+        with mock.patch.object(EmailBackend, "send_messages", side_effect=[1, KeyboardInterrupt]):
+            with self.assertRaises(KeyboardInterrupt):
+                deliver()
+        # a worker stopped mid-batch: the first message went out and is not sent again
+        self.assertEqual(
+            list(OutboxMessage.objects.order_by("id").values_list("status", flat=True)),
+            [OutboxStatus.SENT, OutboxStatus.PENDING, OutboxStatus.PENDING],
+        )
+
+    def test_slow_batch_renews_its_claim(self):
+        self.queue(2)
+        clock, claims = [timezone.now()], []
+
+        def send(messages):
+            claims.append(OutboxMessage.objects.get(subject=messages[0].subject).next_attempt_at - clock[0])
+            clock[0] += timedelta(seconds=200)
+            return 1
+
+        with mock.patch("django.utils.timezone.now", side_effect=lambda: clock[0]), \
+                mock.patch.object(EmailBackend, "send_messages", side_effect=send):
+            self.assertEqual(deliver(), (2, 0))
+        self.assertEqual(claims, [timedelta(seconds=300)] * 2)
+
+    def test_failed_message_is_retried_with_backoff(self):
+        self.queue()
+        with mock.patch.object(EmailBackend, "send_messages", side_effect=OSError("connection reset")):
+            self.assertEqual(deliver(), (0, 1))
+
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.status, message.attempts), (OutboxStatus.PENDING, 1))
+        self.assertEqual(message.last_error, "connection reset")
+        self.assertGreater(message.next_attempt_at, timezone.now() + backoff(1) - timedelta(seconds=5))
+        self.assertEqual(deliver(), (0, 0))
+
+        self.assertEqual(deliver(now=message.next_attempt_at), (1, 0))
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), (OutboxStatus.SENT, 2))
+
+    def test_message_fails_after_max_attempts(self):
+        self.queue()
+        with self.settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2), \
+                mock.patch.object(EmailBackend, "send_messages", side_effect=OSError("refused")):
+            deliver()
+            deliver(now=timezone.now() + timedelta(days=1))
+        self.assertEqual(OutboxMessage.objects.get().status, OutboxStatus.FAILED)
+
+    def test_backoff_doubles_up_to_the_maximum(self):
+        with self.settings(EMAIL_OUTBOX_RETRY_DELAY=10, EMAIL_OUTBOX_MAX_DELAY=60):
+            self.assertEqual([backoff(n).seconds for n in range(1, 6)], [10, 20, 40, 60, 60])
+
+
+class LoginTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email="user@example.com", password="Secret@123")
+
+    def login(self, password="Secret@123", email="user@example.com", **extra):
+        return self.client.post(reverse("login_page"), {"email": email, "password": password}, **extra)
+
+    def test_login_looks_the_user_up_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(self.login().json()["success"])
+        # the rest are last_login and the new session
+        self.assertEqual(sum(q["sql"].startswith('SELECT "User"') for q in queries), 1)
+        self.assertEqual(self.login(email="nobody@example.com").json()["field"], "email")
+
+    def test_outdated_hash_is_upgraded_at_login(self):
+        with self.settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher"]):
+            self.user.set_password("Secret@123")
+            self.user.save()
+
+        self.assertTrue(self.login().json()["success"])
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("md5$"))
+
+    def test_failed_logins_are_throttled_per_email(self):
+        with self.settings(THROTTLE_RATES={"login_email": (2, 60)}):
+            for i in range(2):
+                self.assertEqual(self.login("wrong", REMOTE_ADDR=f"10.0.0.{i}").status_code, 200)
+            response = self.login(REMOTE_ADDR="10.0.0.9")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "30")
+        self.assertFalse(response.json()["success"])
+
+    def test_successful_login_refills_the_email_bucket(self):
+        with self.settings(THROTTLE_RATES={"login_email": (2, 60)}):
+            self.login("wrong")
+            self.login()
+            self.client.logout()
+            self.login("wrong")
+            self.assertEqual(self.login().status_code, 200)
+
+    def test_password_resets_are_throttled_per_address(self):
+        with self.settings(THROTTLE_RATES={"reset_ip": (1, 3600)}):
+            self.assertTrue(self.client.post(reverse("forgot_password"), {"email": "user@example.com"}).json()["success"])
+            response = self.client.post(reverse("forgot_password"), {"email": "other@example.com"})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+    def test_attempt_waits_for_a_held_bucket_lock(self):
+        lock = throttle._key("login_email", "user@example.com") + ":lock"
+        cache.add(lock, 1)
+        release = threading.Timer(0.05, cache.delete, [lock])
+        release.start()
+        self.addCleanup(release.cancel)
+        with self.settings(THROTTLE_RATES={"login_email": (2, 60)}):
+            self.assertEqual(throttle.take("login_email", "user@example.com"), 0)
+        self.assertIsNone(cache.get(lock))
+
+    def test_stale_bucket_lock_does_not_refuse_the_attempt(self):
+        lock = throttle._key("login_email", "user@example.com") + ":lock"
+        cache.add(lock, 1)
+        with self.settings(THROTTLE_RATES={"login_email": (1, 60)}), mock.patch.object(throttle, "LOCK_WAIT", 0.01):
+            self.assertEqual(throttle.take("login_email", "user@example.com"), 0)
+            self.assertEqual(throttle.take("login_email", "user@example.com"), 60)
+        # the lock belongs to whoever set it
+        self.assertEqual(cache.get(lock), 1)
 
-# Create your tests here.
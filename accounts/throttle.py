@@ -0,0 +1,103 @@
+"""
+Token buckets for the login and password reset views.
+
+Each attempt takes a token from a bucket for the client address and one for
+the email it names; a bucket of ``capacity`` tokens refills evenly over
+``period`` seconds. An attempt that finds either bucket empty is answered
+with a 429 before any password is hashed or email queued, so a burst of
+guesses costs a few cache operations each instead of a hash.
+
+The rates are ``RATES`` updated with the ``THROTTLE_RATES`` setting
+(``{scope: (capacity, period)}``, ``None`` to turn a scope off). Buckets are
+kept in the default cache, so they are shared by as many processes as the
+cache is (see ``CACHES``); each update holds a short lock so concurrent
+attempts cannot spend the same token.
+
+The lock is a ``cache.add``, which is only atomic across processes on Redis
+or Memcached. The "file" backend checks and writes in two steps and "locmem"
+is per process, so there two attempts can occasionally both take the lock
+and the count is best-effort. An attempt that finds the lock taken waits up
+to ``LOCK_WAIT`` seconds for it rather than being refused, and counts
+without it after that (a holder that died leaves it for ``LOCK_TIMEOUT``).
+"""
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+RATES = {
+    "login_ip": (20, 60),
+    "login_email": (5, 300),
+    "reset_ip": (5, 3600),
+    "reset_email": (3, 3600),
+}
+LOCK_TIMEOUT = 5
+LOCK_WAIT = 0.2
+LOCK_POLL = 0.005
+
+
+def rate(scope):
+    return {**RATES, **getattr(settings, "THROTTLE_RATES", {})}.get(scope)
+
+
+def client_ip(request):
+    # the web server in front of the app is expected to set REMOTE_ADDR to the client's address
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def _key(scope, ident):
+    return f"throttle:{scope}:{hashlib.sha1(ident.strip().lower().encode()).hexdigest()}"
+
+
+def _lock(key):
+    """Wait up to ``LOCK_WAIT`` for ``key``; returns whether it was taken."""
+    deadline = time.monotonic() + LOCK_WAIT
+    # another attempt with the same address or email is being counted
+    while not cache.add(key, 1, LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(LOCK_POLL)
+    return True
+
+
+def take(scope, ident, now=None):
+    """
+    Take a token from the ``scope`` bucket of ``ident``; returns ``0`` when it
+    was available, otherwise the seconds until it will be.
+    """
+    limit = rate(scope)
+    if limit is None or not ident:
+        return 0
+    capacity, period = limit
+    key = _key(scope, ident)
+    locked = _lock(f"{key}:lock")
+    try:
+        now = time.time() if now is None else now
+        tokens, updated = cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * capacity / period)
+        if tokens < 1:
+            return math.ceil((1 - tokens) * period / capacity)
+        cache.set(key, (tokens - 1, now), period)
+        return 0
+    finally:
+        if locked:
+            cache.delete(f"{key}:lock")
+
+
+def reset(scope, ident):
+    """Refill the ``scope`` bucket of ``ident``, e.g. once a login succeeded."""
+    if ident:
+        cache.delete(_key(scope, ident))
+
+
+def check(request, prefix, email):
+    """
+    Take the address and the email token of an attempt at ``prefix``
+    (``"login"``, ``"reset"``); returns the seconds to wait, ``0`` if allowed.
+    """
+    wait = take(f"{prefix}_ip", client_ip(request))
+    if wait:
+        return wait
+    return take(f"{prefix}_email", email)
@@ -7,12 +7,25 @@ from django.utils import timezone
 from django.urls import reverse
 from django.http import JsonResponse
 from django.conf import settings
+from django.db import transaction
 import re, logging
 
 from .models import CustomUser, PasswordReset
+from .mail import enqueue
+from . import throttle
 
 logger = logging.getLogger(__name__)
 
+
+def throttled(field, wait):
+    response = JsonResponse(
+        {"field": field, "success": False, "errorMessage": f"Too many attempts. Try again in {wait} seconds."},
+        status=429,
+    )
+    response["Retry-After"] = wait
+    return response
+
+
 def login_page(request):
     try:
         if request.method == 'POST':
@@ -22,14 +35,21 @@ def login_page(request):
             if not email or not password:
                 return JsonResponse({"success": False, "errorMessage": "Email and password are required."})
 
-            if not CustomUser.objects.filter(email=email).exists():
+            wait = throttle.check(request, "login", email)
+            if wait:
+                return throttled('password', wait)
+
+            # one query; authenticate() checks the password against this row (accounts.backends)
+            user = CustomUser.objects.filter(email=email).first()
+            if user is None:
                 return JsonResponse({"field": 'email', "success": False, "errorMessage": "Email not registered."})
 
-            user = authenticate(request, email=email, password=password)
+            user = authenticate(request, user=user, password=password)
 
             if user is None:
                 return JsonResponse({"field": 'password', "success": False, "errorMessage": "Invalid Password."})
             else:
+                throttle.reset("login_email", email)
                 login(request, user)
                 return JsonResponse({"success": True})
 
@@ -59,29 +79,30 @@ def forgot_password(request):
             if not email:
                 return JsonResponse({"field": 'email', "success": False, "errorMessage": "Email is required."})
 
+            wait = throttle.check(request, "reset", email)
+            if wait:
+                return throttled('email', wait)
+
             try:
                 user = CustomUser.objects.get(email=email)
             except CustomUser.DoesNotExist:
                 return JsonResponse({"field": 'email', "success": False, "errorMessage": f"No user with email '{email}' found."})
 
-            # Create new PasswordReset
-            new_password_reset = PasswordReset.objects.create(user=user)
+            with transaction.atomic():
+                # Create new PasswordReset
+                new_password_reset = PasswordReset.objects.create(user=user)
 
-            password_reset_url = reverse('reset_password', kwargs={'reset_id': new_password_reset.reset_id})
-            full_password_reset_url = f'{request.scheme}://{request.get_host()}{password_reset_url}'
-            email_body = f'Reset your password using the link below:\n\n{full_password_reset_url}'
+                password_reset_url = reverse('reset_password', kwargs={'reset_id': new_password_reset.reset_id})
+                full_password_reset_url = f'{request.scheme}://{request.get_host()}{password_reset_url}'
+                email_body = f'Reset your password using the link below:\n\n{full_password_reset_url}'
 
-            try:
-                email_message = EmailMessage(
+                # Sent by manage.py send_outbox
+                enqueue(EmailMessage(
                     'Reset your password',
                     email_body,
                     settings.EMAIL_HOST_USER,
                     [email]
-                )
-                email_message.fail_silently = True
-                email_message.send()
-            except Exception as mail_error:
-                logger.warning("Email sending failed: %s", mail_error)
+                ))
 
             redirectURL = reverse('password_reset_sent', kwargs={'reset_id': new_password_reset.reset_id})
             return JsonResponse({"success": True, "redirectURL": redirectURL})
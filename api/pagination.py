@@ -0,0 +1,13 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ApiCursorPagination(CursorPagination):
+    """
+    Opaque ``?cursor=`` pages in the view's ordering; an integration syncs by
+    walking ``?ordering=updated_at`` (optionally with ``updated_since``) and
+    storing the last ``next`` link.
+    """
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    ordering = "-created_at"
@@ -0,0 +1,86 @@
+from rest_framework import serializers
+
+from family.models import FamilyHead, FamilyMember, Hobby, State, City
+
+
+class ResourceSerializer(serializers.ModelSerializer):
+    """
+    ``fields`` limits the output to the named fields; the names in ``expand``
+    replace a related id (or add a related list) with the nested objects.
+    ``expandable()`` maps each name to ``(serializer class, many, source)``.
+    """
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        expandable = self.expandable()
+        for name in expand:
+            serializer_class, many, source = expandable[name]
+            self.fields[name] = serializer_class(many=many, read_only=True, source=source)
+        if fields:
+            for name in set(self.fields) - set(fields) - set(expand):
+                self.fields.pop(name)
+
+    @classmethod
+    def expandable(cls):
+        return {}
+
+
+class StateSerializer(ResourceSerializer):
+    class Meta:
+        model = State
+        fields = ("id", "state_name", "status", "created_at", "updated_at")
+
+    @classmethod
+    def expandable(cls):
+        return {"cities": (CitySerializer, True, "city_set")}
+
+
+class CitySerializer(ResourceSerializer):
+    class Meta:
+        model = City
+        fields = ("id", "state", "city_name", "status", "created_at", "updated_at")
+
+    @classmethod
+    def expandable(cls):
+        return {"state": (StateSerializer, False, None)}
+
+
+class HobbySerializer(ResourceSerializer):
+    class Meta:
+        model = Hobby
+        fields = ("id", "family_head", "hobby", "status", "created_at", "updated_at")
+
+    @classmethod
+    def expandable(cls):
+        return {"family_head": (FamilyHeadSerializer, False, None)}
+
+
+class FamilyMemberSerializer(ResourceSerializer):
+    class Meta:
+        model = FamilyMember
+        fields = (
+            "id", "family_head", "member_name", "member_dob", "member_marital", "member_wedDate",
+            "education", "member_photo", "status", "created_at", "updated_at",
+        )
+
+    @classmethod
+    def expandable(cls):
+        return {"family_head": (FamilyHeadSerializer, False, None)}
+
+
+class FamilyHeadSerializer(ResourceSerializer):
+    class Meta:
+        model = FamilyHead
+        fields = (
+            "id", "name", "surname", "dob", "mobno", "address", "state", "city", "pincode",
+            "marital_status", "wedding_date", "photo", "status", "created_at", "updated_at",
+        )
+
+    @classmethod
+    def expandable(cls):
+        return {
+            "state": (StateSerializer, False, None),
+            "city": (CitySerializer, False, None),
+            "members": (FamilyMemberSerializer, True, None),
+            "hobbies": (HobbySerializer, True, None),
+        }
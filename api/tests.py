@@ -0,0 +1,121 @@
+import json
+from datetime import date, timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from family.models import FamilyHead, FamilyMember, Hobby, State, City, ChangeLog, statusChoice
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(email="api@example.com", password="Secret@123")
+        cls.state = State.objects.create(state_name="Gujarat")
+        cls.city = City.objects.create(state=cls.state, city_name="Surat")
+        cls.heads = [
+            FamilyHead.objects.create(
+                name=name, surname="Patel", dob=date(1980, 1, 1), mobno="9876543210", address="Street",
+                state=cls.state, city=cls.city, pincode="395001", photo="pictures/head.jpg",
+            )
+            for name in ("Aarav", "Vihaan", "Kabir")
+        ]
+        cls.member = FamilyMember.objects.create(family_head=cls.heads[0], member_name="Diya", member_dob=date(2005, 1, 1))
+        cls.deleted = FamilyMember.objects.create(family_head=cls.heads[0], member_name="Ira", member_dob=date(2007, 1, 1))
+        cls.deleted.soft_delete()
+        Hobby.objects.create(family_head=cls.heads[0], hobby="Reading")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def get(self, name, **params):
+        return self.client.get(reverse(f"v1:{name}"), params)
+
+    def test_anonymous_requests_are_refused(self):
+        self.client.logout()
+        self.assertEqual(self.get("family-list").status_code, 403)
+
+    def test_fields_limits_the_output(self):
+        results = self.get("family-list", fields="id,name").json()["results"]
+        self.assertEqual(results[0], {"id": self.heads[2].pk, "name": "Kabir"})
+
+    def test_expand_nests_related_objects(self):
+        response = self.client.get(reverse("v1:family-detail", args=[self.heads[0].pk]), {"expand": "state,members,hobbies"})
+        data = response.json()
+        self.assertEqual(data["state"]["state_name"], "Gujarat")
+        self.assertEqual([m["member_name"] for m in data["members"]], ["Diya"])
+        self.assertEqual([h["hobby"] for h in data["hobbies"]], ["Reading"])
+        self.assertEqual(self.get("family-list", expand="owner").status_code, 400)
+
+    def test_include_deleted_reaches_expanded_children(self):
+        response = self.client.get(
+            reverse("v1:family-detail", args=[self.heads[0].pk]), {"expand": "members", "include_deleted": "1"},
+        )
+        self.assertEqual(
+            sorted((m["member_name"], m["status"]) for m in response.json()["members"]),
+            [("Diya", statusChoice.ACTIVE), ("Ira", statusChoice.DELETE)],
+        )
+        self.assertEqual(len(self.get("member-list").json()["results"]), 1)
+        self.assertEqual(len(self.get("member-list", include_deleted="1").json()["results"]), 2)
+
+    def test_cursor_pages_walk_every_row(self):
+        names, url = [], reverse("v1:family-list") + "?page_size=2&ordering=id"
+        while url:
+            page = self.client.get(url).json()
+            self.assertNotIn("count", page)
+            names += [head["name"] for head in page["results"]]
+            url = page["next"]
+        self.assertEqual(names, ["Aarav", "Vihaan", "Kabir"])
+
+    def test_updated_since(self):
+        FamilyHead.objects.filter(pk=self.heads[1].pk).update(updated_at=timezone.now() + timedelta(days=1))
+        since = (timezone.now() + timedelta(hours=1)).isoformat()
+        results = self.get("family-list", updated_since=since).json()["results"]
+        self.assertEqual([head["id"] for head in results], [self.heads[1].pk])
+        self.assertEqual(self.get("family-list", updated_since="yesterday").status_code, 400)
+
+    def test_conditional_requests(self):
+        url = reverse("v1:family-detail", args=[self.heads[0].pk])
+        response = self.client.get(url, {"expand": "members"})
+        self.assertEqual(response["Cache-Control"], "private, no-cache")
+        self.assertIn("Last-Modified", response)
+
+        self.assertEqual(self.client.get(url, {"expand": "members"}, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+        self.assertEqual(
+            self.client.get(url, {"expand": "members"}, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]).status_code, 304,
+        )
+
+        self.member.member_name = "Diya Patel"
+        self.member.save()
+        self.assertEqual(self.client.get(url, {"expand": "members"}, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 200)
+
+
+class ChangeFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(email="api@example.com", password="Secret@123")
+        cls.states = [State.objects.create(state_name=name) for name in ("Gujarat", "Kerala", "Goa")]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def changes(self, **params):
+        response = self.client.get(reverse("change_feed"), params)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        return [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+    def test_feed_streams_ndjson_from_the_cursor(self):
+        lines = self.changes()
+        self.assertEqual([(line["id"], line["action"]) for line in lines], [(state.pk, "create") for state in self.states])
+        self.assertEqual(lines[1]["data"]["state_name"], "Kerala")
+
+        self.assertEqual([line["id"] for line in self.changes(since=lines[0]["seq"], limit=1)], [self.states[1].pk])
+        self.assertEqual(self.changes(since=ChangeLog.objects.latest("seq").seq), [])
+
+    def test_bad_parameters_and_anonymous_requests(self):
+        self.assertEqual(self.client.get(reverse("change_feed"), {"since": "-1"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("change_feed"), {"limit": "ten"}).status_code, 400)
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse("change_feed")).status_code, 403)
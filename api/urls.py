@@ -0,0 +1,16 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+
+from .views import FamilyHeadViewSet, FamilyMemberViewSet, HobbyViewSet, StateViewSet, CityViewSet, change_feed
+
+router = DefaultRouter()
+router.register("families", FamilyHeadViewSet, basename="family")
+router.register("members", FamilyMemberViewSet, basename="member")
+router.register("hobbies", HobbyViewSet, basename="hobby")
+router.register("states", StateViewSet, basename="state")
+router.register("cities", CityViewSet, basename="city")
+
+urlpatterns = [
+    path("api/v1/", include((router.urls, "api"), namespace="v1")),
+    path("changes/", change_feed, name="change_feed"),
+]
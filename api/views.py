@@ -0,0 +1,194 @@
+import hashlib
+import json
+from calendar import timegm
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+from rest_framework import viewsets
+from rest_framework.decorators import api_view
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.versioning import NamespaceVersioning
+
+from family.changes import feed, ndjson, FEED_LIMIT
+from .pagination import ApiCursorPagination
+from .serializers import (
+    FamilyHeadSerializer, FamilyMemberSerializer, HobbySerializer, StateSerializer, CitySerializer,
+)
+
+
+def _names(value):
+    return [name.strip() for name in (value or "").split(",") if name.strip()]
+
+
+class ResourceViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Read-only resource with the query parameters every endpoint shares:
+
+    * ``fields=a,b``     return only these fields (and load only these columns)
+    * ``expand=x,y``     nest the related objects, joined or prefetched in bulk
+    * ``ordering=``      one of ``ordering_fields`` (all indexed), ``-`` for desc
+    * ``updated_since=`` ISO timestamp, for incremental sync
+    * ``include_deleted=1`` also return soft-deleted rows (``status`` 9)
+
+    Responses carry an ETag over the returned data and a Last-Modified from
+    the newest ``updated_at`` in it, and answer conditional GETs with 304.
+    """
+    versioning_class = NamespaceVersioning
+    pagination_class = ApiCursorPagination
+    filter_backends = [OrderingFilter]
+    ordering_fields = ["id", "updated_at"]
+    ordering = ["id"]
+    # expand name -> select_related path (forward FK) or prefetch_related lookup
+    select = {}
+    prefetch = {}
+    # query parameter -> model field
+    filters = {}
+
+    def expand(self):
+        names = _names(self.request.query_params.get("expand"))
+        unknown = set(names) - set(self.select) - set(self.prefetch)
+        if unknown:
+            raise ValidationError({"expand": f"Cannot expand: {', '.join(sorted(unknown))}."})
+        return names
+
+    def requested_fields(self):
+        return _names(self.request.query_params.get("fields"))
+
+    def include_deleted(self):
+        return self.request.query_params.get("include_deleted") == "1"
+
+    def get_queryset(self):
+        model = self.serializer_class.Meta.model
+        params = self.request.query_params
+        queryset = (model.all_objects if self.include_deleted() else model.objects).all()
+
+        since = params.get("updated_since")
+        if since:
+            since_dt = parse_datetime(since)
+            if since_dt is None:
+                raise ValidationError({"updated_since": "Enter an ISO 8601 date/time."})
+            queryset = queryset.filter(updated_at__gte=since_dt)
+        for param, field in self.filters.items():
+            if params.get(param):
+                if not params[param].isdigit():
+                    raise ValidationError({param: "Enter a whole number."})
+                queryset = queryset.filter(**{field: params[param]})
+
+        expand = self.expand()
+        related = [self.select[name] for name in expand if name in self.select]
+        if related:
+            queryset = queryset.select_related(*related)
+        prefetch = [self.prefetch[name] for name in expand if name in self.prefetch]
+        if prefetch and self.include_deleted():
+            # related managers filter through the children's default (active) manager
+            prefetch = [
+                Prefetch(lookup, queryset=getattr(model, lookup).rel.related_model.all_objects.all())
+                for lookup in prefetch
+            ]
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+
+        fields = self.requested_fields()
+        if fields:
+            concrete = {field.name for field in model._meta.concrete_fields}
+            columns = {"id", "updated_at", "created_at"} | (set(fields) & concrete) | set(related)
+            queryset = queryset.only(*columns)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if args:
+            self._instances = args[0]
+        kwargs.setdefault("fields", self.requested_fields())
+        kwargs.setdefault("expand", self.expand())
+        return super().get_serializer(*args, **kwargs)
+
+    def last_modified(self):
+        instances = getattr(self, "_instances", None)
+        if instances is None:
+            return None
+        if not isinstance(instances, (list, tuple)):
+            instances = [instances]
+        expand = self.expand()
+        stamps = []
+        for obj in instances:
+            stamps.append(obj.updated_at)
+            for name in expand:
+                if name in self.select:
+                    related = getattr(obj, self.select[name])
+                    if related is not None:
+                        stamps.append(related.updated_at)
+                else:
+                    stamps.extend(child.updated_at for child in getattr(obj, self.prefetch[name]).all())
+        return max(stamps) if stamps else None
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method not in ("GET", "HEAD") or response.status_code != 200 or getattr(response, "data", None) is None:
+            return response
+
+        body = json.dumps(response.data, cls=DjangoJSONEncoder, sort_keys=True)
+        etag = '"%s"' % hashlib.sha1(body.encode()).hexdigest()
+        modified = self.last_modified()
+        timestamp = timegm(modified.utctimetuple()) if modified else None
+
+        response["ETag"] = etag
+        if timestamp is not None:
+            response["Last-Modified"] = http_date(timestamp)
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ("Cookie", "Authorization"))
+        return get_conditional_response(request, etag=etag, last_modified=timestamp, response=response)
+
+
+class FamilyHeadViewSet(ResourceViewSet):
+    serializer_class = FamilyHeadSerializer
+    ordering_fields = ["id", "created_at", "updated_at"]
+    ordering = ["-created_at"]
+    select = {"state": "state", "city": "city"}
+    prefetch = {"members": "members", "hobbies": "hobbies"}
+    filters = {"state": "state_id", "city": "city_id"}
+
+
+class FamilyMemberViewSet(ResourceViewSet):
+    serializer_class = FamilyMemberSerializer
+    select = {"family_head": "family_head"}
+    filters = {"family_head": "family_head_id"}
+
+
+class HobbyViewSet(ResourceViewSet):
+    serializer_class = HobbySerializer
+    select = {"family_head": "family_head"}
+    filters = {"family_head": "family_head_id"}
+
+
+class StateViewSet(ResourceViewSet):
+    serializer_class = StateSerializer
+    prefetch = {"cities": "city_set"}
+
+
+class CityViewSet(ResourceViewSet):
+    serializer_class = CitySerializer
+    select = {"state": "state"}
+    filters = {"state": "state_id"}
+
+
+@api_view(["GET"])
+def change_feed(request):
+    """
+    NDJSON stream of the rows changed after ``?since=<seq>`` (see family.changes).
+
+    Resume from the ``seq`` of the last line received; ``limit`` caps the
+    number of lines per request.
+    """
+    since, limit = request.query_params.get("since", "0"), request.query_params.get("limit", str(FEED_LIMIT))
+    if not since.isdigit() or not limit.isdigit():
+        raise ValidationError({"since": "since and limit must be whole numbers."})
+    response = StreamingHttpResponse(
+        ndjson(feed(int(since), min(int(limit), FEED_LIMIT))), content_type="application/x-ndjson",
+    )
+    patch_cache_control(response, private=True, no_store=True)
+    return response
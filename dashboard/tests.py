@@ -1,3 +1,112 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
 
-# Create your tests here.
+from accounts.models import CustomUser
+from fims.metrics import REGISTRY
+from family import fragments
+from family.models import FamilyHead, FamilyMember, State, City, statusChoice
+
+
+class FamilyListQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(email="admin@example.com", password="Secret@123")
+        state = State.objects.create(state_name="Maharashtra")
+        city = City.objects.create(state=state, city_name="Pune")
+        for i in range(12):
+            head = FamilyHead.objects.create(
+                name=f"Head{i}", surname="Patil", dob="1980-01-01", mobno="9876543210",
+                address="Address", state=state, city=city, pincode="411001",
+                marital_status="Unmarried", photo="pictures/head.jpg",
+            )
+            for j in range(3):
+                FamilyMember.objects.create(
+                    family_head=head, member_name=f"Member{j}", member_dob="2005-01-01",
+                    member_marital="Unmarried",
+                    status=statusChoice.DELETE if j == 2 else statusChoice.ACTIVE,
+                )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_family_list_page_uses_fixed_number_of_queries(self):
+        # user, COUNT(*), page of heads with state/city, members of the uncached rows
+        # (the session comes from the cache)
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse("family_list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["page_obj"].object_list), 10)
+
+    def test_cached_rows_skip_the_members_query(self):
+        self.client.get(reverse("family_list"))
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("family_list"))
+        self.assertContains(response, "Member1")
+
+    def test_member_change_replaces_the_cached_row(self):
+        self.client.get(reverse("family_list"))
+        member = FamilyMember.objects.filter(family_head__name="Head11").first()
+        member.member_name = "Renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            member.save()
+
+        self.assertContains(self.client.get(reverse("family_list")), "Renamed")
+
+    def test_family_detail_is_cached_until_the_head_changes(self):
+        head = FamilyHead.objects.get(name="Head0")
+        fragments.detail(head.id)
+        with self.assertNumQueries(0):
+            self.assertIn("Member1", fragments.detail(head.id))
+
+        head.surname = "Pawar"
+        with self.captureOnCommitCallbacks(execute=True):
+            head.save()
+        self.assertIn("Pawar Family", fragments.detail(head.id))
+
+    def test_family_list_hides_deleted_members(self):
+        response = self.client.get(reverse("family_list"))
+        self.assertContains(response, "Member1")
+        self.assertNotContains(response, "Member2")
+        self.assertNotIn("members", response.context)
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(email="admin@example.com", password="Secret@123")
+        state = State.objects.create(state_name="Maharashtra")
+        city = City.objects.create(state=state, city_name="Pune")
+        head = FamilyHead.objects.create(
+            name="Head0", surname="Patil", dob="1980-01-01", mobno="9876543210",
+            address="Address", state=state, city=city, pincode="411001",
+            marital_status="Unmarried", photo="pictures/head.jpg",
+        )
+        FamilyMember.objects.create(family_head=head, member_name="Member0", member_dob="2005-01-01", member_marital="Unmarried")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_family_list_queries_are_recorded(self):
+        REGISTRY.reset()
+        self.client.get(reverse("family_list"))
+        self.assertEqual(REGISTRY.queries["family_list"], 4)
+        self.assertEqual(REGISTRY.duplicates["family_list"], 0)
+
+        with override_settings(METRICS_TOKEN="s3cret"):
+            response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertContains(response, 'fims_sql_queries_total{view="family_list"} 4')
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_metrics_need_staff_or_the_token(self):
+        # a reverse proxy on the same host forwards every request from 127.0.0.1
+        self.assertEqual(self.client.get(reverse("metrics"), REMOTE_ADDR="127.0.0.1").status_code, 403)
+        self.assertEqual(self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+        with override_settings(METRICS_TOKEN=None):
+            self.assertEqual(self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer ").status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 200)
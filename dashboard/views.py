@@ -1,16 +1,20 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Count, Q
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.core.paginator import EmptyPage, PageNotAnInteger
 from django.http import JsonResponse
 from django.template.loader import render_to_string
 from django.forms import inlineformset_factory
+from asgiref.sync import sync_to_async
 import json, logging
 
-from family.models import FamilyMember, FamilyHead, State, City, statusChoice, Hobby
+from family.models import FamilyMember, FamilyHead, statusChoice, Hobby
 from family.forms import FamilyHeadForm, FamilyMemberForm, HobbyForm, HobbyInlineFormSet, MemberInlineFormSet
 from family.utils import decode_id
+from family.search import rank_heads, filter_heads
+from family.pagination import apage_context
+from family.services import save_family
+from family import counters, fragments
 
 logger = logging.getLogger(__name__)
 
@@ -18,26 +22,14 @@ logger = logging.getLogger(__name__)
 @login_required(login_url='login_page')
 def dashboard(request):
     try:
-        heads = FamilyHead.objects.exclude(status=statusChoice.DELETE)
-        members = FamilyMember.objects.exclude(status=statusChoice.DELETE)
-        states = State.objects.exclude(status=statusChoice.DELETE)
-        cities = City.objects.exclude(status=statusChoice.DELETE)
-
-        family_count = State.objects.annotate(total=Count("familyhead")).order_by("-total")[:5]
-        data = list(family_count.values('state_name', 'total'))
-        json_data = json.dumps(data)
-
-        active_states = State.objects.filter(status=statusChoice.ACTIVE).count()
-        inactive_states = State.objects.filter(status=statusChoice.INACTIVE).count()
+        totals = counters.snapshot()
+        json_data = json.dumps(counters.top_states(5))
 
         context = {
-            'members': members,
-            'heads': heads,
-            'states': states,
-            'cities': cities,
+            'totals': totals,
             'json_data': json_data,
-            'active_states': active_states,
-            'inactive_states': inactive_states,
+            'active_states': totals[counters.STATES_ACTIVE],
+            'inactive_states': totals[counters.STATES_INACTIVE],
         }
         return render(request, 'dashboard.html', context)
 
@@ -48,42 +40,28 @@ def dashboard(request):
 
 
 @login_required(login_url='login_page')
-def family_list(request):
+async def family_list(request):
     try:
-        heads = FamilyHead.objects.annotate(
-            member_count=Count('members', filter=~Q(members__status=9))
-        ).exclude(status=statusChoice.DELETE).order_by('-created_at')
+        # rows come from the fragment cache; members are only loaded for the ones that are not cached
+        heads = FamilyHead.objects.exclude(status=statusChoice.DELETE).select_related('state', 'city').order_by('-created_at')
 
-        members = FamilyMember.objects.all()
-
-        # Search filter
+        # Search filter (cursor pages follow created_at, so they skip ranking)
         search_query = request.GET.get('search')
+        matched = heads
         if search_query:
-            name = heads.filter(name__icontains=search_query)
-            mobno = heads.filter(mobno__icontains=search_query)
-            state = heads.filter(state__state_name__icontains=search_query)
-            city = heads.filter(city__city_name__icontains=search_query)
-            heads = name.union(mobno, state, city)
+            matched = filter_heads(heads, search_query)
+            heads = rank_heads(heads, search_query)
 
         # Pagination
-        p = Paginator(heads, 10)
-        page_number = request.GET.get('page')
-        page_obj = p.get_page(page_number)
-        totalPages = page_obj.paginator.num_pages
-
-        context = {
-            'members': members,
-            'page_obj': page_obj,
-            'lastPage': totalPages,
-            'totalPagelist': [n + 1 for n in range(totalPages)],
-        }
+        context = await apage_context(request, heads, 10, count_key=f"family_list:{search_query or ''}", cursor_queryset=matched)
+        context['rows'] = await sync_to_async(fragments.rows)(context['page_obj'].object_list)
 
         # Handle AJAX pagination
         if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-            family_html = render_to_string('list_template.html', context, request=request)
-            return JsonResponse({'family_html': family_html})
+            family_html = await sync_to_async(render_to_string)('list_template.html', context, request=request)
+            return JsonResponse({'family_html': family_html, **context.get('cursor', {})})
 
-        return render(request, 'family_list.html', context)
+        return await sync_to_async(render)(request, 'family_list.html', context)
 
     except PageNotAnInteger:
         logger.warning("Page number not an integer.")
@@ -103,11 +81,8 @@ def family_list(request):
 def view_family(request, hashid):
     try:
         pk = decode_id(hashid)
-        head = FamilyHead.objects.get(id=pk)
-        members = FamilyMember.objects.filter(family_head_id=pk).exclude(status=statusChoice.DELETE)
-        hobbies = Hobby.objects.filter(family_head_id=pk).exclude(status=statusChoice.DELETE)
-
-        context = {'head': head, 'members': members, 'hobbies': hobbies}
+        context = {'detail': fragments.detail(pk)}
+        fragments.record_view(pk)
         return render(request, 'view_family.html', context)
 
     except FamilyHead.DoesNotExist:
@@ -139,10 +114,7 @@ def update_family(request, hashid):
             member_formset = MemberFormset(request.POST, request.FILES, instance=head, prefix="members")
 
             if head_form.is_valid() and hobby_formset.is_valid() and member_formset.is_valid():
-                family_head = head_form.save()
-                hobby_formset.save()
-                member_formset.save()
-                family_head.set_status(family_head.status)
+                save_family(head_form, hobby_formset, member_formset)
                 return JsonResponse({"success": True, "message": "Family updated successfully."})
             else:
                 return JsonResponse({
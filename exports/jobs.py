@@ -0,0 +1,295 @@
+"""
+Background export jobs.
+
+An export request is recorded as an ``ExportJob`` row and handed to a local
+process pool, so the WSGI worker that received it returns immediately. The
+pool writes the artifact under ``MEDIA_ROOT/exports`` and reports progress on
+the job row, which the status endpoint polls.
+
+Every job carries a fingerprint of its kind and filter parameters and a
+version stamp of the rows it reads, made of tokens that are replaced when a
+write commits: ``family.changes.table_versions`` for whole tables (every
+write path logs to the change feed), the fragment stamp of one family
+(``family.fragments``) and the location catalogue version. Timestamps taken
+by the writers would not do, since a transaction that commits late carries
+an ``updated_at`` older than rows already counted. A new request with the
+same fingerprint reuses the existing job until the version changes.
+
+Artifacts are kept for ``EXPORT_JOB_RETENTION`` seconds; ``cleanup_exports``
+(``manage.py cleanup_exports``) deletes older jobs and their files.
+"""
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+import hashlib, json, logging, multiprocessing, os
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from family import catalogue, fragments
+from family.changes import table_versions
+from family.models import FamilyHead, FamilyMember, Hobby, State, City, statusChoice
+from family.exports import (
+    EXPORT_BATCH_SIZE, HEAD_EXPORT_COLUMNS, export_heads, iter_keyset, head_export_rows,
+    write_family_workbook,
+)
+from family.pdf import write_family_pdf, write_families_pdf
+from family.xlsx import stream_xlsx, CONTENT_TYPE as XLSX_CONTENT_TYPE
+from family.utils import decode_id
+from location.exports import write_state_workbook, write_city_workbook
+from .models import ExportJob, JobStatus
+from . import worker
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = "exports"
+
+ExportKind = namedtuple("ExportKind", ["extension", "content_type", "clean", "version", "write"])
+
+
+def _digest(*parts):
+    return hashlib.sha256(json.dumps(parts, default=str, sort_keys=True).encode()).hexdigest()
+
+
+def _search_params(params):
+    search = (params.get("search") or "").strip()
+    return {"search": search} if search else {}
+
+
+def _family_params(params):
+    hashid = params.get("hashid")
+    if not hashid:
+        raise ValueError("hashid is required.")
+    if not FamilyHead.objects.filter(pk=decode_id(hashid)).exists():
+        raise FamilyHead.DoesNotExist("Family not found.")
+    return {"hashid": str(hashid)}
+
+
+# ----------------------------- VERSIONS -----------------------------
+
+def _all_family_version(params):
+    return _digest(*table_versions(FamilyHead, FamilyMember, Hobby, State, City))
+
+
+def _one_family_version(params):
+    pk = decode_id(params["hashid"])
+    # the stamp follows the head, its members and hobbies; the catalogue its state and city names
+    return _digest(fragments.stamps([pk])[pk], catalogue.version())
+
+
+def _state_version(params):
+    return _digest(*table_versions(State))
+
+
+def _city_version(params):
+    return _digest(*table_versions(State, City))
+
+
+# ----------------------------- WRITERS -----------------------------
+
+def _load_family(params):
+    pk = decode_id(params["hashid"])
+    head = FamilyHead.objects.select_related("state", "city").get(pk=pk)
+    hobbies = Hobby.objects.filter(family_head=head, status=statusChoice.ACTIVE)
+    members = FamilyMember.objects.filter(family_head=head, status=statusChoice.ACTIVE)
+    return head, hobbies, members
+
+
+def _write_family_pdf(params, output, progress):
+    head, hobbies, members = _load_family(params)
+    progress(0, 1)
+    write_family_pdf(head, hobbies, members, output)
+    return f"{head.name}_family.pdf"
+
+
+def _write_family_excel(params, output, progress):
+    head, hobbies, members = _load_family(params)
+    progress(0, 1)
+    write_family_workbook(head, hobbies, members, output)
+    return f"{head.name}_family.xlsx"
+
+
+def _write_head_excel(params, output, progress):
+    heads = export_heads(params.get("search"))
+    total = heads.count()
+    progress(0, total)
+
+    def counted(rows):
+        for done, head in enumerate(rows, start=1):
+            if done % EXPORT_BATCH_SIZE == 0:
+                progress(done, total)
+            yield head
+
+    rows = head_export_rows(counted(iter_keyset(heads)))
+    for chunk in stream_xlsx(rows, HEAD_EXPORT_COLUMNS, sheet_title="All Family Head Report", title="All Family Head Report"):
+        output.write(chunk)
+    return "all_family_heads.xlsx"
+
+
+def _write_families_pdf(params, output, progress):
+    heads = export_heads(params.get("search"))
+    total = heads.count()
+    progress(0, total)
+
+    def counted(done):
+        if done % EXPORT_BATCH_SIZE == 0:
+            progress(done, total)
+
+    write_families_pdf(heads, output, progress=counted)
+    return "families.pdf"
+
+
+def _write_state_excel(params, output, progress):
+    states = State.objects.exclude(status=statusChoice.DELETE)
+    if params.get("search"):
+        states = states.filter(state_name__icontains=params["search"])
+    progress(0, 1)
+    write_state_workbook(states, output)
+    return "state.xlsx"
+
+
+def _write_city_excel(params, output, progress):
+    cities = City.objects.exclude(status=statusChoice.DELETE)
+    if params.get("search"):
+        search = params["search"]
+        cities = cities.filter(Q(city_name__icontains=search) | Q(state__state_name__icontains=search))
+    progress(0, 1)
+    write_city_workbook(cities, output)
+    return "city.xlsx"
+
+
+EXPORT_KINDS = {
+    "family_pdf": ExportKind(".pdf", "application/pdf", _family_params, _one_family_version, _write_family_pdf),
+    "family_excel": ExportKind(".xlsx", XLSX_CONTENT_TYPE, _family_params, _one_family_version, _write_family_excel),
+    "head_excel": ExportKind(".xlsx", XLSX_CONTENT_TYPE, _search_params, _all_family_version, _write_head_excel),
+    "families_pdf": ExportKind(".pdf", "application/pdf", _search_params, _all_family_version, _write_families_pdf),
+    "state_excel": ExportKind(".xlsx", XLSX_CONTENT_TYPE, _search_params, _state_version, _write_state_excel),
+    "city_excel": ExportKind(".xlsx", XLSX_CONTENT_TYPE, _search_params, _city_version, _write_city_excel),
+}
+
+
+# ----------------------------- QUEUE -----------------------------
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=getattr(settings, "EXPORT_JOB_WORKERS", 2),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=worker.init_worker,
+            initargs=(os.environ.get("DJANGO_SETTINGS_MODULE", "fims.settings"),),
+        )
+    return _executor
+
+
+def _submit(pk):
+    # EXPORT_JOB_WORKERS = 0 runs jobs inline in the calling process
+    if getattr(settings, "EXPORT_JOB_WORKERS", 2) == 0:
+        run_export_job(pk)
+    else:
+        get_executor().submit(worker.run_job, pk)
+
+
+def _artifact_exists(job):
+    return bool(job.file) and os.path.exists(os.path.join(settings.MEDIA_ROOT, job.file.name))
+
+
+def _retention():
+    return timedelta(seconds=getattr(settings, "EXPORT_JOB_RETENTION", 24 * 3600))
+
+
+def enqueue_export(kind, params, user=None):
+    """
+    Return a job producing the ``kind`` export for ``params``.
+
+    A finished or still-running job for the same filter and data version is
+    returned as is; otherwise a new job is created and submitted once the
+    surrounding transaction commits. Raises ``KeyError`` for an unknown kind,
+    ``ValueError`` for missing parameters and ``FamilyHead.DoesNotExist`` for
+    a family that does not exist.
+    """
+    spec = EXPORT_KINDS[kind]
+    params = spec.clean(params)
+    fingerprint = _digest(kind, params)
+    data_version = spec.version(params)
+
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=getattr(settings, "EXPORT_JOB_TIMEOUT", 1800))
+    for job in ExportJob.objects.filter(
+        fingerprint=fingerprint, data_version=data_version,
+        status__in=[JobStatus.PENDING, JobStatus.RUNNING, JobStatus.DONE],
+    ).order_by("-created_at")[:5]:
+        if job.status == JobStatus.DONE and job.finished_at >= now - _retention() and _artifact_exists(job):
+            return job
+        if job.status != JobStatus.DONE and job.updated_at >= stale_before:
+            return job
+
+    job = ExportJob.objects.create(
+        kind=kind, params=params, fingerprint=fingerprint, data_version=data_version,
+        content_type=spec.content_type,
+        requested_by=user if user is not None and user.is_authenticated else None,
+    )
+    transaction.on_commit(lambda: _submit(job.pk))
+    return job
+
+
+def run_export_job(pk):
+    job = ExportJob.objects.get(pk=pk)
+    spec = EXPORT_KINDS[job.kind]
+    ExportJob.objects.filter(pk=pk).update(status=JobStatus.RUNNING, started_at=timezone.now(), updated_at=timezone.now())
+
+    def progress(done, total):
+        ExportJob.objects.filter(pk=pk).update(progress=done, total=total, updated_at=timezone.now())
+
+    name = f"{EXPORT_DIR}/{job.job_id}{spec.extension}"
+    path = os.path.join(settings.MEDIA_ROOT, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        with open(path + ".part", "wb") as output:
+            filename = spec.write(job.params, output, progress)
+        os.replace(path + ".part", path)
+        job.refresh_from_db(fields=["total"])
+        ExportJob.objects.filter(pk=pk).update(
+            status=JobStatus.DONE, file=name, filename=filename, progress=max(job.total, 1),
+            total=max(job.total, 1), finished_at=timezone.now(), updated_at=timezone.now(),
+        )
+    except Exception as e:
+        logger.exception("Export job %s failed: %s", job.job_id, e)
+        if os.path.exists(path + ".part"):
+            os.remove(path + ".part")
+        ExportJob.objects.filter(pk=pk).update(
+            status=JobStatus.FAILED, error=str(e), finished_at=timezone.now(), updated_at=timezone.now(),
+        )
+
+
+def cleanup_exports(before=None):
+    """
+    Delete the jobs that finished (or were last updated) before ``before``,
+    ``EXPORT_JOB_RETENTION`` ago by default, with their files; returns
+    ``(jobs, files)`` removed.
+    """
+    before = before or timezone.now() - _retention()
+    expired = ExportJob.objects.filter(
+        Q(status__in=[JobStatus.DONE, JobStatus.FAILED], finished_at__lt=before) | Q(updated_at__lt=before),
+    )
+    files = 0
+    for job in expired.only("job_id", "file", "kind"):
+        paths = [os.path.join(settings.MEDIA_ROOT, job.file.name)] if job.file else []
+        spec = EXPORT_KINDS.get(job.kind)
+        if spec:
+            # a worker that died leaves its partial file behind
+            paths.append(os.path.join(settings.MEDIA_ROOT, EXPORT_DIR, f"{job.job_id}{spec.extension}.part"))
+        for path in paths:
+            try:
+                os.remove(path)
+                files += 1
+            except FileNotFoundError:
+                pass
+    jobs, _ = expired.delete()
+    return jobs, files
+
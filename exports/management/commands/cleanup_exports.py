@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from exports.jobs import cleanup_exports
+
+
+class Command(BaseCommand):
+    help = "Delete export jobs finished more than --hours ago, with their files under MEDIA_ROOT/exports."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=float, default=getattr(settings, "EXPORT_JOB_RETENTION", 24 * 3600) / 3600)
+
+    def handle(self, *args, **options):
+        jobs, files = cleanup_exports(timezone.now() - timedelta(hours=options["hours"]))
+        self.stdout.write(self.style.SUCCESS(f"Removed {jobs} export jobs and {files} files."))
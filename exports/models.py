@@ -0,0 +1,41 @@
+from django.db import models
+from django.conf import settings
+import uuid
+
+
+class JobStatus(models.TextChoices):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class ExportJob(models.Model):
+    job_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    kind = models.CharField(max_length=30)
+    params = models.JSONField(default=dict, blank=True)
+    # hash of (kind, params) and of the data the export reads; a finished job
+    # is reused while both still match
+    fingerprint = models.CharField(max_length=64)
+    data_version = models.CharField(max_length=64)
+    status = models.CharField(max_length=10, choices=JobStatus.choices, default=JobStatus.PENDING)
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    file = models.FileField(upload_to="exports", blank=True)
+    filename = models.CharField(max_length=150, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "export_job"
+        indexes = [
+            models.Index(fields=["fingerprint", "data_version"]),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} export {self.job_id} ({self.status})"
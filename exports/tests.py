@@ -0,0 +1,101 @@
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from accounts.models import CustomUser
+from family.models import State
+from .jobs import EXPORT_KINDS, cleanup_exports, enqueue_export
+from .models import ExportJob, JobStatus
+
+
+class ExportJobTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root, EXPORT_JOB_WORKERS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.state = State.objects.create(state_name="Gujarat")
+        self.client.force_login(CustomUser.objects.create_user(email="admin@example.com", password="Secret@123"))
+
+    def enqueue(self, kind="state_excel", **params):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse("enqueue_export", args=[kind]), params)
+        return response
+
+    def test_export_runs_and_downloads(self):
+        response = self.enqueue()
+        self.assertEqual(response.status_code, 202)
+
+        status = self.client.get(response.json()["job"]["status_url"]).json()["job"]
+        self.assertEqual((status["status"], status["percent"]), (JobStatus.DONE, 100))
+
+        download = self.client.get(status["download_url"])
+        self.assertEqual(download["Content-Disposition"], 'attachment; filename="state.xlsx"')
+        sheet = load_workbook(io.BytesIO(b"".join(download.streaming_content))).active
+        self.assertEqual(sheet["B3"].value, "Gujarat")
+
+    def test_finished_export_is_reused_until_the_data_changes(self):
+        first = self.enqueue().json()["job"]["job_id"]
+        self.assertEqual(self.enqueue().json()["job"]["job_id"], first)
+        # a different filter is a different export
+        self.assertNotEqual(self.enqueue(search="Guj").json()["job"]["job_id"], first)
+
+        self.state.state_name = "Gujarat State"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.state.save()
+        self.assertNotEqual(self.enqueue().json()["job"]["job_id"], first)
+
+    def test_soft_delete_changes_the_version(self):
+        job = enqueue_export("state_excel", {})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.state.soft_delete()
+        self.assertNotEqual(enqueue_export("state_excel", {}).pk, job.pk)
+
+    def test_late_commit_with_an_older_timestamp_changes_the_version(self):
+        State.objects.create(state_name="Kerala")
+        version = EXPORT_KINDS["state_excel"].version({})
+        # a transaction that took its timestamp before the newest row was written
+        with mock.patch("django.utils.timezone.now", return_value=timezone.now() - timedelta(minutes=5)):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.state.state_name = "Gujarat State"
+                self.state.save()
+        self.assertNotEqual(EXPORT_KINDS["state_excel"].version({}), version)
+
+    def test_version_check_reads_no_rows(self):
+        EXPORT_KINDS["state_excel"].version({})
+        with self.assertNumQueries(0):
+            EXPORT_KINDS["state_excel"].version({})
+
+    def test_expired_jobs_are_removed_with_their_files(self):
+        old = self.enqueue().json()["job"]["job_id"]
+        ExportJob.objects.filter(job_id=old).update(finished_at=timezone.now() - timedelta(days=2))
+        path = os.path.join(settings.MEDIA_ROOT, ExportJob.objects.get(job_id=old).file.name)
+        # an expired artifact is not reused
+        fresh = self.enqueue().json()["job"]["job_id"]
+        self.assertNotEqual(fresh, old)
+
+        call_command("cleanup_exports", stdout=io.StringIO())
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual([str(job.job_id) for job in ExportJob.objects.all()], [fresh])
+        self.assertEqual(cleanup_exports(), (0, 0))
+
+    def test_unknown_kind_and_missing_job(self):
+        self.assertEqual(self.enqueue("nothing").status_code, 404)
+        response = self.enqueue("family_pdf", hashid="999")
+        self.assertEqual((response.status_code, response.json()["errorMessage"]), (404, "Family not found."))
+        self.assertEqual(self.enqueue("family_pdf").status_code, 400)
+        response = self.client.get(reverse("export_status", args=["00000000-0000-0000-0000-000000000000"]))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse("download_export", args=["00000000-0000-0000-0000-000000000000"]))
+        self.assertRedirects(response, reverse("dashboard"), fetch_redirect_response=False)
@@ -0,0 +1,8 @@
+from django.urls import path
+from .views import *
+
+urlpatterns = [
+    path('exports/job/<uuid:job_id>/', export_status, name='export_status'),
+    path('exports/job/<uuid:job_id>/download/', download_export, name='download_export'),
+    path('exports/<str:kind>/', enqueue_export, name='enqueue_export'),
+]
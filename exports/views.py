@@ -0,0 +1,79 @@
+from django.shortcuts import redirect
+from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from django.http import JsonResponse, FileResponse
+from django.urls import reverse
+from django.conf import settings
+from django.views.decorators.http import require_POST
+import os, logging
+
+from family.models import FamilyHead
+from .models import ExportJob, JobStatus
+from .jobs import enqueue_export as enqueue_job
+
+logger = logging.getLogger(__name__)
+
+
+def job_payload(job):
+    data = {
+        "job_id": str(job.job_id),
+        "kind": job.kind,
+        "status": job.status,
+        "progress": job.progress,
+        "total": job.total,
+        "percent": round(100 * job.progress / job.total) if job.total else 0,
+        "status_url": reverse('export_status', kwargs={'job_id': job.job_id}),
+    }
+    if job.status == JobStatus.DONE:
+        data["download_url"] = reverse('download_export', kwargs={'job_id': job.job_id})
+    if job.status == JobStatus.FAILED:
+        data["errorMessage"] = "Export failed. Please try again."
+    return data
+
+
+@login_required(login_url='login_page')
+@require_POST
+def enqueue_export(request, kind):
+    try:
+        params = request.POST.dict() or request.GET.dict()
+        job = enqueue_job(kind, params, user=request.user)
+        return JsonResponse({"success": True, "job": job_payload(job)}, status=202)
+
+    except KeyError:
+        return JsonResponse({"success": False, "errorMessage": f"Unknown export '{kind}'."}, status=404)
+    except FamilyHead.DoesNotExist:
+        return JsonResponse({"success": False, "errorMessage": "Family not found."}, status=404)
+    except ValueError as e:
+        return JsonResponse({"success": False, "errorMessage": str(e) or "Invalid export parameters."}, status=400)
+    except Exception as e:
+        logger.exception("Error enqueuing %s export: %s", kind, e)
+        return JsonResponse({"success": False, "errorMessage": "Unable to start export."}, status=500)
+
+
+@login_required(login_url='login_page')
+def export_status(request, job_id):
+    try:
+        job = ExportJob.objects.get(job_id=job_id)
+        return JsonResponse({"success": True, "job": job_payload(job)})
+
+    except ExportJob.DoesNotExist:
+        return JsonResponse({"success": False, "errorMessage": "Export not found."}, status=404)
+    except Exception as e:
+        logger.exception("Error loading export status: %s", e)
+        return JsonResponse({"success": False, "errorMessage": "Unable to load export status."}, status=500)
+
+
+@login_required(login_url='login_page')
+def download_export(request, job_id):
+    try:
+        job = ExportJob.objects.get(job_id=job_id, status=JobStatus.DONE)
+        path = os.path.join(settings.MEDIA_ROOT, job.file.name)
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=job.filename, content_type=job.content_type)
+
+    except (ExportJob.DoesNotExist, FileNotFoundError):
+        messages.error(request, "Export not found or not ready yet.")
+        return redirect('dashboard')
+    except Exception as e:
+        logger.exception("Error downloading export: %s", e)
+        messages.error(request, "Error while downloading export.")
+        return redirect('dashboard')
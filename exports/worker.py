@@ -0,0 +1,24 @@
+"""
+Entry points for the export process pool.
+
+Pool workers are spawned fresh and unpickle these functions before Django is
+configured, so this module must not import models at import time.
+"""
+import os
+
+
+def init_worker(settings_module):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    import django
+    django.setup()
+
+
+def run_job(pk):
+    from django.db import close_old_connections
+    from .jobs import run_export_job
+
+    close_old_connections()
+    try:
+        run_export_job(pk)
+    finally:
+        close_old_connections()
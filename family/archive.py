@@ -0,0 +1,100 @@
+"""
+Move long soft-deleted rows out of the live tables.
+
+Rows that have been in DELETE status for longer than the cut-off are copied
+into the matching ``*_archive`` table (see ``ArchiveModel``) and removed from
+the live one in the same transaction, so the hot tables and their indexes
+only hold live data. A deleted head is archived together with all of its
+hobbies and members; a deleted city or state stays until no live row refers
+to it any more.
+
+The dashboard counters and export versions only look at non-deleted rows,
+so archiving does not change either. The archived rows keep their photo
+names, but the references are released (``family.photos``), so the files can
+be reclaimed once no live row uses them.
+"""
+from django.db import transaction
+
+from . import photos
+from .models import (
+    State, City, FamilyHead, Hobby, FamilyMember, statusChoice,
+    StateArchive, CityArchive, FamilyHeadArchive, HobbyArchive, FamilyMemberArchive,
+)
+
+ARCHIVE_BATCH_SIZE = 500
+
+
+def _copy(queryset, archive_model):
+    fields = [field.attname for field in archive_model._meta.concrete_fields if field.name != "archived_at"]
+    rows = [archive_model(**values) for values in queryset.values(*fields)]
+    archive_model.objects.bulk_create(rows, ignore_conflicts=True)
+    return len(rows)
+
+
+def _expired(model, before):
+    return model.all_objects.filter(status=statusChoice.DELETE, updated_at__lt=before)
+
+
+def _batches(queryset, batch_size):
+    while True:
+        ids = list(queryset.order_by("id").values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return
+        yield ids
+
+
+def _archive_heads(before, batch_size, totals):
+    for ids in _batches(_expired(FamilyHead, before), batch_size):
+        with transaction.atomic():
+            totals["hobbies"] += _copy(Hobby.all_objects.filter(family_head_id__in=ids), HobbyArchive)
+            totals["members"] += _copy(FamilyMember.all_objects.filter(family_head_id__in=ids), FamilyMemberArchive)
+            totals["heads"] += _copy(FamilyHead.all_objects.filter(id__in=ids), FamilyHeadArchive)
+            photos.release(FamilyMember.all_objects.filter(family_head_id__in=ids))
+            photos.release(FamilyHead.all_objects.filter(id__in=ids))
+            # cascades to the hobbies, members and search index rows
+            FamilyHead.all_objects.filter(id__in=ids).delete()
+
+
+def _archive_rows(queryset, model, archive_model, key, batch_size, totals):
+    for ids in _batches(queryset, batch_size):
+        with transaction.atomic():
+            totals[key] += _copy(model.all_objects.filter(id__in=ids), archive_model)
+            if model.photo_field:
+                photos.release(model.all_objects.filter(id__in=ids))
+            model.all_objects.filter(id__in=ids).delete()
+
+
+def archive_deleted(before, batch_size=ARCHIVE_BATCH_SIZE):
+    """Archive rows deleted before ``before``; returns ``{table: rows archived}``."""
+    totals = dict.fromkeys(("heads", "hobbies", "members", "cities", "states"), 0)
+    _archive_heads(before, batch_size, totals)
+    # children deleted on their own from a family that is still live
+    _archive_rows(_expired(Hobby, before), Hobby, HobbyArchive, "hobbies", batch_size, totals)
+    _archive_rows(_expired(FamilyMember, before), FamilyMember, FamilyMemberArchive, "members", batch_size, totals)
+    _archive_rows(
+        _expired(City, before).filter(familyhead=None),
+        City, CityArchive, "cities", batch_size, totals,
+    )
+    _archive_rows(
+        _expired(State, before).filter(city=None, familyhead=None),
+        State, StateArchive, "states", batch_size, totals,
+    )
+    return totals
+
+
+def pending(before):
+    """
+    Rows ``archive_deleted(before)`` would move, without touching anything.
+
+    States whose cities only become archivable in the same run are not counted.
+    """
+    heads = _expired(FamilyHead, before)
+    return {
+        "heads": heads.count(),
+        "hobbies": Hobby.all_objects.filter(family_head__in=heads).count()
+        + _expired(Hobby, before).exclude(family_head__in=heads).count(),
+        "members": FamilyMember.all_objects.filter(family_head__in=heads).count()
+        + _expired(FamilyMember, before).exclude(family_head__in=heads).count(),
+        "cities": _expired(City, before).filter(familyhead=None).count(),
+        "states": _expired(State, before).filter(city=None, familyhead=None).count(),
+    }
@@ -0,0 +1,119 @@
+"""
+Set-based cascading soft delete.
+
+Deleting a state, city or family propagates the status change down the tree
+with a handful of ``UPDATE ... WHERE <parent> IN (...)`` statements inside a
+single transaction, however many rows are affected:
+
+* state  -> its cities DELETE, its families INACTIVE
+* city   -> its families INACTIVE
+* family (set INACTIVE above) -> its active members and hobbies INACTIVE
+* family (deleted)            -> its members and hobbies DELETE
+
+Child rows are selected with a subquery on the parent ids rather than a join,
+so MySQL does not have to materialise the id list first. The dashboard
+counters are adjusted from the row counts the updates return, every changed
+row is written to the change log with one ``INSERT ... SELECT`` per update,
+and the location catalogue is invalidated when states or cities change
+(which also retires every cached family fragment, see ``family.fragments``).
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from . import catalogue, counters, fragments
+from .changes import log_queryset
+from .models import State, City, FamilyHead, FamilyMember, Hobby, ChangeAction, statusChoice
+
+
+def _set_status(queryset, status, now):
+    action = ChangeAction.DELETE if status == statusChoice.DELETE else ChangeAction.UPDATE
+    log_queryset(queryset, action, now)
+    return queryset.update(status=status, updated_at=now)
+
+
+def _live_ids(model, ids):
+    return list(model.objects.filter(pk__in=ids).values_list("id", flat=True))
+
+
+def _deactivate_families(heads, now, result):
+    # children first: the subquery still sees the heads as they were
+    head_ids = heads.values("id")
+    result["members"] += _set_status(
+        FamilyMember.objects.filter(family_head__in=head_ids, status=statusChoice.ACTIVE),
+        statusChoice.INACTIVE, now,
+    )
+    result["hobbies"] += _set_status(
+        Hobby.objects.filter(family_head__in=head_ids, status=statusChoice.ACTIVE),
+        statusChoice.INACTIVE, now,
+    )
+    result["heads"] += _set_status(heads.filter(status=statusChoice.ACTIVE), statusChoice.INACTIVE, now)
+
+
+def soft_delete_states(ids):
+    """
+    Soft delete the states ``ids`` and cascade to their cities and families.
+
+    Returns the number of rows changed per table.
+    """
+    result = defaultdict(int)
+    now = timezone.now()
+    with transaction.atomic():
+        ids = _live_ids(State, ids)
+        if not ids:
+            return dict(result)
+        states = State.objects.filter(pk__in=ids)
+        by_status = dict(states.order_by().values("status").annotate(n=Count("id")).values_list("status", "n"))
+
+        result["states"] = _set_status(states, statusChoice.DELETE, now)
+        result["cities"] = _set_status(City.objects.filter(state_id__in=ids), statusChoice.DELETE, now)
+        _deactivate_families(FamilyHead.objects.filter(state_id__in=ids), now, result)
+
+        counters.add({
+            counters.STATES: -result["states"],
+            counters.STATES_ACTIVE: -by_status.get(statusChoice.ACTIVE, 0),
+            counters.STATES_INACTIVE: -by_status.get(statusChoice.INACTIVE, 0),
+            counters.CITIES: -result["cities"],
+        })
+        catalogue.invalidate()
+    return dict(result)
+
+
+def soft_delete_cities(ids):
+    """Soft delete the cities ``ids`` and set their families INACTIVE."""
+    result = defaultdict(int)
+    now = timezone.now()
+    with transaction.atomic():
+        ids = _live_ids(City, ids)
+        if not ids:
+            return dict(result)
+        result["cities"] = _set_status(City.objects.filter(pk__in=ids), statusChoice.DELETE, now)
+        _deactivate_families(FamilyHead.objects.filter(city_id__in=ids), now, result)
+        counters.add({counters.CITIES: -result["cities"]})
+        catalogue.invalidate()
+    return dict(result)
+
+
+def soft_delete_heads(ids):
+    """Soft delete the families ``ids`` together with their members and hobbies."""
+    result = defaultdict(int)
+    now = timezone.now()
+    with transaction.atomic():
+        ids = _live_ids(FamilyHead, ids)
+        if not ids:
+            return dict(result)
+        heads = FamilyHead.objects.filter(pk__in=ids)
+        per_state = heads.exclude(state=None).order_by().values("state").annotate(n=Count("id")).values_list("state", "n")
+        deltas = {f"{counters.STATE_HEADS}{state_id}": -n for state_id, n in per_state}
+
+        result["members"] = _set_status(FamilyMember.objects.filter(family_head_id__in=ids), statusChoice.DELETE, now)
+        result["hobbies"] = _set_status(Hobby.objects.filter(family_head_id__in=ids), statusChoice.DELETE, now)
+        result["heads"] = _set_status(heads, statusChoice.DELETE, now)
+
+        deltas[counters.HEADS] = -result["heads"]
+        deltas[counters.MEMBERS] = -result["members"]
+        counters.add(deltas)
+        fragments.bump(ids)
+    return dict(result)
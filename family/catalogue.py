@@ -0,0 +1,111 @@
+"""
+Cached state -> city catalogue.
+
+The states with their active cities are built once into a JSON
+document and kept in the ``locations`` cache namespace (``fims.cache``).
+Saving or soft deleting a ``State``/``City`` starts a new generation of the
+namespace (see ``family.signals`` and ``family.cascade``), so the next
+request rebuilds the document; concurrent requests wait for that one
+rebuild instead of running their own. The ETag is a
+hash of the document itself, so it changes exactly when the content does.
+
+``adocument()``/``acities_for_state()`` are the same lookups for async views:
+they use the async cache API and build the document with the async ORM.
+
+The generation token must live in a cache shared by all processes for the
+invalidation to reach them; entries also expire after
+``LOCATION_CATALOGUE_TIMEOUT`` seconds as a safety net.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+
+from fims.cache import Namespace
+
+from .models import State, City, statusChoice
+
+LOCATIONS = Namespace("locations")
+
+
+def _timeout():
+    return getattr(settings, "LOCATION_CATALOGUE_TIMEOUT", 3600)
+
+
+def version():
+    return LOCATIONS.version()
+
+
+def invalidate():
+    """Start a new catalogue version once the current transaction commits."""
+    LOCATIONS.invalidate()
+
+
+def _city_rows():
+    return City.objects.filter(status=statusChoice.ACTIVE).order_by("city_name").values_list("id", "state_id", "city_name")
+
+
+def _state_rows():
+    return State.objects.order_by("state_name").values_list("id", "state_name", "status")
+
+
+def _assemble(city_rows, state_rows):
+    cities = {}
+    for city_id, state_id, city_name in city_rows:
+        cities.setdefault(state_id, []).append({"id": city_id, "city_name": city_name})
+    states = [
+        {"id": state_id, "state_name": state_name, "status": status, "cities": cities.get(state_id, [])}
+        for state_id, state_name, status in state_rows
+    ]
+    return {"states": states}
+
+
+def build():
+    return _assemble(_city_rows(), _state_rows())
+
+
+async def abuild():
+    return _assemble([row async for row in _city_rows()], [row async for row in _state_rows()])
+
+
+def _pack(data):
+    body = json.dumps(data, separators=(",", ":"))
+    cities = {state["id"]: state["cities"] for state in data["states"]}
+    return body, '"%s"' % hashlib.sha1(body.encode()).hexdigest(), cities
+
+
+def _entry():
+    return LOCATIONS.get_or_set(["catalogue"], lambda: _pack(build()), _timeout())
+
+
+async def aversion():
+    return await LOCATIONS.aversion()
+
+
+async def _aentry():
+    async def compute():
+        return _pack(await abuild())
+
+    return await LOCATIONS.aget_or_set(["catalogue"], compute, _timeout())
+
+
+def document():
+    """``(json_body, etag)`` of the current catalogue."""
+    body, etag, _ = _entry()
+    return body, etag
+
+
+def cities_for_state(state_id):
+    """``[{'id', 'city_name'}]`` of the active cities of a state."""
+    return _entry()[2].get(state_id, [])
+
+
+async def adocument():
+    body, etag, _ = await _aentry()
+    return body, etag
+
+
+async def acities_for_state(state_id):
+    """``(cities, etag)``; the etag is the catalogue's, as for ``get_cities``."""
+    _, etag, cities = await _aentry()
+    return cities.get(state_id, []), etag
@@ -0,0 +1,159 @@
+"""
+Incremental change feed.
+
+Every create, update and soft delete of a state, city, family head, member or
+hobby appends a ``ChangeLog`` row in the same transaction as the change:
+
+* ``save()`` through the ``post_save`` receivers in ``family.signals``;
+* the bulk paths (``family.cascade``, ``family.importer``) through
+  ``log_queryset``, one ``INSERT ... SELECT`` per table.
+
+``feed(since)`` returns the entries after the ``since`` sequence number,
+each with the row as it is now (``None`` once it has been archived), ready
+to be written as NDJSON. Sequence numbers are handed out at insert time, not
+at commit, so a long transaction (a cascade, an import batch) can commit
+entries below a ``seq`` a reader has already seen. The feed therefore stops
+at the first gap in ``seq`` until the gap is resolved:
+
+* on MySQL a ``FOR UPDATE NOWAIT`` read of the missing numbers fails while
+  an uncommitted transaction holds them, and finds nothing once they are
+  gone for good (a rollback, or auto-increment values InnoDB skipped);
+* elsewhere the gap is waited out for ``CHANGE_FEED_GAP_TIMEOUT`` seconds
+  after the entry that follows it was written; numbers below the oldest
+  entry still kept count as pruned.
+
+Because every write logs an entry, ``table_versions`` can hand out a token
+per table that is replaced when such a transaction commits; readers that
+cache derived data (``exports.jobs``) key on it.
+"""
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from fims.cache import Namespace
+
+from .models import ChangeAction, ChangeLog, State, City, FamilyHead, FamilyMember, Hobby, statusChoice
+
+TRACKED_MODELS = (State, City, FamilyHead, FamilyMember, Hobby)
+MODELS_BY_TABLE = {model._meta.db_table: model for model in TRACKED_MODELS}
+# a generation per table, started when a transaction that logged a change to it commits
+TABLE_VERSIONS = {table: Namespace(f"changes:{table}") for table in MODELS_BY_TABLE}
+FEED_BATCH_SIZE = 1000
+FEED_LIMIT = 10000
+
+
+def action_for(instance, created):
+    if created:
+        return ChangeAction.CREATE
+    if instance.status == statusChoice.DELETE:
+        return ChangeAction.DELETE
+    return ChangeAction.UPDATE
+
+
+def table_versions(*models):
+    """Tokens that change whenever a write to one of the tables of ``models`` commits."""
+    return [TABLE_VERSIONS[model._meta.db_table].version() for model in models]
+
+
+def touch(*models):
+    """Replace the ``table_versions`` of ``models`` after a write that logs no entries (a hard delete)."""
+    for model in models:
+        TABLE_VERSIONS[model._meta.db_table].invalidate()
+
+
+def log_change(instance, action):
+    ChangeLog.objects.create(
+        table_name=instance._meta.db_table, row_id=instance.pk, action=action, changed_at=timezone.now(),
+    )
+    TABLE_VERSIONS[instance._meta.db_table].invalidate()
+
+
+def log_queryset(queryset, action, now=None):
+    """Log every row of ``queryset`` with one ``INSERT ... SELECT``; call it before updating them."""
+    now = now or timezone.now()
+    select_sql, params = queryset.order_by().values("id").query.sql_with_params()
+    quote = connection.ops.quote_name
+    changed_at = ChangeLog._meta.get_field("changed_at").get_db_prep_value(now, connection)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote(ChangeLog._meta.db_table)} "
+            f"({quote('table_name')}, {quote('row_id')}, {quote('action')}, {quote('changed_at')}) "
+            f"SELECT %s, {quote('changed')}.{quote('id')}, %s, %s FROM ({select_sql}) {quote('changed')}",
+            [queryset.model._meta.db_table, action, changed_at, *params],
+        )
+    TABLE_VERSIONS[queryset.model._meta.db_table].invalidate()
+
+
+def _gap_timeout():
+    return timedelta(seconds=getattr(settings, "CHANGE_FEED_GAP_TIMEOUT", 3600))
+
+
+def _gap_open(since, entry):
+    """Whether the numbers between ``since`` and ``entry.seq`` may still be committed."""
+    if connection.vendor == "mysql":
+        # an InnoDB locking read conflicts with rows inserted by transactions still in flight
+        try:
+            with transaction.atomic():
+                gap = ChangeLog.objects.select_for_update(nowait=True).filter(seq__gt=since, seq__lt=entry.seq)
+                # rows committed since the batch was read are picked up by the next one
+                return bool(list(gap.values_list("seq", flat=True)[:1]))
+        except DatabaseError:
+            return True
+    if not ChangeLog.objects.filter(seq__lte=since).exists():
+        # below the oldest entry kept: pruned, nothing to wait for
+        return False
+    return entry.changed_at > timezone.now() - _gap_timeout()
+
+
+def _ready(since, entries):
+    """The leading ``entries`` that no open gap in ``seq`` precedes."""
+    ready = []
+    for entry in entries:
+        if entry.seq > since + 1 and _gap_open(since, entry):
+            break
+        ready.append(entry)
+        since = entry.seq
+    return ready
+
+
+def feed(since=0, limit=FEED_LIMIT, batch_size=FEED_BATCH_SIZE):
+    """Yield ``{'seq', 'table', 'id', 'action', 'changed_at', 'data'}`` in sequence order."""
+    remaining = limit
+    while remaining > 0:
+        entries = list(ChangeLog.objects.filter(seq__gt=since).order_by("seq")[:min(batch_size, remaining)])
+        if not entries:
+            return
+        ready = _ready(since, entries)
+        rows = {}
+        for table, model in MODELS_BY_TABLE.items():
+            ids = {entry.row_id for entry in ready if entry.table_name == table}
+            if ids:
+                rows[table] = {row["id"]: row for row in model.all_objects.filter(pk__in=ids).values()}
+        for entry in ready:
+            yield {
+                "seq": entry.seq,
+                "table": entry.table_name,
+                "id": entry.row_id,
+                "action": entry.action,
+                "changed_at": entry.changed_at,
+                "data": rows.get(entry.table_name, {}).get(entry.row_id),
+            }
+        if len(ready) < len(entries):
+            return
+        since = entries[-1].seq
+        remaining -= len(entries)
+
+
+def ndjson(changes):
+    for change in changes:
+        yield json.dumps(change, cls=DjangoJSONEncoder) + "\n"
+
+
+def prune(before):
+    """Delete log entries older than ``before``; returns the number removed."""
+    deleted, _ = ChangeLog.objects.filter(changed_at__lt=before).delete()
+    return deleted
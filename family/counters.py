@@ -0,0 +1,141 @@
+"""
+Materialised dashboard counters.
+
+The dashboard totals live in ``DashboardCounter`` rows that are adjusted in
+the same transaction as the change that affects them:
+
+* ``BaseModel.save`` compares the status (and, for heads, the state) loaded
+  from the database with the saved values and applies the difference;
+* the set-based cascades in ``family.cascade`` apply the row counts their
+  bulk ``update()`` calls return.
+
+Writes that bypass both (raw SQL, ``QuerySet.delete()``) drift the counters
+until ``manage.py rebuild_dashboard_counters`` is run.
+"""
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import DashboardCounter, FamilyHead, FamilyMember, State, City, statusChoice
+
+HEADS = "heads"
+MEMBERS = "members"
+STATES = "states"
+CITIES = "cities"
+STATES_ACTIVE = "states_active"
+STATES_INACTIVE = "states_inactive"
+STATE_HEADS = "state_heads:"
+
+MODEL_COUNTERS = {
+    FamilyHead: HEADS,
+    FamilyMember: MEMBERS,
+    State: STATES,
+    City: CITIES,
+}
+
+
+def _counted(status):
+    return status is not None and status != statusChoice.DELETE
+
+
+def add(deltas):
+    """Apply ``{counter name: delta}``, creating counters that do not exist yet."""
+    for name, delta in deltas.items():
+        if not delta:
+            continue
+        if DashboardCounter.objects.filter(name=name).update(value=F("value") + delta):
+            continue
+        try:
+            with transaction.atomic():
+                DashboardCounter.objects.create(name=name, value=delta)
+        except IntegrityError:
+            DashboardCounter.objects.filter(name=name).update(value=F("value") + delta)
+
+
+def record_change(instance, previous, current):
+    """
+    Update the counters for ``instance`` moving from ``previous`` to ``current``.
+
+    Both are dicts of the tracked fields (see ``BaseModel.counter_state``);
+    ``previous`` is ``None`` for a newly created row.
+    """
+    name = MODEL_COUNTERS.get(type(instance))
+    if name is None:
+        return
+    old_status = previous["status"] if previous else None
+    new_status = current["status"]
+    if previous and old_status is None:
+        # status was deferred when the row was loaded; nothing reliable to diff
+        return
+
+    deltas = defaultdict(int)
+    was, now = _counted(old_status), _counted(new_status)
+    if was != now:
+        deltas[name] += 1 if now else -1
+
+    if isinstance(instance, State):
+        for status, counter in ((statusChoice.ACTIVE, STATES_ACTIVE), (statusChoice.INACTIVE, STATES_INACTIVE)):
+            deltas[counter] += (new_status == status) - (old_status == status)
+
+    if isinstance(instance, FamilyHead):
+        old_state = previous.get("state_id") if previous else None
+        new_state = current.get("state_id")
+        if was and old_state:
+            deltas[f"{STATE_HEADS}{old_state}"] -= 1
+        if now and new_state:
+            deltas[f"{STATE_HEADS}{new_state}"] += 1
+
+    add(deltas)
+
+
+def snapshot():
+    """All scalar counters as a dict, in one query."""
+    values = dict(
+        DashboardCounter.objects.exclude(name__startswith=STATE_HEADS).values_list("name", "value")
+    )
+    return {name: values.get(name, 0) for name in (HEADS, MEMBERS, STATES, CITIES, STATES_ACTIVE, STATES_INACTIVE)}
+
+
+def top_states(limit=5):
+    """``[{'state_name', 'total'}]`` for the states with the most families."""
+    rows = list(
+        DashboardCounter.objects.filter(name__startswith=STATE_HEADS, value__gt=0)
+        .order_by("-value")
+        .values_list("name", "value")[:limit]
+    )
+    states = State.objects.in_bulk([int(name[len(STATE_HEADS):]) for name, _ in rows])
+    return [
+        {"state_name": states[pk].state_name, "total": value}
+        for pk, value in ((int(name[len(STATE_HEADS):]), value) for name, value in rows)
+        if pk in states
+    ]
+
+
+def compute():
+    """Counter values computed from the tables."""
+    values = {
+        HEADS: FamilyHead.objects.exclude(status=statusChoice.DELETE).count(),
+        MEMBERS: FamilyMember.objects.exclude(status=statusChoice.DELETE).count(),
+        STATES: State.objects.exclude(status=statusChoice.DELETE).count(),
+        CITIES: City.objects.exclude(status=statusChoice.DELETE).count(),
+        STATES_ACTIVE: State.objects.filter(status=statusChoice.ACTIVE).count(),
+        STATES_INACTIVE: State.objects.filter(status=statusChoice.INACTIVE).count(),
+    }
+    per_state = (
+        FamilyHead.objects.exclude(status=statusChoice.DELETE).exclude(state=None)
+        .values("state").annotate(total=Count("id")).values_list("state", "total")
+    )
+    for state_id, total in per_state:
+        values[f"{STATE_HEADS}{state_id}"] = total
+    return values
+
+
+@transaction.atomic
+def rebuild():
+    values = compute()
+    DashboardCounter.objects.all().delete()
+    DashboardCounter.objects.bulk_create(
+        [DashboardCounter(name=name, value=value) for name, value in values.items()]
+    )
+    return values
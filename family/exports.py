@@ -0,0 +1,121 @@
+"""
+Report builders shared by the family export views and background export jobs.
+
+The single-family Excel writer takes any writable file object, so the same
+code serves both the synchronous views (writing into the ``HttpResponse``)
+and background export jobs (writing into a file). The PDF reports live in
+``family.pdf``.
+
+Heads are read in keyset-ordered batches (``id > last_id``) with their state,
+city, active hobbies and active members fetched alongside, so an export of the
+whole table runs a fixed number of queries per batch instead of two per head.
+"""
+from django.db.models import Prefetch
+
+from openpyxl import Workbook
+from openpyxl.styles import PatternFill, Font, Alignment
+from openpyxl.drawing.image import Image as ExcelImage
+
+from .models import FamilyHead, FamilyMember, Hobby, statusChoice
+from .search import filter_heads
+from .images import rendition_path
+
+import os, logging
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_SIZE = 500
+
+HEAD_EXPORT_COLUMNS = [
+    'Sr. No.', 'Member ID', 'Name', 'Surname', 'Birth Date', 'Mobile No',
+    'Address', 'State', 'City', 'Pincode', 'Marital Status', 'Wedding Date',
+    'Education', 'Relation', 'Photo', 'Hobbies', 'Head ID'
+]
+
+
+def export_heads(search=None):
+    heads = FamilyHead.objects.exclude(status=statusChoice.DELETE)
+    if search:
+        heads = filter_heads(heads, search)
+    return heads.select_related('state', 'city').prefetch_related(
+        Prefetch('hobbies', queryset=Hobby.objects.filter(status=statusChoice.ACTIVE).order_by('id'), to_attr='active_hobbies'),
+        Prefetch('members', queryset=FamilyMember.objects.filter(status=statusChoice.ACTIVE).order_by('id'), to_attr='active_members'),
+    )
+
+
+def iter_keyset(queryset, batch_size=EXPORT_BATCH_SIZE):
+    """Iterate ``queryset`` in primary-key order, one ``batch_size`` slice at a time."""
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id).order_by('id')[:batch_size])
+        if not batch:
+            return
+        yield from batch
+        last_id = batch[-1].id
+
+
+def head_export_rows(heads):
+    """Yield the head row followed by its member rows for every head in ``heads``."""
+    for i, head in enumerate(heads, start=1):
+        yield [
+            i, "", head.name, head.surname, head.dob, head.mobno, head.address,
+            head.state.state_name if head.state else "", head.city.city_name if head.city else "",
+            head.pincode, head.marital_status, head.wedding_date, "", "Head",
+            str(head.photo), ", ".join(h.hobby for h in head.active_hobbies), head.id
+        ]
+        for j, m in enumerate(head.active_members, start=1):
+            yield [
+                "", j, m.member_name, "", m.member_dob, "-", "", "", "", "",
+                m.member_marital, m.member_wedDate, m.education,
+                "Member", str(m.member_photo), "", head.id
+            ]
+
+
+def write_family_workbook(head, hobbies, members, output):
+    workbook = Workbook()
+    worksheet = workbook.active
+    worksheet.title = 'Family Report'
+
+    worksheet.merge_cells('A1:L1')
+    worksheet['A1'].value = "Family Report"
+    worksheet['A1'].fill = PatternFill("solid", fgColor="246ba1")
+    worksheet['A1'].font = Font(bold=True, color="F7F6FA")
+    worksheet['A1'].alignment = Alignment(horizontal="center")
+
+    columns = ['Name', 'Surname', 'Birth Date', 'Mobile No', 'Address', 'State', 'City',
+               'Pincode', 'Marital Status', 'Wedding Date', 'Photo', 'Hobbies']
+    worksheet.append(columns)
+
+    hobbies_str = ", ".join([h.hobby for h in hobbies])
+    worksheet.append([
+        head.name, head.surname, str(head.dob), head.mobno, head.address,
+        head.state.state_name, head.city.city_name, head.pincode,
+        head.marital_status, str(head.wedding_date), str(head.photo), hobbies_str
+    ])
+
+    # Add head image
+    if head.photo and hasattr(head.photo, 'path') and os.path.exists(head.photo.path):
+        try:
+            img = ExcelImage(rendition_path(head.photo, 'thumb'))
+            img.width, img.height = 50, 50
+            worksheet.add_image(img, 'K3')
+        except Exception as img_error:
+            logger.warning("Error adding head image in Excel: %s", img_error)
+
+    # Add member rows
+    worksheet.append(['', 'Member Details'])
+    worksheet.append(['Sr. No.', 'Name', 'Birth Date', 'Marital Status', 'Wedding Date', 'Education', 'Photo'])
+    for i, m in enumerate(members, start=1):
+        worksheet.append([
+            i, m.member_name, str(m.member_dob), m.member_marital,
+            str(m.member_wedDate), m.education, str(m.member_photo)
+        ])
+        if m.member_photo and hasattr(m.member_photo, 'path') and os.path.exists(m.member_photo.path):
+            try:
+                img = ExcelImage(rendition_path(m.member_photo, 'thumb'))
+                img.width, img.height = 50, 50
+                worksheet.add_image(img, f'G{worksheet.max_row}')
+            except Exception as img_error:
+                logger.warning("Error adding member image in Excel: %s", img_error)
+
+    workbook.save(output)
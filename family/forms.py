@@ -1,9 +1,136 @@
 from django import forms
 from django.forms import ModelForm, inlineformset_factory, BaseInlineFormSet
 from .models import FamilyHead, City, Hobby, FamilyMember, statusChoice
+from .catalogue import cities_for_state
 import re
 from datetime import datetime, date
 
+def _photo_error(photo):
+    filename = getattr(photo, 'name', photo)
+    if not re.search(r'\.(jpg|png)$', filename, re.IGNORECASE):
+        return 'Only JPG, PNG allowed.'
+    # size can only be checked on uploads, not on names of files already stored
+    if hasattr(photo, 'seek'):
+        photo.seek(0, 2)
+        size_kb = photo.tell() / 1000 / 1000
+        photo.seek(0)
+        if size_kb > 2:
+            return 'Photo size must be less than 2 MB.'
+    return None
+
+
+def validate_head(data):
+    """
+    Family head rules shared by ``FamilyHeadForm`` and the bulk importer.
+
+    ``data`` holds cleaned values (``state``/``city`` as objects or ids,
+    ``photo`` as an upload or a stored file name). Returns ``{field: message}``.
+    """
+    errors = {}
+    # name
+    name = data.get('name')
+    if not name:
+        errors['name'] = 'Name is required.'
+    elif len(name) < 3:
+        errors['name'] = 'Name must be at least 3 characters.'
+    elif re.search(r'\d', name):
+        errors['name'] = 'Name cannot contain numbers.'
+    # surname
+    surname = data.get('surname')
+    if not surname:
+        errors['surname'] = 'Surname is required.'
+    elif len(surname) < 3:
+        errors['surname'] = 'Surname must be at least 3 characters.'
+    elif re.search(r'\d', surname):
+        errors['surname'] = 'Surname cannot contain numbers.'
+    # dob
+    dob = data.get('dob')
+    if not dob:
+        errors['dob'] = 'Date of Birth is required.'
+    else:
+        age = (datetime.now().date() - dob).days // 365
+        if age < 21:
+            errors['dob'] = 'Age must be at least 21 years old.'
+    # mob no
+    mobno = data.get('mobno')
+    if not mobno:
+        errors['mobno'] = 'Mobile No. is required.'
+    elif not re.match(r"^[0-9]{10}$", mobno):
+        errors['mobno'] = 'Mobile number must be exactly 10 digits.'
+    # address
+    if not data.get('address'):
+        errors['address'] = 'Address is required.'
+    # state
+    if not data.get('state'):
+        errors['state'] = 'State is required.'
+    # city
+    if not data.get('city'):
+        errors['city'] = 'City is required.'
+    # pincode
+    pincode = data.get('pincode')
+    if not pincode:
+        errors['pincode'] = 'Pincode is required.'
+    elif not re.match(r"^[0-9]{6}$", pincode):
+        errors['pincode'] = 'Pincode must be exactly 6 digits.'
+    # marital status
+    marital_status = data.get('marital_status')
+    if not marital_status:
+        errors['marital_status'] = 'Please select Marital Status'
+    # wedding date
+    if marital_status == 'Married' and not data.get('wedding_date'):
+        errors['wedding_date'] = 'Wedding date is required.'
+    # photo
+    photo = data.get('photo')
+    if not photo:
+        errors['photo'] = 'Photo is required.'
+    else:
+        photo_error = _photo_error(photo)
+        if photo_error:
+            errors['photo'] = photo_error
+    return errors
+
+
+def validate_member(data):
+    """Family member rules shared by ``MemberInlineFormSet`` and the bulk importer."""
+    errors = {}
+    # member_name
+    member_name = data.get('member_name')
+    if not member_name:
+        errors['member_name'] = 'Name is required.'
+    elif len(member_name) < 3:
+        errors['member_name'] = 'Name must be at least 3 characters.'
+    elif re.search(r'\d', member_name):
+        errors['member_name'] = 'Name cannot contain numbers.'
+    # member_dob
+    if not data.get('member_dob'):
+        errors['member_dob'] = 'Date of Birth is required.'
+    # marital status
+    member_marital = data.get('member_marital')
+    if not member_marital:
+        errors['member_marital'] = 'Please select Marital Status'
+    # member wed date
+    if member_marital == 'Married' and not data.get('member_wedDate'):
+        errors['member_wedDate'] = 'Wedding date is required if married.'
+    # photo
+    member_photo = data.get('member_photo')
+    if member_photo:
+        photo_error = _photo_error(member_photo)
+        if photo_error:
+            errors['member_photo'] = photo_error
+    return errors
+
+
+def validate_hobbies(hobbies):
+    """Hobby rules of ``HobbyInlineFormSet`` for a plain list of names; returns a list of messages."""
+    errors = []
+    hobbies = [hobby for hobby in hobbies if hobby]
+    if not hobbies:
+        errors.append("At least one hobby is required.")
+    elif len(set(hobbies)) != len(hobbies):
+        errors.append('Duplicate hobbies are not allowed.')
+    return errors
+
+
 class FamilyHeadForm(ModelForm):
     class Meta:
         model = FamilyHead
@@ -27,77 +154,8 @@ class FamilyHeadForm(ModelForm):
 
     def clean(self):
         cleaned_data = super().clean()
-        # name
-        name = self.cleaned_data.get('name')
-        if not name:
-            self.add_error('name','Name is required.')
-        elif len(name) < 3:
-            self.add_error('name', 'Name must be at least 3 characters.')
-        elif re.search(r'\d', name):
-            self.add_error('name', 'Name cannot contain numbers.')
-        # surname
-        surname = self.cleaned_data.get('surname')
-        if not surname:
-            self.add_error('surname','Surname is required.')
-        elif len(surname) < 3:
-            self.add_error('surname', 'Surname must be at least 3 characters.')
-        elif re.search(r'\d', surname):
-            self.add_error('surname', 'Surname cannot contain numbers.')
-        # dob
-        dob = self.cleaned_data.get('dob')
-        if not dob:
-            self.add_error('dob', 'Date of Birth is required.')
-        else:
-            # birth_date = datetime.strptime(dob, "%Y-%m-%d")
-            age = (datetime.now().date() - dob).days // 365
-            if age < 21:
-                self.add_error('dob', 'Age must be at least 21 years old.')
-        # mob no
-        mobno = self.cleaned_data.get('mobno')
-        if not mobno:
-            self.add_error('mobno', 'Mobile No. is required.')
-        elif not re.match(r"^[0-9]{10}$", mobno):
-            self.add_error('mobno', 'Mobile number must be exactly 10 digits.')
-        # address
-        address = self.cleaned_data.get('address')
-        if not address:
-            self.add_error('address', 'Address is required.')
-        # state
-        state = self.cleaned_data.get('state')
-        if not state:
-            self.add_error('state', 'State is required.')
-        # city
-        city = self.cleaned_data.get('city')
-        if not city:
-            self.add_error('city', 'City is required.')
-        # pincode
-        pincode = self.cleaned_data.get('pincode')
-        if not pincode:
-            self.add_error('pincode', 'Pincode is required.')
-        elif not re.match(r"^[0-9]{6}$", pincode):
-            self.add_error('pincode', 'Pincode must be exactly 6 digits.')
-        # marital status
-        marital_status = self.cleaned_data.get('marital_status')
-        if not marital_status:
-            self.add_error('marital_status', 'Please select Marital Status')
-        # wedding date
-        wedding_date = self.cleaned_data.get('wedding_date')
-        if marital_status == 'Married' and not wedding_date:
-            self.add_error('wedding_date', 'Wedding date is required.')
-        # photo
-        photo = self.cleaned_data.get('photo')
-        if not photo:
-            self.add_error('photo', 'Photo is required.')
-        else:
-            filename = photo.name
-            if not re.search(r'\.(jpg|png)$', filename, re.IGNORECASE):
-                self.add_error('photo', 'Only JPG, PNG allowed.')
-            else:
-                photo.seek(0, 2)
-                size_kb = photo.tell() / 1000 / 1000
-                photo.seek(0)
-                if size_kb > 2:
-                    self.add_error('photo', 'Photo size must be less than 2 MB.')
+        for field, error in validate_head(cleaned_data).items():
+            self.add_error(field, error)
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -112,14 +170,21 @@ class FamilyHeadForm(ModelForm):
         self.fields['photo'].required = False
 
         self.fields['city'].queryset = City.objects.none()
+        state_id = None
         if 'state' in self.data:
             try:
                 state_id = int(self.data.get('state'))
-                self.fields['city'].queryset = City.objects.filter(state_id=state_id)
             except (ValueError, TypeError):
                 pass 
         elif self.instance.pk:
-            self.fields['city'].queryset = self.instance.state.city_set
+            state_id = self.instance.state_id
+        if state_id is not None:
+            # validated against the table, rendered from the cached location catalogue
+            self.fields['city'].queryset = City.objects.filter(state_id=state_id)
+            choices = [(city['id'], city['city_name']) for city in cities_for_state(state_id)]
+            if self.instance.city_id and self.instance.city_id not in dict(choices):
+                choices.append((self.instance.city_id, str(self.instance.city)))
+            self.fields['city'].choices = [('', self.fields['city'].empty_label)] + choices
 
 class HobbyForm(ModelForm):
     class Meta:
@@ -129,24 +194,13 @@ class HobbyForm(ModelForm):
 class HobbyInlineFormSet(BaseInlineFormSet):
     def clean(self):
         super().clean()
-        hobbies = []
-        has_valid_hobby = False
-
-        for form in self.forms:
-            if self.can_delete and self._should_delete_form(form):
-                continue
-            if not form.cleaned_data:
-                continue
-
-            hobby = form.cleaned_data.get('hobby')
-            if hobby:
-                has_valid_hobby = True
-                if hobby in hobbies:
-                    form.add_error('hobby', 'Duplicate hobbies are not allowed.')
-                hobbies.append(hobby)
-
-        if not has_valid_hobby:
-            raise forms.ValidationError("At least one hobby is required.")
+        hobbies = [
+            form.cleaned_data.get('hobby') for form in self.forms
+            if form.cleaned_data and not (self.can_delete and self._should_delete_form(form))
+        ]
+        errors = validate_hobbies(hobbies)
+        if errors:
+            raise forms.ValidationError(errors)
         
     def save(self, commit=True):
         instances = super().save(commit=False)
@@ -184,38 +238,8 @@ class MemberInlineFormSet(BaseInlineFormSet):
     def clean(self):
         cleaned_data = super().clean()
         for form in self.forms:
-            # member_name
-            member_name = form.cleaned_data.get('member_name')
-            if not member_name:
-                form.add_error('member_name','Name is required.')
-            elif len(member_name) < 3:
-                form.add_error('member_name', 'Name must be at least 3 characters.')
-            elif re.search(r'\d', member_name):
-                form.add_error('member_name', 'Name cannot contain numbers.')
-            # member_dob
-            member_dob = form.cleaned_data.get('member_dob')
-            if not member_dob:
-                form.add_error('member_dob', 'Date of Birth is required.')
-            # marital status
-            member_marital = form.cleaned_data.get('member_marital')
-            if not member_marital:
-                form.add_error('member_marital', 'Please select Marital Status')
-            # member wed date 
-            member_wedDate = form.cleaned_data.get('member_wedDate')
-            if member_marital == 'Married' and not member_wedDate:
-                form.add_error('member_wedDate', 'Wedding date is required if married.')
-            # photo
-            member_photo = form.cleaned_data.get('member_photo')
-            if member_photo:
-                filename = member_photo.name
-                if not re.search(r'\.(jpg|png)$', filename, re.IGNORECASE):
-                    form.add_error('member_photo', 'Only JPG, PNG allowed.')
-                else:
-                    member_photo.seek(0, 2)
-                    size_kb = member_photo.tell() / 1000 / 1000
-                    member_photo.seek(0)
-                    if size_kb > 2:
-                        form.add_error('member_photo', 'Photo size must be less than 2 MB.')
+            for field, error in validate_member(form.cleaned_data).items():
+                form.add_error(field, error)
 
     def save(self, commit=True):
         instances = super().save(commit=False)
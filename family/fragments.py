@@ -0,0 +1,150 @@
+"""
+Rendered family fragments.
+
+The detail block of ``view_family`` and the family list rows are rendered
+once and kept in the cache under a key made of the head id, the head's
+version stamp and the location catalogue version:
+
+* the stamp is a token per head, replaced by ``bump`` when the head, one of
+  its members or hobbies is saved (``family.signals``) or the family is
+  soft deleted (``family.cascade``);
+* the catalogue version changes with any state or city (see
+  ``family.catalogue``), whose names the fragments show.
+
+A replaced stamp or version simply stops matching the old entries, which
+age out after ``FAMILY_FRAGMENT_TIMEOUT`` seconds. Bump ``FRAGMENT_VERSION``
+when ``family_detail.html`` or ``family_row.html`` change.
+
+``record_view`` counts detail page views in ``FamilyViewStat`` so that
+``manage.py warm_family_cache`` can render the most viewed families ahead
+of time.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Prefetch, prefetch_related_objects
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from . import catalogue
+from .models import FamilyHead, FamilyMember, Hobby, FamilyViewStat, statusChoice
+
+FRAGMENT_VERSION = 1
+DETAIL_TEMPLATE = "family_detail.html"
+ROW_TEMPLATE = "family_row.html"
+
+
+def _timeout():
+    return getattr(settings, "FAMILY_FRAGMENT_TIMEOUT", 24 * 3600)
+
+
+def _stamp_key(head_id):
+    return f"family:stamp:{head_id}"
+
+
+def stamps(head_ids):
+    """``{head id: version stamp}``, starting a stamp for heads that have none yet."""
+    keys = {_stamp_key(head_id): head_id for head_id in head_ids}
+    found = cache.get_many(list(keys))
+    missing = [key for key in keys if key not in found]
+    if missing:
+        for key in missing:
+            cache.add(key, uuid.uuid4().hex, None)
+        found.update(cache.get_many(missing))
+    return {keys[key]: stamp for key, stamp in found.items()}
+
+
+def bump(head_ids):
+    """Start new fragment versions for ``head_ids`` once the current transaction commits."""
+    keys = [_stamp_key(head_id) for head_id in set(head_ids)]
+    if keys:
+        transaction.on_commit(lambda: cache.set_many({key: uuid.uuid4().hex for key in keys}, None))
+
+
+def _keys(kind, head_ids):
+    locations = catalogue.version()
+    return {
+        head_id: f"family:{kind}:{FRAGMENT_VERSION}:{head_id}:{stamp}:{locations}"
+        for head_id, stamp in stamps(head_ids).items()
+    }
+
+
+def _render_detail(head_id):
+    head = FamilyHead.objects.select_related("state", "city").get(id=head_id)
+    members = FamilyMember.objects.filter(family_head_id=head_id).exclude(status=statusChoice.DELETE)
+    hobbies = Hobby.objects.filter(family_head_id=head_id).exclude(status=statusChoice.DELETE)
+    return render_to_string(DETAIL_TEMPLATE, {"head": head, "members": members, "hobbies": hobbies})
+
+
+def detail(head_id):
+    """Rendered detail block of the family ``head_id``; raises ``FamilyHead.DoesNotExist``."""
+    key = _keys("detail", [head_id])[head_id]
+    html = cache.get(key)
+    if html is None:
+        html = _render_detail(head_id)
+        cache.set(key, html, _timeout())
+    return mark_safe(html)
+
+
+def rows(heads):
+    """
+    Rendered list row cells of ``heads`` (with their state and city loaded), in order.
+
+    Only the heads missing from the cache get their active members loaded,
+    with one query, and are rendered.
+    """
+    heads = list(heads)
+    keys = _keys("row", [head.id for head in heads])
+    cached = cache.get_many(list(keys.values()))
+    missing = [head for head in heads if keys[head.id] not in cached]
+    if missing:
+        prefetch_related_objects(missing, Prefetch(
+            "members", queryset=FamilyMember.objects.exclude(status=statusChoice.DELETE).order_by("id"),
+            to_attr="active_members",
+        ))
+        rendered = {}
+        for head in missing:
+            head.member_count = len(head.active_members)
+            rendered[keys[head.id]] = render_to_string(ROW_TEMPLATE, {"head": head})
+        cache.set_many(rendered, _timeout())
+        cached.update(rendered)
+    return [mark_safe(cached[keys[head.id]]) for head in heads]
+
+
+def record_view(head_id):
+    now = timezone.now()
+    if FamilyViewStat.objects.filter(head_id=head_id).update(views=F("views") + 1, last_viewed_at=now):
+        return
+    try:
+        with transaction.atomic():
+            FamilyViewStat.objects.create(head_id=head_id, views=1, last_viewed_at=now)
+    except IntegrityError:
+        FamilyViewStat.objects.filter(head_id=head_id).update(views=F("views") + 1, last_viewed_at=now)
+
+
+def most_viewed(limit):
+    """Ids of the ``limit`` live families viewed most often."""
+    return list(
+        FamilyViewStat.objects.exclude(head__status=statusChoice.DELETE)
+        .order_by("-views").values_list("head_id", flat=True)[:limit]
+    )
+
+
+def warm(head_ids, batch_size=100):
+    """Render the detail block and list row of every family of ``head_ids`` not cached yet; returns how many."""
+    warmed = 0
+    head_ids = list(head_ids)
+    for start in range(0, len(head_ids), batch_size):
+        batch = head_ids[start:start + batch_size]
+        heads = list(FamilyHead.objects.filter(id__in=batch).select_related("state", "city"))
+        rows(heads)
+        keys = _keys("detail", batch)
+        cached = cache.get_many(list(keys.values()))
+        for head in heads:
+            if keys[head.id] not in cached:
+                cache.set(keys[head.id], _render_detail(head.id), _timeout())
+            warmed += 1
+    return warmed
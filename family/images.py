@@ -0,0 +1,138 @@
+"""
+Fixed-size photo renditions.
+
+Uploaded photos are kept as they are, and a small JPEG and WebP copy is
+written next to them for every entry in ``RENDITIONS`` under
+``renditions/<name>/``. Pages and exports ask for a rendition by name and
+fall back to the original file when it has not been generated yet (run
+``manage.py build_photo_renditions`` to backfill).
+
+URLs carry a version token (``media_url``) so ``fims.media.serve_media``
+can let browsers cache them for good.
+"""
+import io
+import logging
+import os
+import posixpath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .storage import is_hashed
+
+logger = logging.getLogger(__name__)
+
+# name -> (width, height) in pixels
+RENDITIONS = {
+    "thumb": (100, 100),    # list rows and Excel cells (50x50 at 2x)
+    "card": (200, 200),     # view_family page (100px high at 2x)
+    "print": (225, 300),    # PDF, 1.5 x 2 inch at 150 dpi
+}
+
+# bump after changing RENDITIONS or FORMATS (and rebuild with --overwrite) so cached copies are refetched
+RENDITION_VERSION = 1
+
+FORMATS = {
+    "jpg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+}
+
+
+def rendition_name(name, rendition, fmt="jpg"):
+    base, _ = os.path.splitext(name)
+    return f"renditions/{rendition}/{base}.{fmt}"
+
+
+def render(image, size, fmt):
+    fitted = ImageOps.fit(image, size, Image.LANCZOS)
+    buffer = io.BytesIO()
+    pil_format, options = FORMATS[fmt]
+    fitted.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def create_renditions(field_file, overwrite=False):
+    """
+    Write every rendition of ``field_file``; returns the number of files written.
+
+    Existing renditions are kept unless ``overwrite`` is set, so this is cheap
+    to call again for a photo that has already been processed.
+    """
+    if not field_file:
+        return 0
+    storage, name = field_file.storage, field_file.name
+    targets = [
+        (rendition, fmt, rendition_name(name, rendition, fmt))
+        for rendition in RENDITIONS
+        for fmt in FORMATS
+    ]
+    if not overwrite:
+        targets = [target for target in targets if not storage.exists(target[2])]
+    if not targets:
+        return 0
+
+    try:
+        with storage.open(name, "rb") as source:
+            image = Image.open(source)
+            image = ImageOps.exif_transpose(image).convert("RGB")
+    except (OSError, ValueError) as e:
+        logger.warning("Cannot create renditions for %s: %s", name, e)
+        return 0
+
+    for rendition, fmt, target in targets:
+        if storage.exists(target):
+            storage.delete(target)
+        storage.save(target, ContentFile(render(image, RENDITIONS[rendition], fmt)))
+    return len(targets)
+
+
+def _rendition(field_file, rendition, fmt):
+    if not field_file:
+        return None
+    target = rendition_name(field_file.name, rendition, fmt)
+    if field_file.storage.exists(target):
+        return target
+    return None
+
+
+def rendition_path(field_file, rendition, fmt="jpg"):
+    """Filesystem path of the rendition, or of the original when it is missing."""
+    if not field_file:
+        return None
+    target = _rendition(field_file, rendition, fmt)
+    return field_file.storage.path(target) if target else field_file.path
+
+
+def version(name, stat=None):
+    """
+    Token that changes with the content stored at ``name``: empty for a
+    content-addressed photo, whose name already does; the rendition version
+    for renditions of one; the modification time and size otherwise.
+    """
+    if is_hashed(name):
+        return ""
+    parts = name.split("/", 2)
+    if parts[0] == "renditions" and len(parts) == 3 and is_hashed(posixpath.splitext(parts[2])[0] + ".jpg"):
+        return f"r{RENDITION_VERSION}"
+    if stat is None:
+        stat = os.stat(os.path.join(settings.MEDIA_ROOT, name))
+    return f"{int(stat.st_mtime):x}{stat.st_size:x}"
+
+
+def media_url(storage, name):
+    """URL of ``name`` in ``storage`` with its version token."""
+    url = storage.url(name)
+    try:
+        token = version(name)
+    except OSError:
+        return url
+    return f"{url}?v={token}" if token else url
+
+
+def rendition_url(field_file, rendition, fmt="jpg"):
+    """URL of the rendition, or of the original when it is missing."""
+    if not field_file:
+        return ""
+    target = _rendition(field_file, rendition, fmt)
+    return media_url(field_file.storage, target or field_file.name)
@@ -0,0 +1,345 @@
+"""
+Bulk family import from CSV or XLSX.
+
+The sheet has one row per person. A head row is followed by the rows of its
+members, all sharing the same ``family_ref``::
+
+    family_ref, type, name, surname, dob, mobno, address, state, city,
+    pincode, marital_status, wedding_date, education, photo, hobbies
+
+``type`` is ``head`` or ``member``; ``hobbies`` is a comma-separated list on
+the head row; ``photo`` is the name of a file already in the photo storage
+(relative, without ``..``). Renditions are written for the imported photos.
+
+Rows are read lazily and grouped per family, validated with the same rules
+as the HTML form (``validate_head``/``validate_member``/``validate_hobbies``)
+and written ``batch_size`` families at a time inside one transaction with
+``bulk_create``. A family with any invalid row is skipped as a whole and
+every problem is reported with its sheet row number.
+"""
+import csv
+import io
+import os
+import posixpath
+from datetime import date, datetime
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import counters, photos
+from .forms import validate_head, validate_member, validate_hobbies
+from .changes import log_queryset
+from .images import create_renditions
+from .models import FamilyHead, FamilyMember, Hobby, State, City, ChangeAction, statusChoice
+from .search import index_heads
+from .storage import photo_storage
+
+COLUMNS = [
+    'family_ref', 'type', 'name', 'surname', 'dob', 'mobno', 'address', 'state', 'city',
+    'pincode', 'marital_status', 'wedding_date', 'education', 'photo', 'hobbies',
+]
+DATE_FORMATS = ('%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y')
+IMPORT_BATCH_SIZE = 500
+
+
+class ImportResult:
+    def __init__(self):
+        self.families = 0
+        self.members = 0
+        self.rows = 0
+        self.errors = []
+
+    def add_error(self, row, family_ref, field, message):
+        self.errors.append({'row': row, 'family_ref': family_ref, 'field': field, 'message': message})
+
+    def write_report(self, output):
+        writer = csv.DictWriter(output, fieldnames=['row', 'family_ref', 'field', 'message'])
+        writer.writeheader()
+        writer.writerows(self.errors)
+
+    def as_dict(self, max_errors=100):
+        return {
+            'rows': self.rows,
+            'families': self.families,
+            'members': self.members,
+            'failed_rows': len({error['row'] for error in self.errors}),
+            'errors': self.errors[:max_errors],
+        }
+
+
+# ----------------------------- READING -----------------------------
+
+def _header(values):
+    return [str(value or '').strip().lower().replace(' ', '_') for value in values]
+
+
+def read_csv(fileobj):
+    if isinstance(fileobj.read(0), bytes):
+        fileobj = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    reader = csv.reader(fileobj)
+    header = _header(next(reader, []))
+    for values in reader:
+        yield dict(zip(header, values))
+
+
+def read_xlsx(fileobj):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = _header(next(rows, []))
+        for values in rows:
+            yield dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def read_rows(fileobj, filename):
+    if os.path.splitext(filename)[1].lower() in ('.xlsx', '.xlsm'):
+        return read_xlsx(fileobj)
+    return read_csv(fileobj)
+
+
+# ----------------------------- PARSING -----------------------------
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    value = _text(value)
+    if not value:
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            pass
+    raise ValueError('Enter a valid date.')
+
+
+class LocationLookup:
+    """In-memory, case-insensitive state and city lookup for the whole import."""
+
+    def __init__(self):
+        self.states = {}
+        self.cities = {}
+        for state in State.objects.filter(status=statusChoice.ACTIVE):
+            self.states.setdefault(state.state_name.strip().lower(), state)
+        for city in City.objects.filter(status=statusChoice.ACTIVE):
+            self.cities.setdefault((city.state_id, city.city_name.strip().lower()), city)
+
+    def resolve(self, state_name, city_name):
+        state = self.states.get(_text(state_name).lower())
+        city = self.cities.get((state.pk, _text(city_name).lower())) if state else None
+        return state, city
+
+
+def _stored_photo_error(name):
+    """Why the stored file ``name`` cannot be used as a photo, or ``None``."""
+    if not name:
+        return None
+    if posixpath.isabs(name) or '\\' in name or ':' in name or '..' in name.split('/'):
+        return 'Photo must be a file name relative to the media folder.'
+    if not photo_storage.exists(name):
+        return f"Photo '{name}' does not exist."
+    return None
+
+
+def _parse_dates(values, fields, errors):
+    for field in fields:
+        try:
+            values[field] = _date(values[field])
+        except ValueError as e:
+            values[field] = None
+            errors[field] = str(e)
+
+
+def build_family(rows, lookup):
+    """
+    Validate one family's ``[(row_number, row)]``.
+
+    Returns ``(head, hobbies, members, errors)`` with unsaved model instances;
+    ``errors`` is a list of ``(row_number, field, message)``.
+    """
+    errors = []
+    head_rows = [(n, row) for n, row in rows if _text(row.get('type')).lower() == 'head']
+    member_rows = [(n, row) for n, row in rows if _text(row.get('type')).lower() == 'member']
+    for n, row in rows:
+        if _text(row.get('type')).lower() not in ('head', 'member'):
+            errors.append((n, 'type', "Type must be 'head' or 'member'."))
+    if len(head_rows) != 1:
+        errors.append((rows[0][0], 'type', 'Each family needs exactly one head row.'))
+        return None, [], [], errors
+
+    n, row = head_rows[0]
+    state, city = lookup.resolve(row.get('state'), row.get('city'))
+    data = {
+        'name': _text(row.get('name')),
+        'surname': _text(row.get('surname')),
+        'dob': row.get('dob'),
+        'mobno': _text(row.get('mobno')),
+        'address': _text(row.get('address')),
+        'state': state,
+        'city': city,
+        'pincode': _text(row.get('pincode')),
+        'marital_status': _text(row.get('marital_status')).capitalize(),
+        'wedding_date': row.get('wedding_date'),
+        'photo': _text(row.get('photo')),
+    }
+    field_errors = {}
+    _parse_dates(data, ('dob', 'wedding_date'), field_errors)
+    for field, message in validate_head(data).items():
+        field_errors.setdefault(field, message)
+    photo_error = _stored_photo_error(data['photo'])
+    if photo_error:
+        field_errors.setdefault('photo', photo_error)
+    if _text(row.get('state')) and not state:
+        field_errors['state'] = f"Unknown state '{_text(row.get('state'))}'."
+    elif _text(row.get('city')) and not city:
+        field_errors['city'] = f"Unknown city '{_text(row.get('city'))}' in {state}."
+    errors.extend((n, field, message) for field, message in field_errors.items())
+
+    hobby_names = [hobby.strip() for hobby in _text(row.get('hobbies')).split(',')]
+    errors.extend((n, 'hobbies', message) for message in validate_hobbies(hobby_names))
+
+    head = FamilyHead(**data)
+    hobbies = [Hobby(family_head=head, hobby=name) for name in hobby_names if name]
+
+    members = []
+    for n, row in member_rows:
+        data = {
+            'member_name': _text(row.get('name')),
+            'member_dob': row.get('dob'),
+            'member_marital': _text(row.get('marital_status')).capitalize(),
+            'member_wedDate': row.get('wedding_date'),
+            'education': _text(row.get('education')) or None,
+            'member_photo': _text(row.get('photo')) or None,
+        }
+        field_errors = {}
+        _parse_dates(data, ('member_dob', 'member_wedDate'), field_errors)
+        for field, message in validate_member(data).items():
+            field_errors.setdefault(field, message)
+        photo_error = _stored_photo_error(data['member_photo'])
+        if photo_error:
+            field_errors.setdefault('member_photo', photo_error)
+        errors.extend((n, field, message) for field, message in field_errors.items())
+        members.append(FamilyMember(family_head=head, **data))
+
+    return head, hobbies, members, errors
+
+
+# ----------------------------- WRITING -----------------------------
+
+def _insert_heads(heads):
+    if connection.features.can_return_rows_from_bulk_insert:
+        FamilyHead.objects.bulk_create(heads)
+        return
+    # Backends such as MySQL do not return ids from a multi-row INSERT, and the
+    # children need them, so fall back to one INSERT per head. raw=True skips
+    # the per-row signal handlers; write_batch does that work once per batch.
+    now = timezone.now()
+    for head in heads:
+        head.created_at = head.updated_at = now
+        head.save_base(raw=True, force_insert=True)
+
+
+def write_batch(families):
+    """Insert ``[(head, hobbies, members)]`` in one transaction and update derived data."""
+    heads = [head for head, _, _ in families]
+    with transaction.atomic():
+        _insert_heads(heads)
+        hobbies, members = [], []
+        for head, family_hobbies, family_members in families:
+            for child in family_hobbies + family_members:
+                child.family_head = head
+            hobbies.extend(family_hobbies)
+            members.extend(family_members)
+        Hobby.objects.bulk_create(hobbies, batch_size=1000)
+        FamilyMember.objects.bulk_create(members, batch_size=1000)
+
+        deltas = {counters.HEADS: len(heads), counters.MEMBERS: len(members)}
+        for head in heads:
+            key = f"{counters.STATE_HEADS}{head.state_id}"
+            deltas[key] = deltas.get(key, 0) + 1
+        counters.add(deltas)
+        photos.record_bulk(heads + members)
+        index_heads(heads)
+        # children have no pk after bulk_create on MySQL, so select them by head
+        head_ids = [head.pk for head in heads]
+        log_queryset(FamilyHead.all_objects.filter(pk__in=head_ids), ChangeAction.CREATE)
+        log_queryset(Hobby.all_objects.filter(family_head_id__in=head_ids), ChangeAction.CREATE)
+        log_queryset(FamilyMember.all_objects.filter(family_head_id__in=head_ids), ChangeAction.CREATE)
+    # as save_family does; files of existing renditions are skipped
+    imported = {head.photo.name: head.photo for head in heads if head.photo}
+    imported.update((member.member_photo.name, member.member_photo) for member in members if member.member_photo)
+    for photo in imported.values():
+        create_renditions(photo)
+    return len(heads), len(members)
+
+
+def _families(rows, result):
+    current_ref, current, seen = None, [], set()
+    for number, row in enumerate(rows, start=2):
+        if not any(_text(value) for value in row.values()):
+            continue
+        result.rows += 1
+        ref = _text(row.get('family_ref'))
+        if not ref:
+            result.add_error(number, '', 'family_ref', 'family_ref is required.')
+            continue
+        if ref != current_ref:
+            if current:
+                yield current_ref, current
+            if ref in seen:
+                result.add_error(number, ref, 'family_ref', 'Rows of a family must be contiguous.')
+                current_ref, current = None, []
+                continue
+            seen.add(ref)
+            current_ref, current = ref, []
+        current.append((number, row))
+    if current:
+        yield current_ref, current
+
+
+def import_families(rows, batch_size=IMPORT_BATCH_SIZE, dry_run=False):
+    """
+    Validate and insert the families described by ``rows`` (dicts keyed by ``COLUMNS``).
+
+    Returns an ``ImportResult``. With ``dry_run`` nothing is written.
+    """
+    result = ImportResult()
+    lookup = LocationLookup()
+    batch = []
+    for ref, family_rows in _families(rows, result):
+        head, hobbies, members, errors = build_family(family_rows, lookup)
+        if errors:
+            for number, field, message in errors:
+                result.add_error(number, ref, field, message)
+            continue
+        batch.append((head, hobbies, members))
+        if len(batch) >= batch_size:
+            _flush(batch, result, dry_run)
+            batch = []
+    if batch:
+        _flush(batch, result, dry_run)
+    return result
+
+
+def _flush(batch, result, dry_run):
+    if dry_run:
+        result.families += len(batch)
+        result.members += sum(len(members) for _, _, members in batch)
+        return
+    families, members = write_batch(batch)
+    result.families += families
+    result.members += members
@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from family import photos
+from family.archive import archive_deleted, pending, ARCHIVE_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Move rows soft-deleted more than --days ago into the *_archive tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=getattr(settings, "SOFT_DELETE_ARCHIVE_DAYS", 90))
+        parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+        parser.add_argument("--dry-run", action="store_true", help="Only count the rows that would be archived.")
+        parser.add_argument("--keep-photos", action="store_true",
+                            help="Do not delete the photos no row refers to any more.")
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options["days"])
+        if options["dry_run"]:
+            totals = pending(before)
+        else:
+            totals = archive_deleted(before, batch_size=options["batch_size"])
+        summary = ", ".join(f"{name}: {count}" for name, count in totals.items())
+        verb = "Would archive" if options["dry_run"] else "Archived"
+        self.stdout.write(self.style.SUCCESS(f"{verb} rows deleted before {before:%Y-%m-%d} ({summary})."))
+        if not options["dry_run"] and not options["keep_photos"]:
+            files, size = photos.reclaim()
+            self.stdout.write(self.style.SUCCESS(f"Reclaimed {files} photos ({size / 1024 / 1024:.1f} MB)."))
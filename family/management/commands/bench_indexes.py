@@ -0,0 +1,138 @@
+"""
+Show the plans and timings of the main list/lookup queries with and without
+the indexes declared on the family models (see migration 0006).
+
+    python manage.py bench_indexes --seed 50000
+    python manage.py bench_indexes --compare --repeat 20
+    python manage.py bench_indexes --clear-seed
+
+``--compare`` drops the declared indexes, measures, and creates them again,
+so run it against a copy of the database, not production.
+"""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from family import synthetic
+from family.models import FamilyHead, FamilyMember, Hobby, State, City, statusChoice
+
+INDEXED_MODELS = (State, City, FamilyHead, Hobby, FamilyMember)
+
+
+def _sample_ids():
+    state_id = (
+        City.objects.filter(status=statusChoice.ACTIVE).values_list("state_id", flat=True).first()
+    )
+    head = FamilyHead.objects.exclude(status=statusChoice.DELETE).order_by("-created_at").first()
+    return state_id, head
+
+
+def query_shapes():
+    """``[(label, queryset)]`` mirroring the queries the views run."""
+    state_id, head = _sample_ids()
+    head_id = head.pk if head else 0
+    page_ids = list(
+        FamilyHead.objects.exclude(status=statusChoice.DELETE)
+        .order_by("-created_at", "-id").values_list("id", flat=True)[:10]
+    )
+    return [
+        ("heads page (family_list)",
+         FamilyHead.objects.exclude(status=statusChoice.DELETE).order_by("-created_at", "-id")[:10]),
+        ("heads count", FamilyHead.objects.exclude(status=statusChoice.DELETE)),
+        ("heads by state",
+         FamilyHead.objects.filter(state_id=state_id, status=statusChoice.ACTIVE)),
+        ("head by mobno",
+         FamilyHead.objects.filter(mobno=head.mobno if head else "")),
+        ("members of page (prefetch)",
+         FamilyMember.objects.filter(family_head_id__in=page_ids).exclude(status=statusChoice.DELETE)),
+        ("members of head", FamilyMember.objects.filter(family_head_id=head_id, status=statusChoice.ACTIVE)),
+        ("hobbies of head", Hobby.objects.filter(family_head_id=head_id, status=statusChoice.ACTIVE)),
+        ("cities of state (get_cities)",
+         City.objects.filter(state_id=state_id, status=statusChoice.ACTIVE)),
+        ("cities page", City.objects.exclude(status=statusChoice.DELETE).order_by("-created_at")[:10]),
+        ("states page", State.objects.exclude(status=statusChoice.DELETE).order_by("-created_at")[:10]),
+        ("city by name", City.objects.filter(city_name="Pune")),
+    ]
+
+
+def _run(queryset, label):
+    if label == "heads count":
+        return queryset.count()
+    return len(list(queryset))
+
+
+def measure(repeat):
+    results = []
+    for label, queryset in query_shapes():
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            _run(queryset.all(), label)
+            timings.append((time.perf_counter() - start) * 1000)
+        plan = queryset.explain() if label != "heads count" else queryset.order_by().values("id").explain()
+        results.append((label, statistics.median(timings), plan))
+    return results
+
+
+class Command(BaseCommand):
+    help = "Benchmark the status/search query shapes, optionally without the declared indexes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0, metavar="HEADS",
+                            help="Insert this many synthetic families (see seed_data) before measuring.")
+        parser.add_argument("--clear-seed", action="store_true",
+                            help="Delete the synthetic families and exit.")
+        parser.add_argument("--repeat", type=int, default=10)
+        parser.add_argument("--compare", action="store_true",
+                            help="Also measure with the declared indexes dropped.")
+        parser.add_argument("--no-plans", action="store_true", help="Print timings only.")
+
+    def handle(self, *args, **options):
+        if options["clear_seed"]:
+            self.stdout.write(f"Deleted {synthetic.clear()} seeded families.")
+            return
+        if options["seed"]:
+            try:
+                synthetic.generate(options["seed"], seed=options["seed"], photos=0)
+            except ValueError as e:
+                raise CommandError(str(e))
+        if not FamilyHead.objects.exists():
+            raise CommandError("No families to benchmark; pass --seed N.")
+
+        with_indexes = measure(options["repeat"])
+        without_indexes = None
+        if options["compare"]:
+            self.drop_indexes()
+            try:
+                without_indexes = measure(options["repeat"])
+            finally:
+                self.create_indexes()
+        self.report(with_indexes, without_indexes, not options["no_plans"])
+
+    def _indexes(self):
+        return [(model, index) for model in INDEXED_MODELS for index in model._meta.indexes]
+
+    def drop_indexes(self):
+        with connection.schema_editor() as editor:
+            for model, index in self._indexes():
+                editor.remove_index(model, index)
+
+    def create_indexes(self):
+        with connection.schema_editor() as editor:
+            for model, index in self._indexes():
+                editor.add_index(model, index)
+
+    def report(self, with_indexes, without_indexes, plans):
+        rows = without_indexes or [(label, None, None) for label, _, _ in with_indexes]
+        self.stdout.write(f"\n{'query':32} {'indexed ms':>11} {'no index ms':>12}")
+        for (label, indexed, plan), (_, plain, plain_plan) in zip(with_indexes, rows):
+            plain_text = f"{plain:12.2f}" if plain is not None else f"{'-':>12}"
+            self.stdout.write(f"{label:32} {indexed:11.2f} {plain_text}")
+        if not plans:
+            return
+        for (label, _, plan), (_, _, plain_plan) in zip(with_indexes, rows):
+            self.stdout.write(f"\n== {label}\n-- with indexes:\n{plan}")
+            if plain_plan is not None:
+                self.stdout.write(f"-- without indexes:\n{plain_plan}")
@@ -0,0 +1,209 @@
+"""
+Time the main pages and exports with the test client and write the results
+as JSON, so runs on two commits can be compared:
+
+    python manage.py seed_data --heads 10000
+    python manage.py benchmark --repeat 20 --output before.json
+    git checkout <branch>
+    python manage.py benchmark --repeat 20 --output after.json --compare before.json
+
+Every scenario reports latency percentiles (ms) and the SQL query count of
+its requests. The family/state/city exports are timed through their
+``exports.jobs`` writers, which is the code the export jobs run.
+"""
+import io
+import json
+import statistics
+import subprocess
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from exports.jobs import EXPORT_KINDS
+from family.models import FamilyHead, FamilyMember, Hobby, State, City, statusChoice
+from fims.metrics import QueryRecorder
+
+BENCHMARK_USER = "benchmark@example.com"
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def _read(response):
+    if response.streaming:
+        b"".join(response.streaming_content)
+    return response.status_code
+
+
+def _page(path, ajax=False):
+    headers = {"HTTP_X_REQUESTED_WITH": "XMLHttpRequest"} if ajax else {}
+    return lambda client: _read(client.get(path, **headers))
+
+
+def _export(kind, params):
+    spec = EXPORT_KINDS[kind]
+
+    def run(client):
+        spec.write(spec.clean(params), io.BytesIO(), lambda done, total: None)
+        return 200
+    return run
+
+
+def scenarios(head):
+    """``[(name, callable(client) -> status)]``; ``head`` is the family used for the per-family paths."""
+    family = {"hashid": str(head.pk)}
+    return [
+        ("dashboard", _page(reverse("dashboard"))),
+        ("family_list", _page(reverse("family_list"))),
+        ("family_list_page_5", _page(reverse("family_list") + "?page=5")),
+        ("family_list_search", _page(reverse("family_list") + f"?search={head.surname}")),
+        ("family_list_cursor_ajax", _page(reverse("family_list") + "?cursor=", ajax=True)),
+        ("state_list", _page(reverse("state_list"))),
+        ("city_list", _page(reverse("city_list"))),
+        ("view_family", _page(reverse("view_family", args=[head.pk]))),
+        ("update_family", _page(reverse("update_family", args=[head.pk]))),
+        ("head_excel", _page(reverse("head_excel"))),
+        ("export_family_pdf", _export("family_pdf", family)),
+        ("export_family_excel", _export("family_excel", family)),
+        ("export_head_excel", _export("head_excel", {})),
+        ("export_state_excel", _export("state_excel", {})),
+        ("export_city_excel", _export("city_excel", {})),
+    ]
+
+
+def _attempt(run, client):
+    """``(status, error)``; an exception counts as a 500 so one broken path does not stop the run."""
+    try:
+        return run(client), None
+    except Exception as e:
+        return 500, f"{type(e).__name__}: {e}"
+
+
+def measure(run, client, repeat, warmup):
+    for _ in range(warmup):
+        _attempt(run, client)
+    timings, queries, statuses, error = [], [], [], None
+    for _ in range(repeat):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            status, error = _attempt(run, client)
+        timings.append((time.perf_counter() - start) * 1000)
+        queries.append(recorder.count)
+        statuses.append(status)
+    result = {
+        "runs": repeat,
+        "status": statuses[-1],
+        "errors": sum(1 for status in statuses if status >= 400),
+        "p50_ms": round(statistics.median(timings), 2),
+        "p90_ms": round(percentile(timings, 0.90), 2),
+        "p95_ms": round(percentile(timings, 0.95), 2),
+        "p99_ms": round(percentile(timings, 0.99), 2),
+        "mean_ms": round(statistics.fmean(timings), 2),
+        "max_ms": round(max(timings), 2),
+        "queries": max(queries),
+        "duplicate_queries": recorder.duplicates,
+    }
+    if error:
+        result["error"] = error
+    return result
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = "Benchmark the main pages and exports; prints or writes the results as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=10, help="Timed runs per scenario.")
+        parser.add_argument("--warmup", type=int, default=1, help="Untimed runs before measuring.")
+        parser.add_argument("--only", action="append", metavar="NAME", help="Run only these scenarios (repeatable).")
+        parser.add_argument("--user", default=BENCHMARK_USER,
+                            help="Email of the user to log in as; created without a password if missing.")
+        parser.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+        parser.add_argument("--compare", metavar="BASELINE", help="Print the change against an earlier report.")
+        parser.add_argument("--fail-over", type=float, metavar="PERCENT",
+                            help="With --compare, exit with an error if any p50 grew by more than this "
+                                 "or any query count grew.")
+
+    def handle(self, *args, **options):
+        head = (
+            FamilyHead.objects.filter(status=statusChoice.ACTIVE)
+            .annotate(member_total=Count("members")).order_by("-member_total", "-id").first()
+        )
+        if head is None:
+            raise CommandError("No active families to benchmark; run seed_data first.")
+        user = CustomUser.objects.filter(email=options["user"]).first()
+        if user is None:
+            user = CustomUser.objects.create_user(email=options["user"], password=None)
+
+        selected = [
+            (name, run) for name, run in scenarios(head)
+            if not options["only"] or name in options["only"]
+        ]
+        results = {}
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            client = Client(raise_request_exception=False)
+            client.force_login(user)
+            for name, run in selected:
+                results[name] = measure(run, client, options["repeat"], options["warmup"])
+                self.stderr.write(f"{name:28} p50 {results[name]['p50_ms']:9.2f} ms  {results[name]['queries']:5} queries")
+
+        report = {
+            "commit": _commit(),
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "data": {
+                "heads": FamilyHead.objects.count(),
+                "members": FamilyMember.objects.count(),
+                "hobbies": Hobby.objects.count(),
+                "states": State.objects.count(),
+                "cities": City.objects.count(),
+            },
+            "repeat": options["repeat"],
+            "results": results,
+        }
+        body = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                output.write(body + "\n")
+        else:
+            self.stdout.write(body)
+
+        if options["compare"]:
+            with open(options["compare"]) as baseline_file:
+                baseline = json.load(baseline_file)
+            if self.compare(baseline, report, options["fail_over"]):
+                raise CommandError("Performance regressed against the baseline.")
+
+    def compare(self, baseline, report, fail_over):
+        """Print the change per scenario; returns whether it crossed ``fail_over``."""
+        regressed = False
+        self.stderr.write(f"\n{'scenario':28} {'p50 before':>11} {'p50 after':>10} {'change':>8} {'queries':>12}")
+        for name, after in report["results"].items():
+            before = baseline.get("results", {}).get(name)
+            if before is None:
+                continue
+            change = (after["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100 if before["p50_ms"] else 0
+            queries = f"{before['queries']} -> {after['queries']}"
+            self.stderr.write(f"{name:28} {before['p50_ms']:11.2f} {after['p50_ms']:10.2f} {change:+7.1f}% {queries:>12}")
+            if fail_over is not None and (change > fail_over or after["queries"] > before["queries"]):
+                regressed = True
+        return regressed
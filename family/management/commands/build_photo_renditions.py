@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from family.models import FamilyHead, FamilyMember
+from family.images import create_renditions
+
+
+class Command(BaseCommand):
+    help = "Create missing photo renditions for existing family heads and members."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--overwrite", action="store_true", help="Regenerate renditions that already exist.")
+
+    def handle(self, *args, **options):
+        written = 0
+        for photo in FamilyHead.objects.exclude(photo="").values_list("photo", flat=True).iterator():
+            written += create_renditions(FamilyHead(photo=photo).photo, overwrite=options["overwrite"])
+        for photo in FamilyMember.objects.exclude(member_photo="").exclude(member_photo=None).values_list("member_photo", flat=True).iterator():
+            written += create_renditions(FamilyMember(member_photo=photo).member_photo, overwrite=options["overwrite"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} renditions."))
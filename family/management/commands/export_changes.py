@@ -0,0 +1,37 @@
+import sys
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from family.changes import feed, ndjson, prune, FEED_LIMIT
+
+
+class Command(BaseCommand):
+    help = "Write the change feed after --since as NDJSON (the same lines /changes/ serves)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", type=int, default=0, help="Last sequence number already replicated.")
+        parser.add_argument("--limit", type=int, default=FEED_LIMIT)
+        parser.add_argument("--output", help="Write to this file instead of stdout.")
+        parser.add_argument("--prune-days", type=int,
+                            help="Instead of exporting, delete log entries older than this many days.")
+
+    def handle(self, *args, **options):
+        if options["prune_days"] is not None:
+            removed = prune(timezone.now() - timedelta(days=options["prune_days"]))
+            self.stdout.write(self.style.SUCCESS(f"Removed {removed} change-log entries."))
+            return
+
+        last = options["since"]
+        output = open(options["output"], "w", encoding="utf-8") if options["output"] else sys.stdout
+        try:
+            count = 0
+            for change in feed(options["since"], options["limit"]):
+                output.writelines(ndjson([change]))
+                last = change["seq"]
+                count += 1
+        finally:
+            if options["output"]:
+                output.close()
+        self.stderr.write(f"{count} changes, next --since {last}")
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from family.importer import import_families, read_rows, IMPORT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Import families from a CSV or XLSX file (see family.importer for the columns)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+        parser.add_argument("--report", help="Write the per-row error report to this CSV file.")
+        parser.add_argument("--dry-run", action="store_true", help="Validate only, do not write anything.")
+
+    def handle(self, *args, **options):
+        try:
+            fileobj = open(options["path"], "rb")
+        except OSError as e:
+            raise CommandError(f"Cannot open {options['path']}: {e}")
+
+        with fileobj:
+            result = import_families(
+                read_rows(fileobj, options["path"]),
+                batch_size=options["batch_size"],
+                dry_run=options["dry_run"],
+            )
+
+        if options["report"]:
+            with open(options["report"], "w", newline="", encoding="utf-8") as report:
+                result.write_report(report)
+
+        summary = result.as_dict(max_errors=0)
+        self.stdout.write(
+            f"Rows: {summary['rows']}, families imported: {summary['families']}, "
+            f"members imported: {summary['members']}, rows with errors: {summary['failed_rows']}"
+        )
+        for error in result.errors[:20]:
+            self.stderr.write(f"  row {error['row']} ({error['family_ref']}) {error['field']}: {error['message']}")
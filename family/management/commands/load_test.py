@@ -0,0 +1,114 @@
+"""
+Load an already running deployment with concurrent GETs and report
+throughput and latency per concurrency level, optionally side by side with a
+second deployment of the same code:
+
+    gunicorn fims.wsgi:application -w 4 -b 127.0.0.1:8000
+    uvicorn fims.asgi:application --workers 4 --port 8001
+    python manage.py load_test --url http://127.0.0.1:8000 --compare http://127.0.0.1:8001 \\
+        --concurrency 1,16,64,256 --cookie "sessionid=..."
+
+The default paths are the async endpoints (``get_cities``, ``locations/`` and
+the AJAX pages of the family/state/city lists); the list pages need a
+logged-in ``--cookie``. Under WSGI each in-flight request holds a worker
+thread, so throughput flattens once the concurrency passes the thread count;
+under uvicorn the async views keep accepting requests while they wait on the
+cache and database.
+"""
+import http.client
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = (
+    "/get_cities/1",
+    "/locations/",
+    "/family_list/?cursor=",
+    "/state_list/?cursor=",
+    "/city_list?cursor=",
+)
+
+
+class Client(threading.local):
+    """One keep-alive connection per worker thread."""
+
+    def __init__(self, base, headers, timeout):
+        parts = urlsplit(base)
+        connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.connection = connection_class(parts.netloc, timeout=timeout)
+        self.prefix = parts.path.rstrip("/")
+        self.headers = headers
+
+    def get(self, path):
+        """``(status, seconds)``; status 0 means the request failed."""
+        start = time.perf_counter()
+        try:
+            self.connection.request("GET", self.prefix + path, headers=self.headers)
+            response = self.connection.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            status = 0
+        return status, time.perf_counter() - start
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run(base, paths, concurrency, total, headers, timeout):
+    """Issue ``total`` GETs round-robin over ``paths`` with ``concurrency`` threads."""
+    client = Client(base, headers, timeout)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(lambda i: client.get(paths[i % len(paths)]), range(total)))
+        elapsed = time.perf_counter() - start
+    timings = [seconds * 1000 for status, seconds in results if 200 <= status < 400]
+    return {
+        "rps": len(timings) / elapsed,
+        "p50": statistics.median(timings) if timings else None,
+        "p95": percentile(timings, 0.95) if timings else None,
+        "p99": percentile(timings, 0.99) if timings else None,
+        "errors": total - len(timings),
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare request throughput and latency of running deployments at several concurrency levels."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000", help="Base URL of the deployment to load.")
+        parser.add_argument("--compare", metavar="URL", help="Base URL of a second deployment to load the same way.")
+        parser.add_argument("--path", action="append", dest="paths",
+                            help="Path to request (repeatable); defaults to the async endpoints.")
+        parser.add_argument("--concurrency", default="1,8,32,128",
+                            help="Comma-separated numbers of concurrent clients.")
+        parser.add_argument("--requests", type=int, default=1000, help="Requests per concurrency level.")
+        parser.add_argument("--cookie", default="", help="Cookie header, e.g. a logged-in sessionid.")
+        parser.add_argument("--timeout", type=float, default=30)
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options["concurrency"].split(",")]
+        except ValueError:
+            raise CommandError("--concurrency must be a comma-separated list of numbers.")
+        paths = options["paths"] or list(DEFAULT_PATHS)
+        headers = {"X-Requested-With": "XMLHttpRequest"}
+        if options["cookie"]:
+            headers["Cookie"] = options["cookie"]
+        targets = [options["url"]] + ([options["compare"]] if options["compare"] else [])
+
+        self.stdout.write(f"{'target':28} {'clients':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for level in levels:
+            for base in targets:
+                result = run(base, paths, level, options["requests"], headers, options["timeout"])
+                latencies = " ".join(
+                    f"{result[key]:9.1f}" if result[key] is not None else f"{'-':>9}" for key in ("p50", "p95", "p99")
+                )
+                self.stdout.write(f"{base:28} {level:7} {result['rps']:9.1f} {latencies} {result['errors']:7}")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from family.counters import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute the materialised dashboard counters from the tables."
+
+    def handle(self, *args, **options):
+        values = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(values)} dashboard counters."))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from family.models import FamilyHead, SearchDocument, SearchToken
+from family.search import reindex_queryset
+
+
+class Command(BaseCommand):
+    help = "Rebuild the family head search index."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--clear", action="store_true", help="Drop the existing index before rebuilding.")
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            SearchToken.objects.all().delete()
+            SearchDocument.objects.all().delete()
+        indexed = reindex_queryset(FamilyHead.objects.all(), batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} family heads."))
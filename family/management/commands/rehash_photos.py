@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from family import photos
+
+
+class Command(BaseCommand):
+    help = (
+        "Move photos stored under their upload names to content-addressed names, "
+        "merging identical files, and recount the photo references."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only hash the files and report the savings.")
+        parser.add_argument("--keep-originals", action="store_true",
+                            help="Leave the old files (and their renditions) in place.")
+        parser.add_argument("--reclaim", action="store_true",
+                            help="Afterwards, delete the stored photos no row refers to any more.")
+
+    def handle(self, *args, **options):
+        def progress(done, total):
+            if done % 100 == 0 or done == total:
+                self.stdout.write(f"  {done}/{total} photos")
+
+        stats = photos.rehash(dry_run=options["dry_run"], keep_originals=options["keep_originals"], progress=progress)
+        verb = "Would store" if options["dry_run"] else "Stored"
+        saved = (stats["bytes_before"] - stats["bytes_after"]) / 1024 / 1024
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {stats['photos']} photos as {stats['files']} files, saving {saved:.1f} MB; "
+            f"{stats['rows']} rows updated, {stats['missing']} files missing."
+        ))
+        if options["reclaim"] and not options["dry_run"]:
+            files, size = photos.reclaim()
+            self.stdout.write(self.style.SUCCESS(f"Reclaimed {files} photos ({size / 1024 / 1024:.1f} MB)."))
@@ -0,0 +1,43 @@
+"""
+Fill the database with synthetic families for benchmarking:
+
+    python manage.py seed_data --heads 10000 --members 4 --hobbies 3 --photos 5
+    python manage.py seed_data --clear
+
+States and cities missing from the database are loaded from
+static/statecity.txt first.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from family import synthetic
+
+
+class Command(BaseCommand):
+    help = "Load the state/city list and generate synthetic families, members, hobbies and photos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--heads", type=int, default=1000, help="Families to generate.")
+        parser.add_argument("--members", type=int, default=4, help="Maximum members per family.")
+        parser.add_argument("--hobbies", type=int, default=3, help="Maximum hobbies per family.")
+        parser.add_argument("--photos", type=int, default=5,
+                            help="Distinct placeholder photos shared by the rows (0 for none).")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed, for repeatable data.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--clear", action="store_true", help="Delete the generated families and exit.")
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            self.stdout.write(self.style.SUCCESS(f"Deleted {synthetic.clear()} synthetic families."))
+            return
+
+        states, cities = synthetic.load_locations()
+        self.stdout.write(f"Loaded {states} states and {cities} cities.")
+        try:
+            families, members = synthetic.generate(
+                options["heads"], options["members"], options["hobbies"], options["photos"],
+                seed=options["seed"], batch_size=options["batch_size"],
+                progress=lambda done, total: self.stdout.write(f"Generated {done}/{total} families"),
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Created {families} families with {members} members."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from family import fragments
+from family.models import FamilyHead, statusChoice
+
+
+class Command(BaseCommand):
+    help = "Render the detail block and list row of the most viewed families into the fragment cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=500, help="Number of most viewed families to warm.")
+        parser.add_argument("--latest", type=int, default=50,
+                            help="Also warm the newest families, which fill the first family list pages.")
+
+    def handle(self, *args, **options):
+        head_ids = fragments.most_viewed(options["top"])
+        latest = (
+            FamilyHead.objects.exclude(status=statusChoice.DELETE)
+            .order_by("-created_at").values_list("id", flat=True)[:options["latest"]]
+        )
+        seen = set(head_ids)
+        head_ids += [head_id for head_id in latest if head_id not in seen]
+        warmed = fragments.warm(head_ids)
+        self.stdout.write(self.style.SUCCESS(f"Warmed the fragments of {warmed} families."))
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('family', '0003_alter_familyhead_pincode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('head', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='family.familyhead')),
+                ('document', models.TextField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'family_search_document',
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=3)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+                ('head', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='family.familyhead')),
+            ],
+            options={
+                'db_table': 'family_search_token',
+                'constraints': [models.UniqueConstraint(fields=('token', 'head'), name='family_search_token_token_head')],
+            },
+        ),
+    ]
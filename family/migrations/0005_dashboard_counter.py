@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:51
+
+from django.db import migrations, models
+from django.db.models import Count
+
+DELETE = 9
+
+
+def build_counters(apps, schema_editor):
+    FamilyHead = apps.get_model('family', 'FamilyHead')
+    FamilyMember = apps.get_model('family', 'FamilyMember')
+    State = apps.get_model('family', 'State')
+    City = apps.get_model('family', 'City')
+    DashboardCounter = apps.get_model('family', 'DashboardCounter')
+
+    values = {
+        'heads': FamilyHead.objects.exclude(status=DELETE).count(),
+        'members': FamilyMember.objects.exclude(status=DELETE).count(),
+        'states': State.objects.exclude(status=DELETE).count(),
+        'cities': City.objects.exclude(status=DELETE).count(),
+        'states_active': State.objects.filter(status=1).count(),
+        'states_inactive': State.objects.filter(status=0).count(),
+    }
+    per_state = (
+        FamilyHead.objects.exclude(status=DELETE).exclude(state=None)
+        .values('state').annotate(total=Count('id')).values_list('state', 'total')
+    )
+    for state_id, total in per_state:
+        values[f'state_heads:{state_id}'] = total
+    DashboardCounter.objects.bulk_create(
+        [DashboardCounter(name=name, value=value) for name, value in values.items()]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('family', '0004_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'dashboard_counter',
+            },
+        ),
+        migrations.RunPython(build_counters, migrations.RunPython.noop),
+    ]
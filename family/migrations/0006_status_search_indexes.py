@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('family', '0005_dashboard_counter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='city',
+            index=models.Index(fields=['state', 'status'], name='city_state_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='city',
+            index=models.Index(fields=['status', 'created_at'], name='city_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='city',
+            index=models.Index(fields=['city_name'], name='city_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='familyhead',
+            index=models.Index(fields=['status', 'created_at'], name='head_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='familyhead',
+            index=models.Index(fields=['created_at', 'id'], name='head_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='familyhead',
+            index=models.Index(fields=['state', 'status'], name='head_state_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='familyhead',
+            index=models.Index(fields=['city', 'status'], name='head_city_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='familyhead',
+            index=models.Index(fields=['mobno'], name='head_mobno_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='familymember',
+            index=models.Index(fields=['family_head', 'status'], name='member_head_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hobby',
+            index=models.Index(fields=['family_head', 'status'], name='hobby_head_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='state',
+            index=models.Index(fields=['status', 'created_at'], name='state_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='state',
+            index=models.Index(fields=['state_name'], name='state_name_idx'),
+        ),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('family', '0006_status_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CityArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('status', models.IntegerField(choices=[(1, 'Active'), (0, 'Inactive'), (9, 'Delete')])),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('state_id', models.BigIntegerField(db_index=True)),
+                ('city_name', models.CharField(max_length=40)),
+            ],
+            options={
+                'db_table': 'city_archive',
+            },
+        ),
+        migrations.CreateModel(
+            name='FamilyHeadArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('status', models.IntegerField(choices=[(1, 'Active'), (0, 'Inactive'), (9, 'Delete')])),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('name', models.CharField(max_length=50)),
+                ('surname', models.CharField(max_length=50)),
+                ('dob', models.DateField()),
+                ('mobno', models.CharField(max_length=15)),
+                ('address', models.TextField()),
+                ('state_id', models.BigIntegerField(null=True)),
+                ('city_id', models.BigIntegerField(null=True)),
+                ('pincode', models.CharField(max_length=6)),
+                ('marital_status', models.CharField(max_length=10)),
+                ('wedding_date', models.DateField(null=True)),
+                ('photo', models.CharField(max_length=100)),
+            ],
+            options={
+                'db_table': 'family_head_archive',
+            },
+        ),
+        migrations.CreateModel(
+            name='FamilyMemberArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('status', models.IntegerField(choices=[(1, 'Active'), (0, 'Inactive'), (9, 'Delete')])),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('family_head_id', models.BigIntegerField(db_index=True)),
+                ('member_name', models.CharField(max_length=50)),
+                ('member_dob', models.DateField()),
+                ('member_marital', models.CharField(max_length=10)),
+                ('member_wedDate', models.DateField(null=True)),
+                ('education', models.CharField(max_length=10, null=True)),
+                ('member_photo', models.CharField(max_length=100, null=True)),
+            ],
+            options={
+                'db_table': 'family_member_archive',
+            },
+        ),
+        migrations.CreateModel(
+            name='HobbyArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('status', models.IntegerField(choices=[(1, 'Active'), (0, 'Inactive'), (9, 'Delete')])),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('hobby', models.CharField(max_length=50)),
+                ('family_head_id', models.BigIntegerField(db_index=True)),
+            ],
+            options={
+                'db_table': 'hobby_archive',
+            },
+        ),
+        migrations.CreateModel(
+            name='StateArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('status', models.IntegerField(choices=[(1, 'Active'), (0, 'Inactive'), (9, 'Delete')])),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('state_name', models.CharField(max_length=30)),
+            ],
+            options={
+                'db_table': 'state_archive',
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('family', '0007_soft_delete_archive'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='city',
+            index=models.Index(fields=['updated_at', 'id'], name='city_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='familyhead',
+            index=models.Index(fields=['updated_at', 'id'], name='head_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='familymember',
+            index=models.Index(fields=['updated_at', 'id'], name='member_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hobby',
+            index=models.Index(fields=['updated_at', 'id'], name='hobby_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='state',
+            index=models.Index(fields=['updated_at', 'id'], name='state_updated_id_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('family', '0008_updated_at_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('table_name', models.CharField(max_length=30)),
+                ('row_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('create', 'Create'), ('update', 'Update'), ('delete', 'Delete')], max_length=6)),
+                ('changed_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'db_table': 'change_log',
+            },
+        ),
+    ]
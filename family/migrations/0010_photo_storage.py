@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:22
+
+import family.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('family', '0009_change_log'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='familyhead',
+            name='photo',
+            field=models.ImageField(storage=family.storage.get_photo_storage, upload_to='pictures'),
+        ),
+        migrations.AlterField(
+            model_name='familymember',
+            name='member_photo',
+            field=models.ImageField(blank=True, null=True, storage=family.storage.get_photo_storage, upload_to='pictures'),
+        ),
+        migrations.CreateModel(
+            name='PhotoFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('size', models.BigIntegerField(default=0)),
+                ('refs', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'photo_file',
+                'indexes': [models.Index(fields=['refs', 'updated_at'], name='photo_file_refs_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('family', '0010_photo_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FamilyViewStat',
+            fields=[
+                ('head', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='view_stat', serialize=False, to='family.familyhead')),
+                ('views', models.BigIntegerField(default=0)),
+                ('last_viewed_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'family_view_stat',
+                'indexes': [models.Index(fields=['views'], name='view_stat_views_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,78 @@
+import re
+import unicodedata
+
+from django.db import migrations
+
+# A copy of the document and gram rules of family.search as of this migration,
+# so later changes to the models or to the search code cannot break it.
+FIELD_WEIGHTS = {
+    'name': 4,
+    'mobno': 4,
+    'surname': 3,
+    'city': 2,
+    'state': 1,
+}
+_WORD = re.compile(r'\w+')
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', str(text or ''))
+    return ''.join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def text_grams(text):
+    grams = set()
+    for word in _WORD.findall(normalize(text)):
+        padded = f'  {word} '
+        grams |= {padded[i:i + 3] for i in range(len(padded) - 2)}
+    return grams
+
+
+def document_fields(head):
+    return {
+        'name': head.name,
+        'mobno': head.mobno,
+        'surname': head.surname,
+        'city': head.city.city_name if head.city_id else '',
+        'state': head.state.state_name if head.state_id else '',
+    }
+
+
+def backfill(apps, schema_editor):
+    # Heads that already have a document are skipped, so this is safe to run again.
+    FamilyHead = apps.get_model('family', 'FamilyHead')
+    SearchDocument = apps.get_model('family', 'SearchDocument')
+    SearchToken = apps.get_model('family', 'SearchToken')
+
+    heads = (
+        FamilyHead.objects.exclude(status=9).filter(search_document__isnull=True)
+        .select_related('state', 'city').order_by('id')
+    )
+    last_id = 0
+    while True:
+        batch = list(heads.filter(id__gt=last_id)[:500])
+        if not batch:
+            return
+        documents, tokens = [], []
+        for head in batch:
+            fields = document_fields(head)
+            documents.append(SearchDocument(head=head, document=' | '.join(f'{value}' for value in fields.values())))
+            weights = {}
+            for field, value in fields.items():
+                for gram in text_grams(value):
+                    weights[gram] = max(weights.get(gram, 0), FIELD_WEIGHTS[field])
+            tokens += [SearchToken(head=head, token=gram, weight=weight) for gram, weight in weights.items()]
+        SearchDocument.objects.bulk_create(documents)
+        SearchToken.objects.bulk_create(tokens, batch_size=2000)
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('family', '0011_family_view_stat'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
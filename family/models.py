@@ -1,5 +1,7 @@
 from django.db import models
 
+from .storage import get_photo_storage
+
 class statusChoice(models.IntegerChoices):
     ACTIVE = 1
     INACTIVE = 0
@@ -9,18 +11,68 @@ class MaritalStatus(models.TextChoices):
     MARRIED = "Married"
     UNMARRIED = "Unmarried"
 
+class ActiveManager(models.Manager):
+    """Default manager: hides soft-deleted rows from every query and reverse relation."""
+
+    def get_queryset(self):
+        return super().get_queryset().exclude(status=statusChoice.DELETE)
+
+class AllObjectsManager(models.Manager):
+    """Every row, soft-deleted ones included (archival, restores, maintenance)."""
+
 class BaseModel(models.Model):
     status = models.IntegerField(
         choices=statusChoice.choices,
         default=statusChoice.ACTIVE.value,
     )
 
+    objects = ActiveManager()
+    all_objects = AllObjectsManager()
+
+    # ImageField whose file is reference counted in PhotoFile (see family.photos)
+    photo_field = None
+
     class Meta:
         abstract = True
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._counter_snapshot = instance.counter_state()
+        return instance
+
+    def counter_state(self):
+        # fields the dashboard counters and photo references depend on, as last read from / written to the db
+        state = {"status": self.__dict__.get("status")}
+        if self.photo_field and self.photo_field in self.__dict__:
+            state["photo"] = str(self.__dict__[self.photo_field] or "")
+        return state
+
+    def save(self, *args, **kwargs):
+        from .counters import record_change
+        from .photos import record_references
+
+        previous = None if self._state.adding else getattr(self, "_counter_snapshot", None)
+        super().save(*args, **kwargs)
+        current = self.counter_state()
+        record_change(self, previous, current)
+        record_references(self, previous, current)
+        self._counter_snapshot = current
+
+    def set_status(self, status):
+        """Save ``status`` if it differs from the current one."""
+        if self.status != status:
+            self.status = status
+            self.save(update_fields=["status", "updated_at"])
+
     def soft_delete(self):
         self.status = statusChoice.DELETE
-        self.save(update_fields=["status"])
+        self.save(update_fields=["status", "updated_at"])
+
+    def _mark_deleted(self):
+        # the row was already updated in bulk (and counted) by family.cascade
+        self.status = statusChoice.DELETE
+        self._counter_snapshot = self.counter_state()
 
     def delete(self, *args, **kwargs):
         # override hard delete with soft delete
@@ -35,17 +87,21 @@ class State(BaseModel):
     class Meta:
         db_table = "state"
         ordering = ["state_name"]
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="state_status_created_idx"),
+            models.Index(fields=["state_name"], name="state_name_idx"),
+            models.Index(fields=["updated_at", "id"], name="state_updated_id_idx"),
+        ]
 
     def __str__(self):
         return self.state_name
 
     def soft_delete(self):
-        super().soft_delete()
-        # cascade: cities
-        self.city_set.update(status=statusChoice.DELETE)
-        # cascade: family heads -> inactive
-        FamilyHead.objects.filter(state=self).update(status=statusChoice.INACTIVE)
-    
+        from .cascade import soft_delete_states
+
+        # cascade: cities -> deleted, family heads (and their members/hobbies) -> inactive
+        soft_delete_states([self.pk])
+        self._mark_deleted()
 
 class City(BaseModel):
     state = models.ForeignKey(State, on_delete=models.CASCADE)
@@ -56,14 +112,22 @@ class City(BaseModel):
 
     class Meta:
         db_table = "city"
+        indexes = [
+            models.Index(fields=["state", "status"], name="city_state_status_idx"),
+            models.Index(fields=["status", "created_at"], name="city_status_created_idx"),
+            models.Index(fields=["city_name"], name="city_name_idx"),
+            models.Index(fields=["updated_at", "id"], name="city_updated_id_idx"),
+        ]
 
     def __str__(self):
         return self.city_name
 
     def soft_delete(self):
-        super().soft_delete()
-        # cascade: family heads -> inactive
-        FamilyHead.objects.filter(city=self).update(status=statusChoice.INACTIVE)
+        from .cascade import soft_delete_cities
+
+        # cascade: family heads (and their members/hobbies) -> inactive
+        soft_delete_cities([self.pk])
+        self._mark_deleted()
 
 class FamilyHead(BaseModel):
     name = models.CharField(max_length=50)
@@ -76,23 +140,36 @@ class FamilyHead(BaseModel):
     pincode = models.CharField(max_length=6)
     marital_status = models.CharField(max_length=10, choices=MaritalStatus.choices, default='')
     wedding_date = models.DateField(null=True, blank=True)
-    photo = models.ImageField(upload_to="pictures")
+    photo = models.ImageField(upload_to="pictures", storage=get_photo_storage)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     status = models.IntegerField(choices = statusChoice.choices, default=statusChoice.ACTIVE.value)
 
     class Meta:
-        db_table = "family_head" 
+        db_table = "family_head"
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="head_status_created_idx"),
+            models.Index(fields=["created_at", "id"], name="head_created_id_idx"),
+            models.Index(fields=["state", "status"], name="head_state_status_idx"),
+            models.Index(fields=["city", "status"], name="head_city_status_idx"),
+            models.Index(fields=["mobno"], name="head_mobno_idx"),
+            models.Index(fields=["updated_at", "id"], name="head_updated_id_idx"),
+        ]
+
+    photo_field = "photo"
 
     def __str__(self):
         return self.name
 
+    def counter_state(self):
+        return {**super().counter_state(), "state_id": self.__dict__.get("state_id")}
+
     def soft_delete(self):
-        super().soft_delete()
-        # cascade: members
-        self.members.update(status=statusChoice.DELETE)
-        # cascade: hobbies
-        self.hobbies.update(status=statusChoice.DELETE)
+        from .cascade import soft_delete_heads
+
+        # cascade: members, hobbies
+        soft_delete_heads([self.pk])
+        self._mark_deleted()
     
 
 class Hobby(BaseModel):
@@ -104,6 +181,10 @@ class Hobby(BaseModel):
  
     class Meta:
         db_table = "hobby"
+        indexes = [
+            models.Index(fields=["family_head", "status"], name="hobby_head_status_idx"),
+            models.Index(fields=["updated_at", "id"], name="hobby_updated_id_idx"),
+        ]
 
     def __str__(self):
         return self.hobby
@@ -115,15 +196,182 @@ class FamilyMember(BaseModel):
     member_marital = models.CharField(max_length=10, choices=MaritalStatus.choices, default='')
     member_wedDate = models.DateField(null=True, blank=True)
     education = models.CharField(max_length=10, null=True, blank=True)
-    member_photo = models.ImageField(upload_to="pictures", null=True, blank=True)
+    member_photo = models.ImageField(upload_to="pictures", storage=get_photo_storage, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     status = models.IntegerField(choices = statusChoice.choices, default=statusChoice.ACTIVE.value)
 
     class Meta:
         db_table = "family_member"
+        indexes = [
+            models.Index(fields=["family_head", "status"], name="member_head_status_idx"),
+            models.Index(fields=["updated_at", "id"], name="member_updated_id_idx"),
+        ]
+
+    photo_field = "member_photo"
 
     def __str__(self):
         return self.member_name
-    
-    
\ No newline at end of file
+
+
+class DashboardCounter(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "dashboard_counter"
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+
+class FamilyViewStat(models.Model):
+    """How often a family's detail page has been opened (for warming the fragment cache)."""
+    head = models.OneToOneField(FamilyHead, on_delete=models.CASCADE, primary_key=True, related_name="view_stat")
+    views = models.BigIntegerField(default=0)
+    last_viewed_at = models.DateTimeField()
+
+    class Meta:
+        db_table = "family_view_stat"
+        indexes = [
+            models.Index(fields=["views"], name="view_stat_views_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.head_id}: {self.views}"
+
+
+class PhotoFile(models.Model):
+    """A stored photo and the number of head and member rows, deleted ones included, that use it."""
+    name = models.CharField(max_length=100, unique=True)
+    size = models.BigIntegerField(default=0)
+    refs = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "photo_file"
+        indexes = [
+            models.Index(fields=["refs", "updated_at"], name="photo_file_refs_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.refs})"
+
+
+class SearchDocument(models.Model):
+    head = models.OneToOneField(FamilyHead, on_delete=models.CASCADE, primary_key=True, related_name="search_document")
+    document = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "family_search_document"
+
+    def __str__(self):
+        return self.document
+
+
+class SearchToken(models.Model):
+    head = models.ForeignKey(FamilyHead, on_delete=models.CASCADE, related_name="search_tokens")
+    token = models.CharField(max_length=3)
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        db_table = "family_search_token"
+        constraints = [
+            models.UniqueConstraint(fields=["token", "head"], name="family_search_token_token_head"),
+        ]
+
+    def __str__(self):
+        return self.token
+
+
+
+class ChangeAction(models.TextChoices):
+    CREATE = "create"
+    UPDATE = "update"
+    DELETE = "delete"
+
+
+class ChangeLog(models.Model):
+    """Append-only log of row changes behind the /changes/ feed (see family.changes)."""
+    seq = models.BigAutoField(primary_key=True)
+    table_name = models.CharField(max_length=30)
+    row_id = models.BigIntegerField()
+    action = models.CharField(max_length=6, choices=ChangeAction.choices)
+    changed_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = "change_log"
+
+    def __str__(self):
+        return f"{self.seq} {self.action} {self.table_name}#{self.row_id}"
+
+class ArchiveModel(models.Model):
+    """
+    Copy of a soft-deleted row moved out of its live table by
+    ``manage.py archive_deleted``. Columns mirror the live table (foreign keys
+    as plain ids, photos as stored names) and keep the original primary key.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    status = models.IntegerField(choices=statusChoice.choices)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        abstract = True
+
+
+class StateArchive(ArchiveModel):
+    state_name = models.CharField(max_length=30)
+
+    class Meta:
+        db_table = "state_archive"
+
+
+class CityArchive(ArchiveModel):
+    state_id = models.BigIntegerField(db_index=True)
+    city_name = models.CharField(max_length=40)
+
+    class Meta:
+        db_table = "city_archive"
+
+
+class FamilyHeadArchive(ArchiveModel):
+    name = models.CharField(max_length=50)
+    surname = models.CharField(max_length=50)
+    dob = models.DateField()
+    mobno = models.CharField(max_length=15)
+    address = models.TextField()
+    state_id = models.BigIntegerField(null=True)
+    city_id = models.BigIntegerField(null=True)
+    pincode = models.CharField(max_length=6)
+    marital_status = models.CharField(max_length=10)
+    wedding_date = models.DateField(null=True)
+    photo = models.CharField(max_length=100)
+
+    class Meta:
+        db_table = "family_head_archive"
+
+
+class HobbyArchive(ArchiveModel):
+    hobby = models.CharField(max_length=50)
+    family_head_id = models.BigIntegerField(db_index=True)
+
+    class Meta:
+        db_table = "hobby_archive"
+
+
+class FamilyMemberArchive(ArchiveModel):
+    family_head_id = models.BigIntegerField(db_index=True)
+    member_name = models.CharField(max_length=50)
+    member_dob = models.DateField()
+    member_marital = models.CharField(max_length=10)
+    member_wedDate = models.DateField(null=True)
+    education = models.CharField(max_length=10, null=True)
+    member_photo = models.CharField(max_length=100, null=True)
+
+    class Meta:
+        db_table = "family_member_archive"
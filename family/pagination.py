@@ -0,0 +1,179 @@
+"""
+Pagination helpers for the list views.
+
+Two modes are supported:
+
+* page numbers (the default), backed by Django's ``Paginator`` but with only
+  a small window of page links instead of a list of every page;
+* keyset cursors, selected by passing ``cursor`` in the query string. Pages
+  are read with ``WHERE (created_at, id) < cursor ORDER BY created_at DESC,
+  id DESC LIMIT n`` so deep pages cost the same as the first one and no
+  ``COUNT(*)`` is issued. A cached, approximate total can be requested with
+  ``count=1``.
+"""
+import base64
+import binascii
+import hashlib
+from datetime import datetime
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Q
+
+from fims.cache import aget_or_set
+
+PAGE_WINDOW = 2
+
+
+def encode_cursor(created_at, pk):
+    raw = f"{created_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Return ``(created_at, pk)`` for ``token``; raises ``ValueError`` if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        created_at, pk = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (TypeError, UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError(f"Invalid cursor: {token!r}") from e
+
+
+class CursorPage:
+    """Page of a keyset-paginated queryset, duck-typed like ``django.core.paginator.Page``."""
+
+    def __init__(self, object_list, next_cursor=None, prev_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def _cursor_query(queryset, cursor, direction, per_page):
+    """The ``per_page + 1`` rows to read for a cursor page, and whether they run backwards."""
+    queryset = queryset.order_by()
+    backwards = direction == "prev" and cursor is not None
+    if cursor is not None:
+        created_at, pk = decode_cursor(cursor)
+        if backwards:
+            queryset = queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+        else:
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    ordering = ("created_at", "id") if backwards else ("-created_at", "-id")
+    return queryset.order_by(*ordering)[:per_page + 1], backwards
+
+
+def _cursor_page(rows, cursor, backwards, per_page):
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+    if not rows:
+        return CursorPage(rows)
+
+    first, last = rows[0], rows[-1]
+    if backwards:
+        next_cursor = encode_cursor(last.created_at, last.pk)
+        prev_cursor = encode_cursor(first.created_at, first.pk) if more else None
+    else:
+        next_cursor = encode_cursor(last.created_at, last.pk) if more else None
+        prev_cursor = encode_cursor(first.created_at, first.pk) if cursor is not None else None
+    return CursorPage(rows, next_cursor, prev_cursor)
+
+
+async def acursor_paginate(queryset, cursor=None, direction="next", per_page=10):
+    """
+    Return a ``CursorPage`` of ``queryset`` ordered newest first by ``(created_at, id)``.
+
+    ``cursor`` is the token of the row to continue from; ``direction="prev"``
+    walks back towards newer rows.
+    """
+    rows, backwards = _cursor_query(queryset, cursor, direction, per_page)
+    return _cursor_page([row async for row in rows], cursor, backwards, per_page)
+
+
+def _count_key(key):
+    return "pagination:count:" + hashlib.sha1(key.encode()).hexdigest()
+
+
+def _count_timeout():
+    return getattr(settings, "PAGINATION_COUNT_TIMEOUT", 300)
+
+
+async def aapproximate_count(queryset, key):
+    """
+    ``queryset.count()`` cached for ``PAGINATION_COUNT_TIMEOUT`` seconds under
+    ``key``; one request at a time runs the ``COUNT(*)`` (see ``fims.cache``).
+    """
+    return await aget_or_set(_count_key(key), queryset.order_by().acount, _count_timeout())
+
+
+def page_window(page_obj, radius=PAGE_WINDOW):
+    last = page_obj.paginator.num_pages
+    return list(range(max(1, page_obj.number - radius), min(last, page_obj.number + radius) + 1))
+
+
+def _cursor_args(request):
+    return request.GET.get("cursor") or None, request.GET.get("direction", "next")
+
+
+def _cursor_meta(page_obj):
+    return {
+        "next_cursor": page_obj.next_cursor,
+        "prev_cursor": page_obj.prev_cursor,
+        "has_next": page_obj.has_next(),
+        "has_previous": page_obj.has_previous(),
+    }
+
+
+def _numbered_context(page_obj):
+    return {
+        "page_obj": page_obj,
+        "lastPage": page_obj.paginator.num_pages,
+        "totalPagelist": page_window(page_obj),
+    }
+
+
+async def apage_context(request, queryset, per_page=10, count_key=None, cursor_queryset=None):
+    """
+    Build the pagination part of a list view context from ``request.GET``.
+
+    In cursor mode the context also carries a ``cursor`` dict meant to be
+    merged into the AJAX JSON response. ``cursor_queryset`` lets a view
+    substitute an unranked queryset there, since cursors follow
+    ``created_at`` order. The page rows are loaded before returning, so the
+    context can be rendered without touching the database.
+    """
+    if "cursor" in request.GET:
+        queryset = cursor_queryset if cursor_queryset is not None else queryset
+        cursor, direction = _cursor_args(request)
+        try:
+            page_obj = await acursor_paginate(queryset, cursor, direction, per_page)
+        except ValueError:
+            page_obj = await acursor_paginate(queryset, None, "next", per_page)
+        meta = _cursor_meta(page_obj)
+        if request.GET.get("count") and count_key:
+            meta["approx_total"] = await aapproximate_count(queryset, count_key)
+        return {"page_obj": page_obj, "cursor": meta}
+
+    paginator = Paginator(queryset, per_page)
+    paginator.count = await queryset.acount()  # cached_property; skips the sync COUNT(*)
+    page_obj = paginator.get_page(request.GET.get("page"))
+    page_obj.object_list = [row async for row in page_obj.object_list]
+    return _numbered_context(page_obj)
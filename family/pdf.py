@@ -0,0 +1,208 @@
+"""
+Family PDF reports.
+
+Paragraph and table styles are built once per process. Head details are
+laid out as a two-column label/value table beside the photo, and members as
+one table row each with a thumbnail. Photos come from their ``print``/
+``thumb`` renditions; the JPEG bytes, downscaled with Pillow when only the
+original exists, are kept in an LRU cache keyed by path and mtime, so a
+photo used by many rows or reports is read once. reportlab embeds identical
+images once per document.
+
+``write_families_pdf`` renders any number of families into one document:
+heads are read in keyset batches and their flowables are produced only as
+the layout reaches them (``FlowableStream``), so memory is bounded by the
+batch size and the compressed pages rather than by the number of families.
+Writers take any file object; ``spool()`` returns one that stays in memory up
+to ``PDF_SPOOL_BYTES`` and moves to disk after that, for views to stream back
+with ``FileResponse``.
+"""
+import io
+import logging
+import os
+import tempfile
+from functools import lru_cache
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from PIL import Image as PILImage, ImageOps
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import (
+    SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle, KeepTogether, PageBreak,
+)
+
+from .exports import iter_keyset
+from .images import rendition_path
+
+logger = logging.getLogger(__name__)
+
+DPI = 150
+HEAD_PHOTO = (1.5 * inch, 2 * inch)
+MEMBER_PHOTO = (0.6 * inch, 0.6 * inch)
+MEMBER_COLUMNS = ["#", "Name", "Birth Date", "Marital Status", "Wedding Date", "Education", "Photo"]
+BATCH_SIZE = 100
+IMAGE_CACHE_SIZE = 256
+SPOOL_BYTES = 8 * 1024 * 1024
+
+
+@lru_cache(maxsize=None)
+def styles():
+    sample = getSampleStyleSheet()
+    return {
+        "title": sample["Heading1"],
+        "section": ParagraphStyle("FamilySection", parent=sample["Heading2"], spaceBefore=10, spaceAfter=4),
+        "value": ParagraphStyle("FamilyValue", parent=sample["Normal"], fontSize=9, leading=11),
+        "details": TableStyle([
+            ("FONTNAME", (0, 0), (0, -1), "Helvetica-Bold"),
+            ("FONTSIZE", (0, 0), (-1, -1), 9),
+            ("VALIGN", (0, 0), (-1, -1), "TOP"),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
+            ("TOPPADDING", (0, 0), (-1, -1), 2),
+        ]),
+        "members": TableStyle([
+            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+            ("FONTSIZE", (0, 0), (-1, -1), 9),
+            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#246ba1")),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.HexColor("#f7f6fa")),
+            ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#eef3f8")]),
+            ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#c8d3de")),
+            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ]),
+    }
+
+
+@lru_cache(maxsize=IMAGE_CACHE_SIZE)
+def _jpeg(path, mtime, box):
+    """JPEG bytes of ``path`` no larger than ``box`` pixels; ``mtime`` keys out stale entries."""
+    with PILImage.open(path) as image:
+        if image.format == "JPEG" and image.width <= box[0] and image.height <= box[1]:
+            with open(path, "rb") as source:
+                return source.read()
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        image.thumbnail(box, PILImage.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=82, optimize=True)
+        return buffer.getvalue()
+
+
+def photo(field_file, rendition, size):
+    """An ``Image`` flowable of ``size`` points for the photo, or ``None``."""
+    if not field_file:
+        return None
+    try:
+        path = rendition_path(field_file, rendition)
+        box = (round(size[0] / inch * DPI), round(size[1] / inch * DPI))
+        data = _jpeg(path, os.path.getmtime(path), box)
+    except (OSError, ValueError) as e:
+        logger.warning("Cannot add photo %s to PDF: %s", field_file.name, e)
+        return None
+    return Image(io.BytesIO(data), width=size[0], height=size[1])
+
+
+def _cell(value, fits=40):
+    """Plain text for a table cell, or a wrapping ``Paragraph`` when longer than ``fits`` characters."""
+    text = "-" if value is None or value == "" else str(value)
+    return Paragraph(escape(text), styles()["value"]) if len(text) > fits else text
+
+
+def family_flowables(head, hobbies, members):
+    """Flowables of one family's report."""
+    style = styles()
+    details = Table([[label, _cell(value, 60)] for label, value in [
+        ("Name", head.name),
+        ("Surname", head.surname),
+        ("Birth Date", head.dob),
+        ("Mobile", head.mobno),
+        ("Address", head.address),
+        ("State", head.state.state_name if head.state else None),
+        ("City", head.city.city_name if head.city else None),
+        ("Pincode", head.pincode),
+        ("Marital Status", head.marital_status),
+        ("Wedding Date", head.wedding_date),
+        ("Hobbies", ", ".join(h.hobby for h in hobbies)),
+    ]], colWidths=[1.2 * inch, 3.6 * inch], style=style["details"])
+    head_photo = photo(head.photo, "print", HEAD_PHOTO)
+    summary = Table([[details, head_photo or ""]], colWidths=[4.9 * inch, HEAD_PHOTO[0] + 0.2 * inch],
+                    style=style["details"])
+
+    elements = [
+        Paragraph(f"Family Report: {escape(head.surname)} Family", style["title"]),
+        Paragraph("Head Details", style["section"]),
+        summary,
+    ]
+    members = list(members)
+    if members:
+        rows = [MEMBER_COLUMNS] + [
+            [i, _cell(m.member_name, 28), _cell(m.member_dob), _cell(m.member_marital),
+             _cell(m.member_wedDate), _cell(m.education), photo(m.member_photo, "thumb", MEMBER_PHOTO) or ""]
+            for i, m in enumerate(members, start=1)
+        ]
+        table = Table(rows, repeatRows=1, style=style["members"],
+                      colWidths=[0.3 * inch, 1.7 * inch, 0.9 * inch, 1.0 * inch, 0.95 * inch, 0.8 * inch, 0.75 * inch])
+        elements += [KeepTogether([Paragraph("Members", style["section"]), Spacer(1, 2)]), table]
+    return elements
+
+
+class FlowableStream(list):
+    """
+    Flowables pulled from ``source`` as reportlab consumes them.
+
+    ``SimpleDocTemplate.build`` works through a list from the front; topping
+    the list up whenever it is read keeps only ``ahead`` flowables in memory.
+    """
+
+    def __init__(self, source, ahead=50):
+        super().__init__()
+        self._source = iter(source)
+        self._ahead = ahead
+
+    def _fill(self):
+        while self._source is not None and list.__len__(self) < self._ahead:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+
+    def __len__(self):
+        self._fill()
+        return list.__len__(self)
+
+    def __getitem__(self, index):
+        self._fill()
+        return list.__getitem__(self, index)
+
+
+def _document(output, title):
+    return SimpleDocTemplate(
+        output, pagesize=A4, title=title, pageCompression=1,
+        leftMargin=0.6 * inch, rightMargin=0.6 * inch, topMargin=0.6 * inch, bottomMargin=0.6 * inch,
+    )
+
+
+def write_family_pdf(head, hobbies, members, output):
+    _document(output, f"{head.surname} Family").build(family_flowables(head, hobbies, members))
+
+
+def write_families_pdf(heads, output, batch_size=BATCH_SIZE, progress=None):
+    """
+    Render every family of ``heads`` into one PDF, a page (or more) each.
+
+    ``heads`` should come from ``family.exports.export_heads`` so each batch
+    carries its state, city, active hobbies and active members.
+    """
+    def flowables():
+        for count, head in enumerate(iter_keyset(heads, batch_size), start=1):
+            if count > 1:
+                yield PageBreak()
+            yield from family_flowables(head, head.active_hobbies, head.active_members)
+            if progress:
+                progress(count)
+
+    _document(output, "Family Reports").build(FlowableStream(flowables()))
+
+
+def spool():
+    return tempfile.SpooledTemporaryFile(max_size=getattr(settings, "PDF_SPOOL_BYTES", SPOOL_BYTES))
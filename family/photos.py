@@ -0,0 +1,245 @@
+"""
+Photo reference counts.
+
+``PhotoFile`` has one row per stored photo with the number of head and
+member rows that use it. Soft-deleted rows keep their photo, so only the
+hard deletes of a purge (``family.archive``, ``family.synthetic.clear``)
+release a reference. The counts are adjusted where the references change:
+
+* ``BaseModel.save`` diffs the photo loaded from the database with the saved
+  one (``record_references``);
+* the bulk writers (``family.services``, ``family.importer``) pass the rows
+  they inserted or updated to ``record_bulk``;
+* purges call ``release`` on the rows before deleting them.
+
+``reclaim`` deletes the files (and their renditions) that nothing refers to
+any more. It checks the live tables again before removing a file, so a
+count that drifted (writes that bypass the above) never costs a photo in
+use; ``rebuild`` recounts everything.
+
+``rehash`` (``manage.py rehash_photos``) moves photos stored before the
+content-addressed ``PhotoStorage`` to their hashed names, merging duplicate
+uploads into one file, and then rebuilds the counts.
+"""
+import hashlib
+import logging
+import os
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from . import fragments
+from .changes import log_queryset
+from .images import FORMATS, RENDITIONS, create_renditions, rendition_name
+from .models import FamilyHead, FamilyMember, FamilyHeadArchive, FamilyMemberArchive, PhotoFile, ChangeAction
+from .storage import UPLOAD_DIR, hashed_name, is_hashed, photo_storage
+
+logger = logging.getLogger(__name__)
+
+PHOTO_MODELS = (FamilyHead, FamilyMember)
+ARCHIVE_PHOTO_FIELDS = ((FamilyHeadArchive, "photo"), (FamilyMemberArchive, "member_photo"))
+RECLAIM_BATCH_SIZE = 500
+# files released less than this long ago are kept, in case a row referring to them is about to commit
+RECLAIM_GRACE = timedelta(hours=1)
+
+
+def _size(name):
+    try:
+        return photo_storage.size(name)
+    except OSError:
+        return 0
+
+
+def adjust(deltas):
+    """Apply ``{photo name: delta}`` to the reference counts; empty names are ignored."""
+    for name, delta in deltas.items():
+        if not name or not delta:
+            continue
+        if PhotoFile.objects.filter(name=name).update(refs=F("refs") + delta):
+            continue
+        try:
+            with transaction.atomic():
+                PhotoFile.objects.create(name=name, size=_size(name), refs=delta)
+        except IntegrityError:
+            PhotoFile.objects.filter(name=name).update(refs=F("refs") + delta)
+
+
+def record_references(instance, previous, current):
+    """Count ``instance`` moving from its ``previous`` photo to the ``current`` one (see ``BaseModel.counter_state``)."""
+    if "photo" not in current or (previous is not None and "photo" not in previous):
+        # not a photo model, or the photo was deferred when the row was loaded
+        return
+    old = previous["photo"] if previous else ""
+    if old != current["photo"]:
+        adjust({current["photo"]: 1, old: -1})
+
+
+def record_bulk(instances):
+    """``record_references`` for rows written with ``bulk_create``/``bulk_update``."""
+    deltas = Counter()
+    for instance in instances:
+        previous = None if instance._state.adding else getattr(instance, "_counter_snapshot", None)
+        current = instance.counter_state()
+        if "photo" in current and (previous is None or "photo" in previous):
+            deltas[current["photo"]] += 1
+            if previous:
+                deltas[previous["photo"]] -= 1
+        instance._counter_snapshot = current
+    adjust(deltas)
+
+
+def _counts(queryset):
+    field = queryset.model.photo_field
+    rows = queryset.exclude(**{field: ""}).exclude(**{field: None}).order_by()
+    return dict(rows.values_list(field).annotate(n=Count("id")))
+
+
+def release(queryset):
+    """Drop the references of the head or member rows of ``queryset``, before they are deleted."""
+    adjust({name: -n for name, n in _counts(queryset).items()})
+
+
+def rebuild():
+    """Recount every reference from the head and member tables; returns the number of photos in use."""
+    counts = Counter()
+    for model in PHOTO_MODELS:
+        counts.update(_counts(model.all_objects.all()))
+    now = timezone.now()
+    with transaction.atomic():
+        existing = {photo.name: photo for photo in PhotoFile.objects.select_for_update()}
+        changed = []
+        for name, photo in existing.items():
+            if photo.refs != counts.get(name, 0):
+                photo.refs, photo.updated_at = counts.get(name, 0), now
+                changed.append(photo)
+        PhotoFile.objects.bulk_update(changed, ["refs", "updated_at"], batch_size=1000)
+        PhotoFile.objects.bulk_create(
+            [PhotoFile(name=name, size=_size(name), refs=n) for name, n in counts.items() if name not in existing],
+            batch_size=1000,
+        )
+    return len(counts)
+
+
+def in_use(names):
+    """The subset of ``names`` still stored on a head or member row."""
+    used = set()
+    for model in PHOTO_MODELS:
+        field = model.photo_field
+        used.update(model.all_objects.filter(**{f"{field}__in": names}).values_list(field, flat=True))
+    return used
+
+
+def delete_file(name):
+    """Delete a stored photo and its renditions."""
+    for target in [name] + [rendition_name(name, r, fmt) for r in RENDITIONS for fmt in FORMATS]:
+        photo_storage.delete(target)
+
+
+def reclaim(grace=None, batch_size=RECLAIM_BATCH_SIZE):
+    """
+    Delete the photos nobody refers to; returns ``(files, bytes)`` removed.
+
+    Only counts released more than ``grace`` (``PHOTO_RECLAIM_GRACE_SECONDS``,
+    default an hour) ago are considered; storing the same bytes again touches
+    the row (``PhotoStorage._save``), which restarts the grace period.
+    """
+    if grace is None:
+        grace = timedelta(seconds=getattr(settings, "PHOTO_RECLAIM_GRACE_SECONDS", RECLAIM_GRACE.total_seconds()))
+    before = timezone.now() - grace
+    files = size = 0
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                PhotoFile.objects.select_for_update(skip_locked=True)
+                .filter(refs__lte=0, updated_at__lt=before, id__gt=last_id).order_by("id")[:batch_size]
+            )
+            if not batch:
+                return files, size
+            last_id = batch[-1].id
+            used = in_use([photo.name for photo in batch])
+            unused = [photo for photo in batch if photo.name not in used]
+            PhotoFile.objects.filter(id__in=[photo.id for photo in unused]).delete()
+            # while the rows are locked: an upload of the same bytes waits for them and
+            # then finds no file; should this transaction roll back, nothing used the files
+            for photo in unused:
+                delete_file(photo.name)
+        files += len(unused)
+        size += sum(photo.size for photo in unused)
+
+
+def _stored_names():
+    names = set()
+    for model in PHOTO_MODELS:
+        names.update(_counts(model.all_objects.all()))
+    return names
+
+
+def _digest(name):
+    digest = hashlib.sha256()
+    with photo_storage.open(name, "rb") as source:
+        for chunk in source.chunks():
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _rename(old, new, now):
+    """Point every row, archived ones included, from ``old`` to ``new``; returns the live rows changed."""
+    rows = 0
+    with transaction.atomic():
+        for model in PHOTO_MODELS:
+            queryset = model.all_objects.filter(**{model.photo_field: old})
+            log_queryset(queryset, ChangeAction.UPDATE, now)
+            head_field = "id" if model is FamilyHead else "family_head_id"
+            fragments.bump(queryset.values_list(head_field, flat=True))
+            rows += queryset.update(**{model.photo_field: new, "updated_at": now})
+        for model, field in ARCHIVE_PHOTO_FIELDS:
+            model.objects.filter(**{field: old}).update(**{field: new})
+    return rows
+
+
+def rehash(dry_run=False, keep_originals=False, progress=None):
+    """
+    Move the photos not stored by content hash yet to their hashed names.
+
+    Rows are repointed (and logged as changed) photo by photo, renditions are
+    written for the new names, and the old file and its renditions are
+    deleted unless ``keep_originals`` is set. With ``dry_run`` the files are
+    only hashed. Returns counts and sizes for the report.
+    """
+    legacy = sorted(name for name in _stored_names() if not is_hashed(name))
+    stats = {"photos": len(legacy), "files": 0, "missing": 0, "rows": 0, "bytes_before": 0, "bytes_after": 0}
+    stored = set()
+    now = timezone.now()
+    for count, old in enumerate(legacy, start=1):
+        try:
+            size = photo_storage.size(old)
+            if dry_run:
+                new = hashed_name(_digest(old), old)
+            else:
+                with photo_storage.open(old, "rb") as source:
+                    new = photo_storage.save(f"{UPLOAD_DIR}/{os.path.basename(old)}", source)
+        except OSError as e:
+            logger.warning("Cannot rehash photo %s: %s", old, e)
+            stats["missing"] += 1
+            continue
+        stats["bytes_before"] += size
+        if new not in stored:
+            stored.add(new)
+            stats["bytes_after"] += size
+        if not dry_run:
+            stats["rows"] += _rename(old, new, now)
+            create_renditions(FamilyHead(photo=new).photo)
+            if not keep_originals:
+                delete_file(old)
+                PhotoFile.objects.filter(name=old).delete()
+        if progress:
+            progress(count, len(legacy))
+    stats["files"] = len(stored)
+    if not dry_run:
+        rebuild()
+    return stats
@@ -0,0 +1,207 @@
+"""
+Trigram search index for family heads.
+
+Each ``FamilyHead`` has a denormalised ``SearchDocument`` (name, surname,
+mobile, state and city) and one ``SearchToken`` row per distinct trigram of
+that document. Words are padded on the left, so the leading grams of a word
+("  r", " ra") double as prefix matches. A query matches a head when every
+query word matches:
+
+* a word of ``MIN_GRAM_WORD`` or more letters needs ``MATCH_RATIO`` of its
+  own grams, which tolerates typos and partial words;
+* numbers must occur in the mobile number, at any position as the search
+  did before the index (two mobile numbers with a common prefix share half
+  of their grams, so digits are not matched by grams);
+* shorter words are matched as substrings of the document.
+
+Results are ranked by the summed field weight of the matched grams.
+
+The index is kept in sync by the signal handlers in ``family.signals``; the
+``rebuild_search_index`` management command rebuilds it from scratch.
+"""
+import math
+import re
+import unicodedata
+
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import SearchDocument, SearchToken
+
+MATCH_RATIO = 0.5
+MAX_QUERY_GRAMS = 64
+# shorter words have too few grams to match fuzzily
+MIN_GRAM_WORD = 3
+
+# field -> weight of the grams it contributes
+FIELD_WEIGHTS = {
+    'name': 4,
+    'mobno': 4,
+    'surname': 3,
+    'city': 2,
+    'state': 1,
+}
+
+_WORD = re.compile(r'\w+')
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', str(text or ''))
+    return ''.join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def _word_grams(word, trailing=True):
+    padded = f'  {word} ' if trailing else f'  {word}'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def text_grams(text, trailing=True):
+    grams = set()
+    for word in _WORD.findall(normalize(text)):
+        grams |= _word_grams(word, trailing)
+    return grams
+
+
+def query_terms(query):
+    """
+    ``(words, numbers, substrings)`` of ``query``, see the module docstring;
+    ``words`` holds the sorted grams of each word matched by grams.
+    """
+    words, numbers, substrings = [], [], []
+    for word in dict.fromkeys(_WORD.findall(normalize(query))):
+        if word.isdigit():
+            numbers.append(word)
+        elif len(word) < MIN_GRAM_WORD:
+            substrings.append(word)
+        else:
+            # no trailing pad: the last gram of each query word is a prefix, not an ending
+            words.append(sorted(_word_grams(word, trailing=False))[:MAX_QUERY_GRAMS])
+    return words, numbers, substrings
+
+
+def query_grams(query):
+    """Every gram of the words of ``query``, as used for ranking."""
+    return sorted({gram for grams in query_terms(query)[0] for gram in grams})
+
+
+def document_fields(head):
+    return {
+        'name': head.name,
+        'mobno': head.mobno,
+        'surname': head.surname,
+        'city': head.city.city_name if head.city_id and head.city else '',
+        'state': head.state.state_name if head.state_id and head.state else '',
+    }
+
+
+def document_text(head):
+    return ' | '.join(f'{value}' for value in document_fields(head).values())
+
+
+def document_tokens(head):
+    weights = {}
+    for field, value in document_fields(head).items():
+        for gram in text_grams(value):
+            weights[gram] = max(weights.get(gram, 0), FIELD_WEIGHTS[field])
+    return weights
+
+
+def index_heads(heads):
+    """
+    (Re)index ``heads``; heads whose document text is unchanged are skipped.
+
+    Returns the number of heads whose tokens were rewritten.
+    """
+    heads = list(heads)
+    if not heads:
+        return 0
+    existing = dict(
+        SearchDocument.objects.filter(head__in=heads).values_list('head_id', 'document')
+    )
+    changed = [head for head in heads if existing.get(head.pk) != document_text(head)]
+    if not changed:
+        return 0
+
+    with transaction.atomic():
+        SearchToken.objects.filter(head__in=changed).delete()
+        SearchDocument.objects.filter(head__in=changed).delete()
+        SearchDocument.objects.bulk_create(
+            [SearchDocument(head=head, document=document_text(head)) for head in changed]
+        )
+        SearchToken.objects.bulk_create(
+            [
+                SearchToken(head=head, token=gram, weight=weight)
+                for head in changed
+                for gram, weight in document_tokens(head).items()
+            ],
+            batch_size=2000,
+        )
+    return len(changed)
+
+
+def index_head(head):
+    return index_heads([head])
+
+
+def reindex_queryset(heads, batch_size=500):
+    """Index every head in ``heads`` in primary-key batches."""
+    heads = heads.select_related('state', 'city').order_by('id')
+    last_id, total = 0, 0
+    while True:
+        batch = list(heads.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return total
+        total += index_heads(batch)
+        last_id = batch[-1].id
+
+
+def matching_head_ids(grams):
+    """Subquery of the head ids that have at least ``MATCH_RATIO`` of ``grams`` (those of one word)."""
+    needed = max(1, math.ceil(len(grams) * MATCH_RATIO))
+    return (
+        SearchToken.objects.filter(token__in=grams)
+        .values('head')
+        .annotate(hits=Count('token'))
+        .filter(hits__gte=needed)
+        .values('head')
+    )
+
+
+def match_filter(query):
+    """``Q`` for the heads matching ``query``; ``None`` when the query has no searchable words."""
+    words, numbers, substrings = query_terms(query)
+    if not (words or numbers or substrings):
+        return None
+    condition = Q()
+    for grams in words:
+        condition &= Q(pk__in=matching_head_ids(grams))
+    for number in numbers:
+        condition &= Q(mobno__contains=number)
+    for word in substrings:
+        condition &= Q(search_document__document__icontains=word)
+    return condition
+
+
+def filter_heads(heads, query):
+    """Restrict ``heads`` to those matching ``query`` without ranking them."""
+    condition = match_filter(query)
+    if condition is None:
+        return heads.none()
+    return heads.filter(condition)
+
+
+def rank_heads(heads, query):
+    """Restrict ``heads`` to those matching ``query``, best matches first."""
+    heads = filter_heads(heads, query)
+    rank = (
+        SearchToken.objects.filter(head=OuterRef('pk'), token__in=query_grams(query))
+        .values('head')
+        .annotate(score=Sum('weight'))
+        .values('score')
+    )
+    return (
+        heads
+        .annotate(search_rank=Coalesce(Subquery(rank, output_field=IntegerField()), 0))
+        .order_by('-search_rank', '-created_at', '-id')
+    )
@@ -0,0 +1,72 @@
+"""
+Family write service.
+
+``save_family`` persists a validated head form and its hobby/member inline
+formsets in one transaction: the head with a normal ``save()`` (so its
+signals keep the search index, renditions and change log current) and the
+children with one ``bulk_create``, one ``bulk_update`` and one set-based
+soft delete per table. The dashboard counters, change log, member photo
+references and renditions that the per-row ``save()`` calls used to maintain
+are updated here in bulk.
+"""
+from django.db import transaction
+from django.db.models import FileField
+from django.utils import timezone
+
+from . import counters, photos
+from .changes import log_queryset
+from .images import create_renditions
+from .models import FamilyMember, ChangeAction, statusChoice
+
+
+def _save_children(formset, head, now):
+    """Write one formset; returns ``(created, deleted)`` row counts."""
+    model = formset.model
+    formset.instance = head
+    formset.save(commit=False)
+
+    created = formset.new_objects
+    if created:
+        model.objects.bulk_create(created)
+        if all(obj.pk for obj in created):
+            new_rows = model.all_objects.filter(pk__in=[obj.pk for obj in created])
+        else:
+            # MySQL returns no ids from a multi-row INSERT
+            new_rows = model.all_objects.filter(family_head=head, created_at__gte=now)
+        log_queryset(new_rows, ChangeAction.CREATE, now)
+
+    changed = [obj for obj, _ in formset.changed_objects]
+    if changed:
+        fields = {name for _, changed_data in formset.changed_objects for name in changed_data}
+        file_fields = [f for f in model._meta.concrete_fields if f.name in fields and isinstance(f, FileField)]
+        for obj in changed:
+            obj.updated_at = now
+            # bulk_update skips pre_save, which is where uploads are written to storage
+            for field in file_fields:
+                field.pre_save(obj, add=False)
+        model.objects.bulk_update(changed, sorted(fields | {"updated_at"}))
+        log_queryset(model.all_objects.filter(pk__in=[obj.pk for obj in changed]), ChangeAction.UPDATE, now)
+
+    deleted = 0
+    deleted_ids = [obj.pk for obj in formset.deleted_objects]
+    if deleted_ids:
+        rows = model.objects.filter(pk__in=deleted_ids)
+        log_queryset(rows, ChangeAction.DELETE, now)
+        deleted = rows.update(status=statusChoice.DELETE, updated_at=now)
+
+    if model is FamilyMember:
+        photos.record_bulk(created + changed)
+        for obj in created + changed:
+            create_renditions(obj.member_photo)
+    return len(created), deleted
+
+
+def save_family(head_form, hobby_formset, member_formset):
+    """Save a validated family (head form plus hobby and member formsets); returns the head."""
+    now = timezone.now()
+    with transaction.atomic():
+        head = head_form.save()
+        _save_children(hobby_formset, head, now)
+        created, deleted = _save_children(member_formset, head, now)
+        counters.add({counters.MEMBERS: created - deleted})
+    return head
@@ -0,0 +1,83 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import FamilyHead, FamilyMember, Hobby, State, City
+from .images import create_renditions
+from . import catalogue, fragments
+from .changes import TRACKED_MODELS, action_for, log_change
+from .search import index_head, reindex_queryset
+
+
+def _status_only(update_fields):
+    return update_fields is not None and set(update_fields) <= {"status", "updated_at"}
+
+
+@receiver(post_save, sender=FamilyHead, dispatch_uid="family_search_head")
+def index_family_head(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or _status_only(update_fields):
+        return
+    index_head(instance)
+
+
+@receiver(post_save, sender=State, dispatch_uid="family_search_state")
+def reindex_state_heads(sender, instance, created=False, update_fields=None, raw=False, **kwargs):
+    # only a rename changes the documents, and a new state has no heads yet
+    if raw or created or _status_only(update_fields):
+        return
+    reindex_queryset(FamilyHead.objects.filter(state=instance))
+
+
+@receiver(post_save, sender=City, dispatch_uid="family_search_city")
+def reindex_city_heads(sender, instance, created=False, update_fields=None, raw=False, **kwargs):
+    if raw or created or _status_only(update_fields):
+        return
+    reindex_queryset(FamilyHead.objects.filter(city=instance))
+
+
+@receiver(post_save, sender=State, dispatch_uid="family_catalogue_state_save")
+@receiver(post_save, sender=City, dispatch_uid="family_catalogue_city_save")
+@receiver(post_delete, sender=State, dispatch_uid="family_catalogue_state_delete")
+@receiver(post_delete, sender=City, dispatch_uid="family_catalogue_city_delete")
+def invalidate_location_catalogue(sender, raw=False, **kwargs):
+    if raw:
+        return
+    catalogue.invalidate()
+
+
+@receiver(post_save, sender=FamilyHead, dispatch_uid="family_photo_head")
+def head_photo_renditions(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or _status_only(update_fields):
+        return
+    create_renditions(instance.photo)
+
+
+@receiver(post_save, sender=FamilyMember, dispatch_uid="family_photo_member")
+def member_photo_renditions(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or _status_only(update_fields):
+        return
+    create_renditions(instance.member_photo)
+
+
+@receiver(post_save, sender=FamilyHead, dispatch_uid="family_fragments_head")
+def bump_head_fragments(sender, instance, created=False, raw=False, **kwargs):
+    if raw or created:
+        return
+    fragments.bump([instance.pk])
+
+
+@receiver(post_save, sender=Hobby, dispatch_uid="family_fragments_hobby")
+@receiver(post_save, sender=FamilyMember, dispatch_uid="family_fragments_member")
+def bump_family_fragments(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    fragments.bump([instance.family_head_id])
+
+
+def log_row_change(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    log_change(instance, action_for(instance, created))
+
+
+for _model in TRACKED_MODELS:
+    post_save.connect(log_row_change, sender=_model, dispatch_uid=f"family_changes_{_model._meta.db_table}")
@@ -0,0 +1,107 @@
+"""
+Content-addressed storage for family photos.
+
+``PhotoStorage`` stores every upload under ``pictures/`` by the SHA-256 of
+its bytes, in a two-level sharded tree::
+
+    pictures/3f/a9/3fa9...e1.jpg
+
+The upload is hashed while it is written to a temporary file next to the
+target, then hard-linked into place (moved, on filesystems without hard
+links); when the target already exists the same bytes are stored already and
+the temporary copy is dropped. Before that check the photo's ``PhotoFile``
+row is touched, so a file released long ago starts a new grace period
+instead of being reclaimed under the row about to refer to it (see
+``family.photos.reclaim``). Identical uploads
+therefore share one file, names never get Django's random suffix, and a name
+identifies its content for as long as it exists, which makes it a stable key
+for exports and caches.
+
+Files outside ``pictures/`` (the renditions of ``family.images``) are stored
+under their own names as with ``FileSystemStorage``. How many rows refer to
+each photo is kept in ``PhotoFile`` by ``family.photos``.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+UPLOAD_DIR = "pictures"
+HASHED_NAME = re.compile(r"^%s/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.[a-z0-9]{1,5}$" % UPLOAD_DIR)
+# extensions that name the same format
+EXTENSIONS = {"jpeg": "jpg", "jpe": "jpg", "tif": "tiff"}
+
+
+def hashed_name(digest, original_name):
+    """Storage name of content with SHA-256 ``digest`` uploaded as ``original_name``."""
+    ext = os.path.splitext(original_name)[1].lstrip(".").lower()
+    ext = EXTENSIONS.get(ext, ext)
+    if not re.fullmatch(r"[a-z0-9]{1,5}", ext):
+        ext = "bin"
+    return f"{UPLOAD_DIR}/{digest[:2]}/{digest[2:4]}/{digest}.{ext}"
+
+
+def is_hashed(name):
+    return bool(name and HASHED_NAME.match(name))
+
+
+@deconstructible
+class PhotoStorage(FileSystemStorage):
+    def _content_addressed(self, name):
+        return name.replace("\\", "/").startswith(UPLOAD_DIR + "/")
+
+    def get_available_name(self, name, max_length=None):
+        # the final name comes from the content, so there is nothing to make unique
+        if self._content_addressed(name):
+            return name
+        return super().get_available_name(name, max_length)
+
+    def _save(self, name, content):
+        if not self._content_addressed(name):
+            return super()._save(name, content)
+
+        directory = self.path(UPLOAD_DIR)
+        os.makedirs(directory, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        try:
+            digest = hashlib.sha256()
+            with os.fdopen(fd, "wb") as output:
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    output.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary, self.file_permissions_mode)
+
+            name = hashed_name(digest.hexdigest(), name)
+            full_path = self.path(name)
+            # waits for a reclaim holding the row, which deletes the file before it lets go
+            apps.get_model("family", "PhotoFile").objects.filter(name=name).update(updated_at=timezone.now())
+            if not os.path.exists(full_path):
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                try:
+                    os.link(temporary, full_path)
+                except FileExistsError:
+                    # stored by a concurrent upload of the same bytes
+                    pass
+                except OSError:
+                    # no hard links here; the same bytes may replace a concurrent copy
+                    os.replace(temporary, full_path)
+        finally:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+        return name
+
+
+photo_storage = PhotoStorage()
+
+
+def get_photo_storage():
+    # a callable keeps the storage out of the migrations
+    return photo_storage
@@ -0,0 +1,186 @@
+"""
+Synthetic data for benchmarks and local testing.
+
+``load_locations`` creates the states and cities listed in
+``static/statecity.txt`` (the SQL dump the project ships) that are not in the
+database yet. ``generate`` adds families with members, hobbies and
+placeholder photos through the importer's ``write_batch``, so the search
+index, dashboard counters and change log stay current. Generated heads have
+``address=SYNTHETIC_ADDRESS``; ``clear`` removes them again.
+"""
+import io
+import random
+import re
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image
+
+from . import catalogue, counters, photos
+from .changes import log_queryset, touch
+from .images import create_renditions
+from .importer import write_batch
+from .models import FamilyHead, FamilyMember, Hobby, State, City, ChangeAction, MaritalStatus, statusChoice
+from .storage import photo_storage
+
+SYNTHETIC_ADDRESS = "synthetic data"
+LOCATIONS_FILE = settings.BASE_DIR / "static" / "statecity.txt"
+
+FIRST_NAMES = (
+    "Aarav", "Vivaan", "Aditya", "Vihaan", "Arjun", "Sai", "Reyansh", "Krishna", "Ishaan", "Rohan",
+    "Ananya", "Diya", "Aadhya", "Saanvi", "Pari", "Myra", "Kavya", "Ira", "Riya", "Sneha",
+)
+SURNAMES = (
+    "Patel", "Shah", "Mehta", "Desai", "Joshi", "Kulkarni", "Deshpande", "Patil", "Iyer", "Nair",
+    "Reddy", "Rao", "Sharma", "Verma", "Gupta", "Singh", "Das", "Bose", "Chatterjee", "Naidu",
+)
+HOBBIES = ("Reading", "Cricket", "Music", "Cooking", "Travelling", "Painting", "Chess", "Yoga", "Dancing", "Gardening")
+EDUCATION = ("SSC", "HSC", "BA", "BCom", "BSc", "BE", "MBA", "MSc", "PhD", "")
+# mostly active rows, with some inactive and deleted ones as in a live database
+STATUSES = (statusChoice.ACTIVE,) * 8 + (statusChoice.INACTIVE, statusChoice.DELETE)
+
+_ROW = re.compile(r"\((\d+), '((?:[^']|'')*)'(?:, (\d+))?, NOW\(\), NOW\(\)\)")
+
+
+def read_locations(path=LOCATIONS_FILE):
+    """``{state_name: [city_name, ...]}`` from the ``statecity.txt`` SQL dump."""
+    states, cities = {}, []
+    with open(path, encoding="utf-8") as dump:
+        for line in dump:
+            match = _ROW.search(line)
+            if not match:
+                continue
+            row_id, name, state_id = match.groups()
+            name = name.replace("''", "'")
+            if state_id is None:
+                states[row_id] = name
+            else:
+                cities.append((state_id, name))
+    locations = {name: [] for name in states.values()}
+    for state_id, name in cities:
+        if state_id in states:
+            locations[states[state_id]].append(name)
+    return locations
+
+
+def load_locations(path=LOCATIONS_FILE):
+    """Create the missing states and cities of ``path``; returns ``(states, cities)`` created."""
+    locations = read_locations(path)
+    with transaction.atomic():
+        existing = set(State.objects.values_list("state_name", flat=True))
+        new_states = [State(state_name=name) for name in locations if name not in existing]
+        State.objects.bulk_create(new_states)
+        states = dict(State.objects.filter(state_name__in=list(locations)).values_list("state_name", "id"))
+
+        existing = set(City.objects.values_list("state_id", "city_name"))
+        new_cities = [
+            City(state_id=states[state], city_name=city)
+            for state, names in locations.items() for city in names
+            if (states[state], city) not in existing
+        ]
+        City.objects.bulk_create(new_cities, batch_size=1000)
+
+        names = [state.state_name for state in new_states]
+        log_queryset(State.all_objects.filter(state_name__in=names), ChangeAction.CREATE)
+        log_queryset(City.all_objects.filter(state__state_name__in=names), ChangeAction.CREATE)
+        counters.rebuild()
+        catalogue.invalidate()
+    return len(new_states), len(new_cities)
+
+
+def placeholder_photos(count, rng):
+    """Store ``count`` plain JPEGs (with renditions) and return their names."""
+    names = []
+    for i in range(count):
+        colour = tuple(rng.randrange(256) for _ in range(3))
+        buffer = io.BytesIO()
+        Image.new("RGB", (600, 600), colour).save(buffer, "JPEG", quality=85)
+        # content addressed: the same seed stores the same files again
+        name = photo_storage.save(f"pictures/synthetic_{i}.jpg", ContentFile(buffer.getvalue()))
+        field = FamilyHead(photo=name).photo
+        create_renditions(field)
+        names.append(name)
+    return names
+
+
+def _date(rng, start, days):
+    return start + timedelta(days=rng.randrange(days))
+
+
+def _family(rng, cities, photos, members_per_head, hobbies_per_head):
+    city = rng.choice(cities)
+    married = rng.random() < 0.7
+    dob = _date(rng, date(1950, 1, 1), 365 * 40)
+    surname = rng.choice(SURNAMES)
+    head = FamilyHead(
+        name=rng.choice(FIRST_NAMES), surname=surname, dob=dob,
+        mobno=f"{rng.choice('6789')}{rng.randrange(10 ** 9):09d}", address=SYNTHETIC_ADDRESS,
+        state_id=city.state_id, city=city, pincode=f"{rng.randrange(110000, 856000)}",
+        marital_status=MaritalStatus.MARRIED if married else MaritalStatus.UNMARRIED,
+        wedding_date=dob + timedelta(days=365 * 25) if married else None,
+        photo=rng.choice(photos) if photos else "", status=rng.choice(STATUSES),
+    )
+    # children of a deleted family are deleted with it (see family.cascade)
+    child_statuses = (statusChoice.DELETE,) if head.status == statusChoice.DELETE else STATUSES
+    hobbies = [
+        Hobby(hobby=hobby, status=rng.choice(child_statuses))
+        for hobby in rng.sample(HOBBIES, rng.randint(0, hobbies_per_head))
+    ]
+    members = []
+    for _ in range(rng.randint(0, members_per_head)):
+        member_married = rng.random() < 0.3
+        member_dob = _date(rng, dob + timedelta(days=365 * 18), 365 * 20)
+        members.append(FamilyMember(
+            member_name=f"{rng.choice(FIRST_NAMES)} {surname}", member_dob=member_dob,
+            member_marital=MaritalStatus.MARRIED if member_married else MaritalStatus.UNMARRIED,
+            member_wedDate=member_dob + timedelta(days=365 * 24) if member_married else None,
+            education=rng.choice(EDUCATION), member_photo=rng.choice(photos) if photos else None,
+            status=rng.choice(child_statuses),
+        ))
+    return head, hobbies, members
+
+
+def generate(heads, members_per_head=4, hobbies_per_head=3, photos=5, seed=0, batch_size=1000, progress=None):
+    """
+    Add ``heads`` synthetic families; returns ``(families, members)`` created.
+
+    Each family gets up to ``members_per_head`` members and
+    ``hobbies_per_head`` hobbies; photos are shared among ``photos``
+    placeholder images (0 leaves them empty). ``seed`` makes runs repeatable.
+    """
+    rng = random.Random(seed)
+    cities = list(City.objects.filter(status=statusChoice.ACTIVE, state__status=statusChoice.ACTIVE))
+    if not cities:
+        raise ValueError("No active cities; load the locations first.")
+    photo_names = placeholder_photos(photos, rng)
+
+    families = members = 0
+    while families < heads:
+        batch = [
+            _family(rng, cities, photo_names, members_per_head, hobbies_per_head)
+            for _ in range(min(batch_size, heads - families))
+        ]
+        written, written_members = write_batch(batch)
+        families, members = families + written, members + written_members
+        if progress:
+            progress(families, heads)
+    # write_batch counts every row as active; some of these are not
+    counters.rebuild()
+    return families, members
+
+
+def clear():
+    """Delete every synthetic family; returns the number of heads removed."""
+    with transaction.atomic():
+        heads = FamilyHead.all_objects.filter(address=SYNTHETIC_ADDRESS)
+        count = heads.count()
+        photos.release(FamilyMember.all_objects.filter(family_head__in=heads.values("id")))
+        photos.release(heads)
+        FamilyMember.all_objects.filter(family_head__in=heads.values("id")).delete()
+        Hobby.all_objects.filter(family_head__in=heads.values("id")).delete()
+        heads.delete()
+        counters.rebuild()
+        touch(FamilyHead, FamilyMember, Hobby)
+    return count
@@ -0,0 +1,22 @@
+from django import template
+
+from family.images import media_url, rendition_url
+
+register = template.Library()
+
+
+@register.filter
+def rendition(photo, name):
+    """``{{ head.photo|rendition:"card" }}`` -> URL of the JPEG rendition."""
+    return rendition_url(photo, name)
+
+
+@register.filter
+def rendition_webp(photo, name):
+    return rendition_url(photo, name, "webp")
+
+
+@register.filter
+def photo_url(photo):
+    """``{{ head.photo|photo_url }}`` -> versioned URL of the original photo."""
+    return media_url(photo.storage, photo.name) if photo else ""
@@ -1,3 +1,785 @@
-from django.test import TestCase
+import io
+import os
+import re
+import shutil
+import tempfile
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection, connections
+from django.db.models import Count
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+from PIL import Image
+
+from accounts.models import CustomUser
+
+from fims.cache import Namespace, get_or_set
+from . import catalogue, counters, fragments, photos, search
+from .forms import FamilyHeadForm, HobbyFormSet, MemberFormset
+from .cascade import soft_delete_cities, soft_delete_heads, soft_delete_states
+from .changes import feed, log_queryset
+from .archive import archive_deleted, pending
+from .images import rendition_name
+from .services import save_family
+from .importer import import_families
+from .models import (
+    FamilyHead, FamilyMember, Hobby, PhotoFile, State, City, ChangeAction, ChangeLog, DashboardCounter, statusChoice,
+    FamilyHeadArchive, FamilyMemberArchive, HobbyArchive, CityArchive, StateArchive,
+)
+from .storage import is_hashed, photo_storage
+from .views import family_pdf
+from .xlsx import stream_xlsx
+
+
+def jpeg(colour):
+    buffer = io.BytesIO()
+    Image.new("RGB", (40, 40), colour).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+class PhotoTestCase(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        state = State.objects.create(state_name="Gujarat")
+        self.city = City.objects.create(state=state, city_name="Surat")
+
+    def head(self, photo):
+        return FamilyHead.objects.create(
+            name="Aarav", surname="Patel", dob=date(1980, 1, 1), mobno="9876543210", address="Street",
+            state=self.city.state, city=self.city, pincode="395001", photo=photo,
+        )
+
+
+class PhotoStorageTests(PhotoTestCase):
+    def test_identical_uploads_share_one_file(self):
+        first = self.head(SimpleUploadedFile("photo.jpg", jpeg("red")))
+        second = self.head(SimpleUploadedFile("copy of photo.JPEG", jpeg("red")))
+
+        self.assertTrue(is_hashed(first.photo.name))
+        self.assertEqual(first.photo.name, second.photo.name)
+        self.assertEqual(PhotoFile.objects.get().refs, 2)
+
+    def test_replacing_a_photo_moves_the_reference(self):
+        head = self.head(SimpleUploadedFile("photo.jpg", jpeg("red")))
+        old = head.photo.name
+        head = FamilyHead.objects.get(pk=head.pk)
+        head.photo = SimpleUploadedFile("photo.jpg", jpeg("blue"))
+        head.save()
+
+        self.assertEqual(PhotoFile.objects.get(name=old).refs, 0)
+        self.assertEqual(PhotoFile.objects.get(name=head.photo.name).refs, 1)
+
+    def test_reclaim_keeps_photos_still_in_use(self):
+        head = self.head(SimpleUploadedFile("photo.jpg", jpeg("red")))
+        # a drifted count must not cost a photo that a member still uses
+        FamilyMember.objects.bulk_create([FamilyMember(
+            family_head=head, member_name="Diya", member_dob=date(2005, 1, 1), member_photo=head.photo.name,
+        )])
+        photos.release(FamilyHead.all_objects.filter(pk=head.pk))
+        PhotoFile.objects.update(refs=0)
+
+        self.assertEqual(photos.reclaim(grace=timedelta(0)), (0, 0))
+        self.assertTrue(photo_storage.exists(head.photo.name))
+
+    def test_upload_of_a_released_photo_restarts_its_grace_period(self):
+        head = self.head(SimpleUploadedFile("photo.jpg", jpeg("red")))
+        name = head.photo.name
+        photos.release(FamilyHead.all_objects.filter(pk=head.pk))
+        FamilyHead.all_objects.filter(pk=head.pk).update(photo="")
+        PhotoFile.objects.update(updated_at=timezone.now() - timedelta(days=1))
+
+        self.assertEqual(photo_storage.save("pictures/again.jpg", io.BytesIO(jpeg("red"))), name)
+        self.assertEqual(photos.reclaim(grace=timedelta(hours=1)), (0, 0))
+        self.assertTrue(photo_storage.exists(name))
+
+    def test_upload_without_hard_links(self):
+        with mock.patch("os.link", side_effect=PermissionError):
+            name = photo_storage.save("pictures/photo.jpg", io.BytesIO(jpeg("red")))
+        with photo_storage.open(name) as stored:
+            self.assertEqual(stored.read(), jpeg("red"))
+        self.assertEqual([entry for entry in os.listdir(photo_storage.path("pictures")) if entry.startswith(".")], [])
+
+    def test_rehash_merges_duplicate_legacy_files(self):
+        head = self.head("")
+        for name in ("pictures/old.jpg", "pictures/old_x1Yz2a.jpg"):
+            os.makedirs(photo_storage.path("pictures"), exist_ok=True)
+            with open(photo_storage.path(name), "wb") as output:
+                output.write(jpeg("green"))
+            FamilyMember.objects.create(
+                family_head=head, member_name="Diya", member_dob=date(2005, 1, 1), member_photo=name,
+            )
+
+        stats = photos.rehash()
+
+        names = set(FamilyMember.objects.values_list("member_photo", flat=True))
+        self.assertEqual((stats["photos"], stats["files"], stats["rows"]), (2, 1, 2))
+        self.assertEqual(len(names), 1)
+        self.assertTrue(is_hashed(names.pop()))
+        self.assertFalse(photo_storage.exists("pictures/old.jpg"))
+        self.assertEqual(list(PhotoFile.objects.values_list("refs", flat=True)), [2])
+
+
+class MediaServingTests(PhotoTestCase):
+    def test_hashed_photo_is_immutable_and_revalidates(self):
+        head = self.head(SimpleUploadedFile("photo.jpg", jpeg("red")))
+        url = f"/media/{head.photo.name}"
+
+        response = self.client.get(url)
+        self.assertEqual(response["Cache-Control"], "public, max-age=31536000, immutable")
+        self.assertEqual(b"".join(response.streaming_content), jpeg("red"))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_byte_range(self):
+        head = self.head(SimpleUploadedFile("photo.jpg", jpeg("red")))
+        url = f"/media/{head.photo.name}"
+        size = len(jpeg("red"))
+
+        response = self.client.get(url, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 10-19/{size}")
+        self.assertEqual(b"".join(response.streaming_content), jpeg("red")[10:20])
+        self.assertEqual(self.client.get(url, HTTP_RANGE=f"bytes={size}-").status_code, 416)
+
+    def test_only_photos_are_public(self):
+        os.makedirs(os.path.join(photo_storage.location, "exports"))
+        with open(os.path.join(photo_storage.location, "exports", "families.csv"), "w") as output:
+            output.write("name")
+        self.assertEqual(self.client.get("/media/exports/families.csv").status_code, 404)
+        self.assertEqual(self.client.get("/media/pictures/../exports/families.csv").status_code, 404)
+
+
+class CacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_get_or_set_serves_the_cached_value_while_another_request_recomputes(self):
+        calls = []
+        self.assertEqual(get_or_set("answer", lambda: calls.append(1) or 42, 60), 42)
+        self.assertEqual(get_or_set("answer", lambda: calls.append(1) or 43, 60), 42)
+
+        # the entry is due for a refresh, but another request holds the lock
+        value, _, cost = cache.get("answer")
+        cache.set("answer", (value, 0, cost), 60)
+        cache.add("answer:lock", 1, 30)
+        self.assertEqual(get_or_set("answer", lambda: calls.append(1) or 44, 60), 42)
+        self.assertEqual(len(calls), 1)
+
+        cache.delete("answer:lock")
+        self.assertEqual(get_or_set("answer", lambda: 44, 60), 44)
+
+    def test_namespace_invalidation_retires_its_keys(self):
+        locations = Namespace("locations")
+        key = locations.key("catalogue")
+        with self.captureOnCommitCallbacks(execute=True):
+            locations.invalidate()
+        self.assertNotEqual(locations.key("catalogue"), key)
+
+    def test_location_catalogue_is_rebuilt_after_a_change(self):
+        state = State.objects.create(state_name="Kerala")
+        self.assertIn("Kerala", catalogue.document()[0])
+        state.state_name = "Keralam"
+        with self.captureOnCommitCallbacks(execute=True):
+            state.save()
+        self.assertIn("Keralam", catalogue.document()[0])
+
+
+class LocationCatalogueTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.state = State.objects.create(state_name="Gujarat")
+        self.city = City.objects.create(state=self.state, city_name="Surat")
+        City.objects.create(state=self.state, city_name="Anand", status=statusChoice.INACTIVE)
+
+    def edit(self, instance, **values):
+        for field, value in values.items():
+            setattr(instance, field, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            instance.save()
+
+    def test_catalogue_document_and_validators(self):
+        response = self.client.get(reverse("location_catalogue"))
+        self.assertEqual(response["Cache-Control"], "public, max-age=300")
+        self.assertEqual(response.json(), {"states": [{
+            "id": self.state.pk, "state_name": "Gujarat", "status": statusChoice.ACTIVE,
+            "cities": [{"id": self.city.pk, "city_name": "Surat"}],
+        }]})
+
+        etag = response["ETag"]
+        self.assertEqual(self.client.get(reverse("location_catalogue"), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.edit(self.state, state_name="Gujarat State")
+        response = self.client.get(reverse("location_catalogue"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["states"][0]["state_name"], "Gujarat State")
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_cities_of_a_state(self):
+        url = reverse("get_cities", args=[self.state.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.json(), [{"id": self.city.pk, "city_name": "Surat"}])
+        self.assertEqual(response["Cache-Control"], "public, max-age=300")
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+        self.edit(self.city, city_name="Surat City")
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(changed.json(), [{"id": self.city.pk, "city_name": "Surat City"}])
+        self.assertNotEqual(changed["ETag"], response["ETag"])
+        self.assertEqual(self.client.get(reverse("get_cities", args=[0])).json(), [])
+
+
+class HeadExcelTests(PhotoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(CustomUser.objects.create_user(email="admin@example.com", password="Secret@123"))
+
+    def workbook(self, chunks):
+        return load_workbook(io.BytesIO(b"".join(chunks))).active
+
+    def test_stream_xlsx_writes_values_and_blank_cells(self):
+        sheet = self.workbook(stream_xlsx([[1, "a & b", None, date(2000, 1, 2)]], ["n", "text", "empty", "day"], title="Report"))
+        self.assertEqual(sheet["A1"].value, "Report")
+        self.assertEqual([c.value for c in sheet[3]], [1, "a & b", None, "2000-01-02"])
+
+    def test_head_excel_streams_heads_and_members(self):
+        head = self.head("")
+        FamilyMember.objects.create(family_head=head, member_name="Diya", member_dob=date(2005, 1, 1))
+
+        response = self.client.get(reverse("head_excel"))
+        rows = [[c.value for c in row] for row in self.workbook(response.streaming_content).iter_rows(min_row=3)]
+        self.assertEqual([row[2] for row in rows], ["Aarav", "Diya"])
+        # unmarried: no wedding date, and no "None" text
+        self.assertEqual([row[11] for row in rows], [None, None])
+        self.assertEqual(rows[1][16], head.id)
+
+    def test_error_while_streaming_aborts_the_response(self):
+        self.head("")
+
+        def failing(heads):
+            yield from ()
+            raise OSError("disk gone")
+
+        with mock.patch("family.views.head_export_rows", failing), self.assertLogs("family.views", "ERROR"):
+            response = self.client.get(reverse("head_excel"))
+            with self.assertRaises(OSError):
+                b"".join(response.streaming_content)
+
+
+class PdfTests(PhotoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = CustomUser.objects.create_user(email="admin@example.com", password="Secret@123")
+        self.heads = [self.head(SimpleUploadedFile("photo.jpg", jpeg(colour))) for colour in ("red", "blue", "green")]
+        for head in self.heads:
+            Hobby.objects.create(family_head=head, hobby="Reading")
+            FamilyMember.objects.create(
+                family_head=head, member_name="Diya", member_dob=date(2005, 1, 1),
+                member_photo=SimpleUploadedFile("diya.jpg", jpeg("yellow")),
+            )
+        self.heads[2].soft_delete()
+
+    def pages(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        data = b"".join(response.streaming_content)
+        self.assertTrue(data.startswith(b"%PDF-"))
+        return len(re.findall(rb"/Type /Page[^s]", data))
+
+    def test_family_pdf(self):
+        request = RequestFactory().get("/")
+        request.user = self.user
+        response = family_pdf(request, str(self.heads[0].pk))
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="Aarav_family.pdf"')
+        self.assertEqual(self.pages(response), 1)
+
+    def test_families_pdf_has_a_page_per_family(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("families_pdf"))
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="families.pdf"')
+        self.assertEqual(self.pages(response), 2)
+
+        self.heads[1].surname = "Shah"
+        self.heads[1].save()
+        self.assertEqual(self.pages(self.client.get(reverse("families_pdf"), {"search": "Shah"})), 1)
+
+
+class SearchTests(PhotoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.aarav = self.head("")
+        self.other = FamilyHead.objects.create(
+            name="Shabnam", surname="Raval", dob=date(1985, 1, 1), mobno="9876549999", address="Street",
+            state=self.city.state, city=self.city, pincode="395001",
+        )
+
+    def find(self, query):
+        return list(search.rank_heads(FamilyHead.objects.all(), query))
+
+    def test_query_terms(self):
+        self.assertEqual(
+            search.query_terms("Ré 98765 Pat Raval"),
+            ([["  p", " pa", "pat"], ["  r", " ra", "ava", "rav", "val"]], ["98765"], ["re"]),
+        )
+        self.assertIn("el ", search.text_grams("Patel"))
+        self.assertNotIn("el ", search.query_grams("Patel"))
+
+    def test_fuzzy_and_prefix_matches(self):
+        self.assertEqual(self.find("Patl"), [self.aarav])
+        self.assertEqual(self.find("aara"), [self.aarav])
+        self.assertEqual(self.find("!!"), [])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.find("Aarav Patel"), [self.aarav])
+        # the grams of "Shabnam" would make up half of the pooled grams
+        self.assertEqual(self.find("Aarav Shabnam"), [])
+        self.assertEqual(self.find("Aarav xyz"), [])
+
+    def test_mobile_numbers_match_digits_anywhere(self):
+        self.assertEqual(self.find("9876543210"), [self.aarav])
+        self.assertEqual(self.find("987654"), [self.other, self.aarav])
+        self.assertEqual(self.find("3210"), [self.aarav])
+        self.assertEqual(self.find("549"), [self.other])
+
+    def test_short_words_match_substrings(self):
+        self.assertEqual(self.find("ab"), [self.other])
+
+    def test_name_grams_rank_above_city_grams(self):
+        surat = FamilyHead.objects.create(
+            name="Surat", surname="Shah", dob=date(1990, 1, 1), mobno="9000000000", address="Street",
+            state=self.city.state, city=self.city, pincode="395001",
+        )
+        self.assertEqual(self.find("Surat")[0], surat)
+        self.assertEqual(len(self.find("Surat")), 3)
+
+    def test_index_follows_renames(self):
+        self.city.city_name = "Vadodara"
+        self.city.save()
+        self.assertEqual(len(self.find("Vadodara")), 2)
+        self.assertEqual(self.find("Surat"), [])
+
+
+class ImporterTests(PhotoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.photo = photo_storage.save("pictures/import.jpg", io.BytesIO(jpeg("red")))
+
+    def head_row(self, ref, **values):
+        return {
+            "family_ref": ref, "type": "head", "name": "Aarav", "surname": "Patel", "dob": "01-01-1980",
+            "mobno": "9876543210", "address": "Street", "state": "gujarat", "city": "Surat", "pincode": "395001",
+            "marital_status": "unmarried", "wedding_date": "", "photo": self.photo, "hobbies": "Reading, Music",
+            **values,
+        }
+
+    def member_row(self, ref, **values):
+        return {"family_ref": ref, "type": "member", "name": "Diya", "dob": "2005-01-01", "marital_status": "Unmarried",
+                "photo": self.photo, **values}
+
+    def test_import_writes_families_and_photo_renditions(self):
+        result = import_families([self.head_row("F1"), self.member_row("F1"), self.head_row("F2", name="Vihaan")])
+
+        self.assertEqual((result.families, result.members, result.errors), (2, 1, []))
+        self.assertEqual(Hobby.objects.count(), 4)
+        self.assertEqual(PhotoFile.objects.get(name=self.photo).refs, 3)
+        self.assertTrue(photo_storage.exists(rendition_name(self.photo, "thumb")))
+        self.assertEqual([head.name for head in search.rank_heads(FamilyHead.objects.all(), "Vihaan")], ["Vihaan"])
+
+    def test_bad_rows_skip_their_family_only(self):
+        result = import_families([
+            self.head_row("F1", photo="../../../../etc/passwd.jpg"),
+            self.head_row("F2", photo="/etc/passwd.jpg"),
+            self.head_row("F3"), self.member_row("F3", photo="pictures/missing.jpg"),
+            self.head_row("F4", state="Atlantis"),
+            self.head_row("F5", type="owner"),
+            self.head_row("F6"),
+        ])
+
+        self.assertEqual(result.families, 1)
+        self.assertEqual(FamilyHead.objects.count(), 1)
+        self.assertEqual(
+            [(error["row"], error["family_ref"], error["field"]) for error in result.errors],
+            [(2, "F1", "photo"), (3, "F2", "photo"), (5, "F3", "member_photo"), (6, "F4", "state"),
+             (6, "F4", "city"), (7, "F5", "type"), (7, "F5", "type")],
+        )
+
+    def test_family_rows_must_be_contiguous(self):
+        result = import_families([self.head_row("F1"), self.head_row("F2"), self.member_row("F1")])
+
+        self.assertEqual((result.families, result.members), (2, 0))
+        self.assertEqual(result.errors, [
+            {"row": 4, "family_ref": "F1", "field": "family_ref", "message": "Rows of a family must be contiguous."},
+        ])
+
+    def test_dry_run_validates_without_writing(self):
+        result = import_families([self.head_row("F1"), self.member_row("F1")], dry_run=True)
+
+        self.assertEqual((result.families, result.members), (1, 1))
+        self.assertFalse(FamilyHead.all_objects.exists())
+        self.assertFalse(PhotoFile.objects.exists())
+
+    def test_report(self):
+        result = import_families([self.head_row("F1", mobno="123"), {"family_ref": "", "type": "head", "name": "x"}])
+        report = io.StringIO()
+        result.write_report(report)
+
+        self.assertEqual(report.getvalue().splitlines(), [
+            "row,family_ref,field,message",
+            # in the order they are found: a family is checked once its rows are read
+            "3,,family_ref,family_ref is required.",
+            "2,F1,mobno,Mobile number must be exactly 10 digits.",
+        ])
+        self.assertEqual(result.as_dict()["failed_rows"], 2)
+        self.assertEqual(result.as_dict()["rows"], 2)
+
+    def test_report_is_downloaded_through_the_view(self):
+        user = CustomUser.objects.create_user(email="admin@example.com", password="Secret@123")
+        self.client.force_login(user)
+        upload = SimpleUploadedFile("families.csv", (
+            "family_ref,type,name,surname,dob,mobno,address,state,city,pincode,marital_status,wedding_date,photo,hobbies\n"
+            f"F1,head,Aarav,Patel,1980-01-01,123,Street,Gujarat,Surat,395001,Unmarried,,{self.photo},Reading\n"
+        ).encode())
+        data = self.client.post(reverse("import_families"), {"file": upload}).json()
+        self.assertEqual(data["failed_rows"], 1)
+
+        response = self.client.get(data["report_url"])
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="import_errors.csv"')
+        self.assertEqual(b"".join(response.streaming_content).decode().splitlines(), [
+            "row,family_ref,field,message", "2,F1,mobno,Mobile number must be exactly 10 digits.",
+        ])
+
+        self.client.logout()
+        self.assertEqual(self.client.get(data["report_url"]).status_code, 302)
+
+
+class ArchiveTests(PhotoTestCase):
+    def family(self):
+        head = self.head(SimpleUploadedFile("photo.jpg", jpeg("red")))
+        Hobby.objects.create(family_head=head, hobby="Reading")
+        member = FamilyMember.objects.create(
+            family_head=head, member_name="Diya", member_dob=date(2005, 1, 1),
+            member_photo=SimpleUploadedFile("photo.jpg", jpeg("blue")),
+        )
+        return head, member
+
+    def archive(self):
+        before = timezone.now() + timedelta(seconds=1)
+        expected = pending(before)
+        totals = archive_deleted(before)
+        self.assertEqual(totals, expected)
+        return totals
+
+    def test_deleted_family_is_archived_with_its_children(self):
+        head, member = self.family()
+        kept, _ = self.family()
+        head.soft_delete()
+
+        self.assertEqual(self.archive(), {"heads": 1, "hobbies": 1, "members": 1, "cities": 0, "states": 0})
+        self.assertFalse(FamilyHead.all_objects.filter(pk=head.pk).exists())
+        self.assertFalse(FamilyMember.all_objects.filter(family_head_id=head.pk).exists())
+        self.assertEqual(FamilyHeadArchive.objects.get().photo, head.photo.name)
+        self.assertEqual(HobbyArchive.objects.get().family_head_id, head.pk)
+        self.assertEqual(FamilyMemberArchive.objects.get().member_photo, member.member_photo.name)
+        # the photos are still used by the other family
+        self.assertEqual(PhotoFile.objects.get(name=head.photo.name).refs, 1)
+        self.assertTrue(FamilyHead.objects.filter(pk=kept.pk).exists())
+
+    def test_children_deleted_on_their_own_are_archived(self):
+        head, member = self.family()
+        member.soft_delete()
+
+        self.assertEqual(self.archive(), {"heads": 0, "hobbies": 0, "members": 1, "cities": 0, "states": 0})
+        self.assertEqual(PhotoFile.objects.get(name=member.member_photo.name).refs, 0)
+        self.assertTrue(FamilyHead.objects.filter(pk=head.pk).exists())
+        self.assertEqual(head.hobbies.count(), 1)
+
+    def test_locations_stay_while_live_rows_refer_to_them(self):
+        head, _ = self.family()
+        self.city.soft_delete()
+        self.assertEqual(self.archive()["cities"], 0)
+
+        head.soft_delete()
+        totals = archive_deleted(timezone.now() + timedelta(seconds=1))
+        self.assertEqual((totals["heads"], totals["cities"]), (1, 1))
+        self.assertEqual(CityArchive.objects.get().city_name, "Surat")
+        self.assertFalse(StateArchive.objects.exists())
+
+    def test_nothing_recent_is_archived(self):
+        head, _ = self.family()
+        head.soft_delete()
+        self.assertEqual(set(archive_deleted(timezone.now() - timedelta(days=1)).values()), {0})
+        self.assertTrue(FamilyHead.all_objects.filter(pk=head.pk).exists())
+
+
+class CascadeTests(PhotoTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.other_state = State.objects.create(state_name="Kerala", status=statusChoice.INACTIVE)
+        self.other_city = City.objects.create(state=self.other_state, city_name="Kochi")
+        self.heads = []
+        for city in (self.city, self.city, self.other_city):
+            head = self.head("")
+            head.state, head.city = city.state, city
+            head.save()
+            Hobby.objects.create(family_head=head, hobby="Reading")
+            FamilyMember.objects.create(family_head=head, member_name="Diya", member_dob=date(2005, 1, 1))
+            self.heads.append(head)
+        ChangeLog.objects.all().delete()
+
+    def assertCountersMatchTables(self):
+        stored = {name: value for name, value in DashboardCounter.objects.values_list("name", "value") if value}
+        self.assertEqual(stored, {name: value for name, value in counters.compute().items() if value})
+
+    def logged(self):
+        return sorted(ChangeLog.objects.values_list("table_name", "action").annotate(n=Count("seq")))
+
+    def test_state_delete(self):
+        version = catalogue.version()
+        with self.captureOnCommitCallbacks(execute=True):
+            result = soft_delete_states([self.city.state_id, self.other_state.pk])
+
+        self.assertEqual(result, {"states": 2, "cities": 2, "members": 3, "hobbies": 3, "heads": 3})
+        self.assertCountersMatchTables()
+        self.assertEqual(counters.snapshot()["states_inactive"], 0)
+        self.assertFalse(FamilyHead.objects.filter(status=statusChoice.ACTIVE).exists())
+        self.assertEqual(self.logged(), [
+            ("city", "delete", 2), ("family_head", "update", 3), ("family_member", "update", 3),
+            ("hobby", "update", 3), ("state", "delete", 2),
+        ])
+        self.assertNotEqual(catalogue.version(), version)
+        # deleting again changes nothing
+        self.assertEqual(soft_delete_states([self.other_state.pk]), {})
+
+    def test_city_delete(self):
+        version = catalogue.version()
+        with self.captureOnCommitCallbacks(execute=True):
+            result = soft_delete_cities([self.city.pk])
+
+        self.assertEqual(result, {"cities": 1, "members": 2, "hobbies": 2, "heads": 2})
+        self.assertCountersMatchTables()
+        self.assertEqual(FamilyHead.objects.get(pk=self.heads[2].pk).status, statusChoice.ACTIVE)
+        self.assertEqual(self.logged(), [
+            ("city", "delete", 1), ("family_head", "update", 2), ("family_member", "update", 2), ("hobby", "update", 2),
+        ])
+        self.assertNotEqual(catalogue.version(), version)
+
+    def test_head_delete(self):
+        ids = [head.pk for head in self.heads[1:]]
+        before = fragments.stamps([head.pk for head in self.heads])
+        with self.captureOnCommitCallbacks(execute=True):
+            result = soft_delete_heads(ids + [ids[0]])
+
+        self.assertEqual(result, {"members": 2, "hobbies": 2, "heads": 2})
+        self.assertCountersMatchTables()
+        self.assertEqual(self.logged(), [("family_head", "delete", 2), ("family_member", "delete", 2), ("hobby", "delete", 2)])
+        after = fragments.stamps([head.pk for head in self.heads])
+        self.assertEqual(after[self.heads[0].pk], before[self.heads[0].pk])
+        self.assertTrue(all(after[pk] != before[pk] for pk in ids))
+
+    def test_model_delete_cascades(self):
+        self.heads[0].delete()
+        self.city.delete()
+        self.assertCountersMatchTables()
+        self.assertEqual(FamilyMember.all_objects.get(family_head=self.heads[0]).status, statusChoice.DELETE)
+        self.assertEqual(FamilyMember.all_objects.get(family_head=self.heads[1]).status, statusChoice.INACTIVE)
+
+
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        self.state = State.objects.create(state_name="Gujarat")
+        self.state.state_name = "Gujarat State"
+        self.state.save()
+        self.city = City.objects.create(state=self.state, city_name="Surat")
+        self.city.soft_delete()
+
+    def entries(self, **kwargs):
+        return [(change["table"], change["id"], change["action"]) for change in feed(**kwargs)]
+
+    def test_every_save_is_logged_with_the_current_row(self):
+        changes = list(feed())
+        self.assertEqual([(change["table"], change["action"]) for change in changes], [
+            ("state", "create"), ("state", "update"), ("city", "create"), ("city", "delete"),
+        ])
+        self.assertEqual([change["seq"] for change in changes], sorted(change["seq"] for change in changes))
+        self.assertEqual(changes[0]["data"]["state_name"], "Gujarat State")
+        self.assertEqual(changes[3]["data"]["status"], statusChoice.DELETE)
+
+    def test_since_resumes_after_the_last_entry(self):
+        second = list(feed())[1]["seq"]
+        self.assertEqual(self.entries(since=second), [
+            ("city", self.city.pk, "create"), ("city", self.city.pk, "delete"),
+        ])
+        self.assertEqual(self.entries(since=ChangeLog.objects.latest("seq").seq), [])
+
+    def test_limit_spans_batches(self):
+        self.assertEqual(self.entries(limit=3, batch_size=2), self.entries()[:3])
+
+    def log(self, seq, changed_at=None):
+        return ChangeLog.objects.create(
+            seq=seq, table_name="state", row_id=self.state.pk, action=ChangeAction.UPDATE,
+            changed_at=changed_at or timezone.now(),
+        )
+
+    def test_entries_committed_late_are_not_skipped(self):
+        last = ChangeLog.objects.latest("seq").seq
+        # a long transaction holds last + 1 while a later one commits last + 2
+        self.log(last + 2)
+        read = list(feed())
+        self.assertEqual(read[-1]["seq"], last)
+
+        self.log(last + 1)
+        self.assertEqual([change["seq"] for change in feed(since=read[-1]["seq"])], [last + 1, last + 2])
+
+    def test_gap_is_given_up_after_the_timeout(self):
+        last = ChangeLog.objects.latest("seq").seq
+        self.log(last + 2, timezone.now() - timedelta(hours=2))
+        self.log(last + 3)
+        self.assertEqual([change["seq"] for change in feed(since=last)], [last + 2, last + 3])
+        with override_settings(CHANGE_FEED_GAP_TIMEOUT=3 * 3600):
+            self.assertEqual(list(feed(since=last)), [])
+
+    def test_gap_is_checked_with_a_locking_read_on_mysql(self):
+        last = ChangeLog.objects.latest("seq").seq
+        self.log(last + 2)
+        with mock.patch.object(connections["default"], "vendor", "mysql"):
+            # nothing holds last + 1
+            self.assertEqual([change["seq"] for change in feed(since=last)], [last + 2])
+            # an uncommitted insert makes the NOWAIT read fail
+            with mock.patch("django.db.models.query.QuerySet.select_for_update", side_effect=OperationalError):
+                self.assertEqual(list(feed(since=last)), [])
+
+    def test_bulk_rows_are_logged_in_one_statement(self):
+        other = State.objects.create(state_name="Kerala")
+        ChangeLog.objects.all().delete()
+        with self.assertNumQueries(1):
+            log_queryset(State.objects.all(), ChangeAction.UPDATE)
+        self.assertEqual(sorted(self.entries()), [("state", self.state.pk, "update"), ("state", other.pk, "update")])
+
+    def test_archived_rows_have_no_data(self):
+        ChangeLog.objects.create(table_name="state", row_id=0, action=ChangeAction.DELETE, changed_at=timezone.now())
+        self.assertIsNone(list(feed())[-1]["data"])
+
+
+class SaveFamilyTests(PhotoTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def save(self, head=None, hobbies=(), members=(), files=None):
+        """Save through the forms; ``hobbies``/``members`` are dicts of form fields (``id`` for existing rows)."""
+        data = {
+            "name": "Aarav", "surname": "Patel", "dob": "1980-01-01", "mobno": "9876543210", "address": "Street",
+            "state": self.city.state_id, "city": self.city.pk, "pincode": "395001", "marital_status": "Unmarried",
+        }
+        for prefix, rows in (("hobbies", hobbies), ("members", members)):
+            data.update({
+                f"{prefix}-TOTAL_FORMS": len(rows), f"{prefix}-MIN_NUM_FORMS": 0, f"{prefix}-MAX_NUM_FORMS": 1000,
+                f"{prefix}-INITIAL_FORMS": sum(1 for row in rows if "id" in row),
+            })
+            for i, row in enumerate(rows):
+                data.update({f"{prefix}-{i}-{field}": value for field, value in row.items()})
+        files = {"photo": SimpleUploadedFile("head.jpg", jpeg("red")), **(files or {})} if head is None else files or {}
+        head_form = FamilyHeadForm(data, files, instance=head)
+        instance = head_form.instance
+        hobby_formset = HobbyFormSet(data, instance=instance, prefix="hobbies")
+        member_formset = MemberFormset(data, files, instance=instance, prefix="members")
+        for form in (head_form, hobby_formset, member_formset):
+            self.assertTrue(form.is_valid(), form.errors)
+        with self.captureOnCommitCallbacks(execute=True):
+            return save_family(head_form, hobby_formset, member_formset)
+
+    def member(self, name, **fields):
+        return {"member_name": name, "member_dob": "2005-01-01", "member_marital": "Unmarried", **fields}
+
+    def assertCountersMatchTables(self):
+        stored = {name: value for name, value in DashboardCounter.objects.values_list("name", "value") if value}
+        self.assertEqual(stored, {name: value for name, value in counters.compute().items() if value})
+
+    def logged(self, table):
+        return sorted(ChangeLog.objects.filter(table_name=table).values_list("row_id", "action"))
+
+    def test_new_family(self):
+        head = self.save(
+            hobbies=[{"hobby": "Reading"}, {"hobby": "Chess"}],
+            members=[self.member("Diya"), self.member("Ira")],
+            files={"members-0-member_photo": SimpleUploadedFile("diya.jpg", jpeg("blue"))},
+        )
+        diya, ira = head.members.order_by("id")
+        self.assertEqual([hobby.hobby for hobby in head.hobbies.order_by("id")], ["Reading", "Chess"])
+        self.assertCountersMatchTables()
+        self.assertEqual(self.logged("family_member"), [(diya.pk, "create"), (ira.pk, "create")])
+        self.assertEqual([action for _, action in self.logged("hobby")], ["create", "create"])
+        self.assertTrue(is_hashed(diya.member_photo.name))
+        self.assertEqual(PhotoFile.objects.get(name=diya.member_photo.name).refs, 1)
+        self.assertTrue(photo_storage.exists(rendition_name(diya.member_photo.name, "thumb")))
+
+    def test_edit_updates_deletes_and_adds_children(self):
+        head = self.save(
+            hobbies=[{"hobby": "Reading"}],
+            members=[self.member("Diya"), self.member("Ira")],
+            files={"members-0-member_photo": SimpleUploadedFile("diya.jpg", jpeg("blue"))},
+        )
+        diya, ira = head.members.order_by("id")
+        hobby = head.hobbies.get()
+        old_photo = diya.member_photo.name
+        ChangeLog.objects.all().delete()
+
+        head = self.save(
+            head,
+            hobbies=[{"id": hobby.pk, "hobby": "Reading"}, {"hobby": "Chess"}],
+            members=[
+                self.member("Diya Patel", id=diya.pk),
+                self.member("Ira", id=ira.pk, DELETE="on"),
+                self.member("Kabir"),
+            ],
+            files={"members-0-member_photo": SimpleUploadedFile("new.jpg", jpeg("green"))},
+        )
+        diya.refresh_from_db()
+        kabir = head.members.get(member_name="Kabir")
+        self.assertEqual(diya.member_name, "Diya Patel")
+        self.assertEqual(FamilyMember.all_objects.get(pk=ira.pk).status, statusChoice.DELETE)
+        self.assertCountersMatchTables()
+        self.assertEqual(self.logged("family_member"), [(diya.pk, "update"), (ira.pk, "delete"), (kabir.pk, "create")])
+        # the upload was written by the field's pre_save, and the reference moved to it
+        self.assertNotEqual(diya.member_photo.name, old_photo)
+        self.assertTrue(photo_storage.exists(diya.member_photo.name))
+        self.assertEqual(PhotoFile.objects.get(name=diya.member_photo.name).refs, 1)
+        self.assertEqual(PhotoFile.objects.get(name=old_photo).refs, 0)
+
+    def test_rows_are_found_without_returned_ids(self):
+        head = self.save(hobbies=[{"hobby": "Reading"}], members=[self.member("Diya")])
+        ChangeLog.objects.all().delete()
+
+        # as on MySQL, where a multi-row INSERT returns no ids
+        with mock.patch.object(type(connection.features), "can_return_rows_from_bulk_insert", False):
+            self.save(head, hobbies=[{"hobby": "Chess"}, {"hobby": "Cricket"}], members=[self.member("Ira"), self.member("Kabir")])
+
+        created = head.members.exclude(member_name="Diya").values_list("id", flat=True)
+        self.assertEqual(self.logged("family_member"), [(pk, "create") for pk in sorted(created)])
+        self.assertEqual(len(self.logged("hobby")), 2)
+        self.assertCountersMatchTables()
+
+    def test_hobby_rules_match_the_importer(self):
+        def errors(*hobbies, deleted=()):
+            data = {"hobbies-TOTAL_FORMS": len(hobbies), "hobbies-INITIAL_FORMS": 0}
+            for i, hobby in enumerate(hobbies):
+                data[f"hobbies-{i}-hobby"] = hobby
+                if i in deleted:
+                    data[f"hobbies-{i}-DELETE"] = "on"
+            formset = HobbyFormSet(data, instance=FamilyHead(), prefix="hobbies")
+            formset.is_valid()
+            return formset.non_form_errors()
+
+        self.assertEqual(errors("Chess", "Chess"), ["Duplicate hobbies are not allowed."])
+        self.assertEqual(errors("", "Chess", "Chess", deleted=[2]), [])
+        self.assertEqual(errors("Chess", deleted=[0]), ["At least one hobby is required."])
@@ -5,5 +5,10 @@ urlpatterns = [
     path('', home, name='home'),
     path("family_form/", family_form, name="family_form"),
     path('get_cities/<int:state_id>', get_cities, name='get_cities'),
+    path('locations/', location_catalogue, name='location_catalogue'),
+    path('head_excel/', head_excel, name='head_excel'),
+    path('families_pdf/', families_pdf, name='families_pdf'),
+    path('import_families/', import_families, name='import_families'),
+    path('import_families/<uuid:report_id>/report/', import_report, name='import_report'),
     
 ]
@@ -1,24 +1,27 @@
 from django.shortcuts import render, redirect
-from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required
 from django.http import FileResponse
 from django.contrib import messages
-from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.response import Response
+from django.conf import settings
+from django.views.decorators.http import require_POST, require_safe
+from django.utils.cache import get_conditional_response, patch_cache_control
 
 from .forms import FamilyHeadForm, HobbyFormSet, MemberFormset
-from .models import FamilyHead, FamilyMember, Hobby, City, statusChoice
+from .models import FamilyHead, FamilyMember, Hobby, statusChoice
 from .utils import decode_id
-
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image
-from reportlab.lib.styles import getSampleStyleSheet
-from openpyxl import Workbook
-from openpyxl.styles import PatternFill, Font, Alignment
-from openpyxl.drawing.image import Image as ExcelImage
-
-import os, logging, json
+from .exports import (
+    HEAD_EXPORT_COLUMNS, export_heads, iter_keyset, head_export_rows,
+    write_family_workbook,
+)
+from .pdf import spool, write_family_pdf, write_families_pdf
+from .services import save_family
+from . import catalogue
+from .importer import import_families as run_import, read_rows
+from .xlsx import stream_xlsx, CONTENT_TYPE as XLSX_CONTENT_TYPE
+
+import os, logging, uuid
 
 logger = logging.getLogger(__name__)
 
@@ -31,16 +34,34 @@ def home(request):
         return HttpResponse("An unexpected error occurred.", status=500)
 
 
-@api_view(['GET'])
-@permission_classes([AllowAny])
-def get_cities(request, pk):
+def _cache_catalogue(request, response, etag):
+    """Answer a conditional GET with 304, otherwise add the catalogue's validators."""
+    response["ETag"] = etag
+    patch_cache_control(
+        response, public=True,
+        max_age=getattr(settings, "LOCATION_CATALOGUE_MAX_AGE", 300),
+    )
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+@require_safe
+async def get_cities(request, state_id):
     try:
-        cities = City.objects.filter(state_id=pk, status=statusChoice.ACTIVE)
-        data = list(cities.values('id', 'city_name'))
-        return Response(data)
+        cities, etag = await catalogue.acities_for_state(state_id)
+        return _cache_catalogue(request, JsonResponse(cities, safe=False), etag)
     except Exception as e:
         logger.exception("Error fetching cities: %s", e)
-        return Response({"error": "Unable to load cities."}, status=500)
+        return JsonResponse({"error": "Unable to load cities."}, status=500)
+
+
+@require_safe
+async def location_catalogue(request):
+    try:
+        body, etag = await catalogue.adocument()
+        return _cache_catalogue(request, HttpResponse(body, content_type="application/json"), etag)
+    except Exception as e:
+        logger.exception("Error building location catalogue: %s", e)
+        return JsonResponse({"error": "Unable to load locations."}, status=500)
 
 
 def family_form(request):
@@ -55,11 +76,7 @@ def family_form(request):
             member_formset = MemberFormset(request.POST, request.FILES, instance=head_form.instance, prefix="members")
 
             if head_form.is_valid() and hobby_formset.is_valid() and member_formset.is_valid():
-                head = head_form.save()
-                hobby_formset.instance = head
-                hobby_formset.save()
-                member_formset.instance = head
-                member_formset.save()
+                save_family(head_form, hobby_formset, member_formset)
                 return JsonResponse({"success": True, "message": "Family Created Successfully."})
             else:
                 return JsonResponse({
@@ -81,81 +98,14 @@ def family_form(request):
 def family_pdf(request, hashid):
     try:
         pk = decode_id(hashid)
-        head = FamilyHead.objects.get(pk=pk)
-        members = FamilyMember.objects.filter(family_head=head, status=statusChoice.ACTIVE)
-        hobbies = Hobby.objects.filter(family_head=head, status=statusChoice.ACTIVE)
-
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{head.name}_family.pdf"'
-
-        doc = SimpleDocTemplate(response)
-        styles = getSampleStyleSheet()
-        elements = []
-
-        elements.append(Paragraph(f"Family Report: {head.surname} Family", styles['Heading1']))
-        elements.append(Paragraph("Head Details", styles['Heading2']))
-        elements.append(Spacer(1, 4))
-
-        details = [
-            f"Name: {head.name}",
-            f"Surname: {head.surname}",
-            f"Birth Date: {head.dob}",
-            f"Mobile: {head.mobno}",
-            f"Address: {head.address}",
-            f"State: {head.state.state_name}",
-            f"City: {head.city.city_name}",
-            f"Pincode: {head.pincode}",
-            f"Marital Status: {head.marital_status}",
-            f"Wedding Date: {head.wedding_date}",
-        ]
-        for d in details:
-            elements.append(Paragraph(d, styles['Normal']))
-            elements.append(Spacer(1, 4))
-
-        # Head Photo
-        if head.photo and hasattr(head.photo, 'path') and os.path.exists(head.photo.path):
-            try:
-                img = Image(head.photo.path, width=1.5 * inch, height=2 * inch)
-                img.hAlign = 'CENTER'
-                elements.append(Paragraph("Photo:", styles['Normal']))
-                elements.append(img)
-                elements.append(Spacer(1, 12))
-            except Exception as img_error:
-                logger.warning("Error adding head photo: %s", img_error)
-
-        # Hobbies
-        elements.append(Paragraph("Hobbies", styles['Heading3']))
-        for i, h in enumerate(hobbies, start=1):
-            elements.append(Paragraph(f"{i}. {h.hobby}", styles['Normal']))
-            elements.append(Spacer(1, 4))
-
-        # Members
-        elements.append(Paragraph("Members", styles['Heading2']))
-        for i, m in enumerate(members, start=1):
-            elements.append(Paragraph(f"Member {i}", styles['Heading3']))
-            member_details = [
-                f"Name: {m.member_name}",
-                f"Birth Date: {m.member_dob}",
-                f"Marital Status: {m.member_marital}",
-                f"Wedding Date: {m.member_wedDate}",
-                f"Education: {m.education}",
-                f"Relation: {m.relation}",
-            ]
-            for d in member_details:
-                elements.append(Paragraph(d, styles['Normal']))
-                elements.append(Spacer(1, 4))
-
-            if m.member_photo and hasattr(m.member_photo, 'path') and os.path.exists(m.member_photo.path):
-                try:
-                    img = Image(m.member_photo.path, width=1.5 * inch, height=2 * inch)
-                    img.hAlign = 'CENTER'
-                    elements.append(img)
-                    elements.append(Spacer(1, 12))
-                except Exception as img_error:
-                    logger.warning("Error adding member photo: %s", img_error)
-
-        doc.build(elements)
-        return response
+        head = FamilyHead.objects.select_related('state', 'city').get(pk=pk)
+        members = FamilyMember.objects.filter(family_head=head, status=statusChoice.ACTIVE).order_by('id')
+        hobbies = Hobby.objects.filter(family_head=head, status=statusChoice.ACTIVE).order_by('id')
+
+        output = spool()
+        write_family_pdf(head, hobbies, members, output)
+        output.seek(0)
+        return FileResponse(output, as_attachment=True, filename=f"{head.name}_family.pdf", content_type='application/pdf')
 
     except FamilyHead.DoesNotExist:
         messages.error(request, "Family not found.")
@@ -166,6 +116,22 @@ def family_pdf(request, hashid):
         return redirect('dashboard')
 
 
+@login_required(login_url='login_page')
+def families_pdf(request):
+    # All (or the searched) families in one document; large sets are better
+    # requested as a "families_pdf" background export.
+    try:
+        output = spool()
+        write_families_pdf(export_heads(request.GET.get('search')), output)
+        output.seek(0)
+        return FileResponse(output, as_attachment=True, filename="families.pdf", content_type='application/pdf')
+
+    except Exception as e:
+        logger.exception("Error generating families PDF: %s", e)
+        messages.error(request, "Error while generating PDF. Please try again.")
+        return redirect('dashboard')
+
+
 @login_required(login_url='login_page')
 def family_excel(request, hashid):
     try:
@@ -176,53 +142,7 @@ def family_excel(request, hashid):
 
         response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
         response['Content-Disposition'] = f'attachment; filename="{head.name}_family.xlsx"'
-        workbook = Workbook()
-        worksheet = workbook.active
-        worksheet.title = 'Family Report'
-
-        worksheet.merge_cells('A1:L1')
-        worksheet['A1'].value = "Family Report"
-        worksheet['A1'].fill = PatternFill("solid", fgColor="246ba1")
-        worksheet['A1'].font = Font(bold=True, color="F7F6FA")
-        worksheet['A1'].alignment = Alignment(horizontal="center")
-
-        columns = ['Name', 'Surname', 'Birth Date', 'Mobile No', 'Address', 'State', 'City',
-                   'Pincode', 'Marital Status', 'Wedding Date', 'Photo', 'Hobbies']
-        worksheet.append(columns)
-
-        hobbies_str = ", ".join([h.hobby for h in hobbies])
-        worksheet.append([
-            head.name, head.surname, str(head.dob), head.mobno, head.address,
-            head.state.state_name, head.city.city_name, head.pincode,
-            head.marital_status, str(head.wedding_date), str(head.photo), hobbies_str
-        ])
-
-        # Add head image
-        if head.photo and hasattr(head.photo, 'path') and os.path.exists(head.photo.path):
-            try:
-                img = ExcelImage(head.photo.path)
-                img.width, img.height = 50, 50
-                worksheet.add_image(img, 'K3')
-            except Exception as img_error:
-                logger.warning("Error adding head image in Excel: %s", img_error)
-
-        # Add member rows
-        worksheet.append(['', 'Member Details'])
-        worksheet.append(['Sr. No.', 'Name', 'Birth Date', 'Marital Status', 'Wedding Date', 'Education', 'Photo'])
-        for i, m in enumerate(members, start=1):
-            worksheet.append([
-                i, m.member_name, str(m.member_dob), m.member_marital,
-                str(m.member_wedDate), m.education, str(m.member_photo)
-            ])
-            if m.member_photo and hasattr(m.member_photo, 'path') and os.path.exists(m.member_photo.path):
-                try:
-                    img = ExcelImage(m.member_photo.path)
-                    img.width, img.height = 50, 50
-                    worksheet.add_image(img, f'G{worksheet.max_row}')
-                except Exception as img_error:
-                    logger.warning("Error adding member image in Excel: %s", img_error)
-
-        workbook.save(response)
+        write_family_workbook(head, hobbies, members, response)
         return response
 
     except FamilyHead.DoesNotExist:
@@ -234,78 +154,84 @@ def family_excel(request, hashid):
         return redirect('dashboard')
 
 
-@login_required(login_url='login_page')
-def head_excel(request):
+def _abort_on_error(chunks, label):
+    """Log an error raised while ``chunks`` is being sent and drop the connection instead of ending the file early."""
     try:
-        heads = FamilyHead.objects.exclude(status=statusChoice.DELETE)
+        yield from chunks
+    except Exception as e:
+        logger.exception("Error streaming %s: %s", label, e)
+        # the status line is gone already; re-raising makes the server abort the
+        # response, so the client sees a failed download rather than a short file
+        raise
 
-        # Filtering by search
-        search = request.GET.get('search')
-        if search:
-            name = heads.filter(name__icontains=search)
-            mobno = heads.filter(mobno__icontains=search)
-            state = heads.filter(state__state_name__icontains=search)
-            city = heads.filter(city__city_name__icontains=search)
-            heads = name.union(mobno, state, city)
 
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+@login_required(login_url='login_page')
+def head_excel(request):
+    # Streamed in constant memory (family.xlsx); photos are exported as paths, not embedded.
+    try:
+        heads = export_heads(request.GET.get('search'))
+        rows = head_export_rows(iter_keyset(heads))
+
+        response = StreamingHttpResponse(
+            _abort_on_error(
+                stream_xlsx(rows, HEAD_EXPORT_COLUMNS, sheet_title='All Family Head Report', title="All Family Head Report"),
+                "head Excel report",
+            ),
+            content_type=XLSX_CONTENT_TYPE,
+        )
         response['Content-Disposition'] = 'attachment; filename="all_family_heads.xlsx"'
-        workbook = Workbook()
-        worksheet = workbook.active
-        worksheet.title = 'All Family Head Report'
-
-        worksheet.merge_cells('A1:Q1')
-        worksheet['A1'].value = "All Family Head Report"
-        worksheet['A1'].fill = PatternFill("solid", fgColor="246ba1")
-        worksheet['A1'].font = Font(bold=True, color="F7F6FA")
-        worksheet['A1'].alignment = Alignment(horizontal="center")
-
-        columns = [
-            'Sr. No.', 'Member ID', 'Name', 'Surname', 'Birth Date', 'Mobile No',
-            'Address', 'State', 'City', 'Pincode', 'Marital Status', 'Wedding Date',
-            'Education', 'Relation', 'Photo', 'Hobbies', 'Head ID'
-        ]
-        worksheet.append(columns)
-
-        for i, head in enumerate(heads, start=1):
-            hobbies = Hobby.objects.filter(family_head=head.id, status=statusChoice.ACTIVE)
-            hobbies_str = ", ".join([h.hobby for h in hobbies])
-
-            worksheet.append([
-                i, "", head.name, head.surname, str(head.dob), head.mobno, head.address,
-                head.state.state_name, head.city.city_name, head.pincode, head.marital_status,
-                str(head.wedding_date), "", "Head", str(head.photo), hobbies_str, head.id
-            ])
-
-            # Head photo
-            if head.photo and hasattr(head.photo, 'path') and os.path.exists(head.photo.path):
-                try:
-                    img = ExcelImage(head.photo.path)
-                    img.width, img.height = 30, 30
-                    worksheet.add_image(img, f'O{worksheet.max_row}')
-                except Exception as img_error:
-                    logger.warning("Error adding head image in head_excel: %s", img_error)
-
-            # Members
-            members = FamilyMember.objects.filter(family_head=head.id, status=statusChoice.ACTIVE)
-            for j, m in enumerate(members, start=1):
-                worksheet.append([
-                    "", j, m.member_name, "", str(m.member_dob), "-", "", "", "", "",
-                    m.member_marital, str(m.member_wedDate), m.education,
-                    m.relation, str(m.member_photo), "", m.family_head.id
-                ])
-                if m.member_photo and hasattr(m.member_photo, 'path') and os.path.exists(m.member_photo.path):
-                    try:
-                        img = ExcelImage(m.member_photo.path)
-                        img.width, img.height = 30, 30
-                        worksheet.add_image(img, f'O{worksheet.max_row}')
-                    except Exception as img_error:
-                        logger.warning("Error adding member image in head_excel: %s", img_error)
-
-        workbook.save(response)
         return response
 
     except Exception as e:
         logger.exception("Error generating head Excel report: %s", e)
         messages.error(request, "Error exporting family head data.")
         return redirect('dashboard')
+
+
+def _import_report_path(report_id):
+    # outside the pictures/ and renditions/ folders that serve_media exposes
+    return os.path.join(settings.MEDIA_ROOT, "imports", f"{report_id}_errors.csv")
+
+
+@login_required(login_url='login_page')
+@require_POST
+def import_families(request):
+    try:
+        upload = request.FILES.get('file')
+        if not upload:
+            return JsonResponse({"field": 'file', "success": False, "errorMessage": "File is required."}, status=400)
+        if not upload.name.lower().endswith(('.csv', '.xlsx')):
+            return JsonResponse({"field": 'file', "success": False, "errorMessage": "Only CSV, XLSX allowed."}, status=400)
+
+        result = run_import(read_rows(upload, upload.name), dry_run=bool(request.POST.get('dry_run')))
+        data = {"success": True, **result.as_dict()}
+
+        if result.errors:
+            report_id = uuid.uuid4()
+            path = _import_report_path(report_id)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', newline='', encoding='utf-8') as report:
+                result.write_report(report)
+            data["report_url"] = reverse('import_report', args=[report_id])
+        return JsonResponse(data)
+
+    except Exception as e:
+        logger.exception("Error importing families: %s", e)
+        return JsonResponse({"success": False, "errorMessage": "Unexpected error occurred while importing families."}, status=500)
+
+
+@login_required(login_url='login_page')
+def import_report(request, report_id):
+    try:
+        return FileResponse(
+            open(_import_report_path(report_id), 'rb'), as_attachment=True,
+            filename="import_errors.csv", content_type='text/csv',
+        )
+
+    except FileNotFoundError:
+        messages.error(request, "Import report not found.")
+        return redirect('dashboard')
+    except Exception as e:
+        logger.exception("Error downloading import report: %s", e)
+        messages.error(request, "Error while downloading import report.")
+        return redirect('dashboard')
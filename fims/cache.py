@@ -0,0 +1,152 @@
+"""
+Cache helpers shared by the apps.
+
+``Namespace`` prefixes keys with a name and a generation token kept in the
+cache; ``invalidate()`` starts a new generation once the current transaction
+commits, which retires every key of the namespace at once without having to
+find and delete them (the old entries age out).
+
+``get_or_set``/``aget_or_set`` protect expensive values against stampedes:
+
+* entries are stored with their expiry time and how long they took to
+  compute, and a reader recomputes one early with a probability that rises
+  as the expiry nears and with the cost of the value ("XFetch"), so a hot key
+  is usually refreshed by a single request before it expires;
+* whoever recomputes takes a short lock (``cache.add``). While the lock is
+  held other readers keep serving the current value, or, on a cold key, wait
+  up to ``wait`` seconds for it before computing it themselves.
+
+Everything works with any Django cache backend; the lock and the generation
+tokens are only shared between processes when the backend is (file, Redis),
+see ``CACHES`` in the settings.
+"""
+import asyncio
+import math
+import random
+import time
+import uuid
+
+from django.core.cache import caches
+from django.db import transaction
+
+LOCK_TIMEOUT = 30
+LOCK_WAIT = 2.0
+POLL_INTERVAL = 0.05
+# >1 recomputes earlier, <1 later
+EARLY_RECOMPUTE_BETA = 1.0
+
+
+def _expires(timeout):
+    return math.inf if timeout is None else time.time() + timeout
+
+
+def _fresh(entry):
+    _, expires, cost = entry
+    # -log(u) for u in (0, 1] is exponentially distributed, mean 1
+    return time.time() - cost * EARLY_RECOMPUTE_BETA * math.log(1.0 - random.random()) < expires
+
+
+def get_or_set(key, compute, timeout, cache=None, wait=LOCK_WAIT, lock_timeout=LOCK_TIMEOUT):
+    """
+    The value cached under ``key``, computed with ``compute()`` and cached for
+    ``timeout`` seconds (``None``: no expiry) when missing or due for an early
+    refresh.
+    """
+    cache = cache or caches["default"]
+    entry = cache.get(key)
+    if entry is not None and _fresh(entry):
+        return entry[0]
+
+    lock_key = f"{key}:lock"
+    locked = cache.add(lock_key, 1, lock_timeout)
+    if not locked:
+        if entry is not None:
+            return entry[0]
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry[0]
+    try:
+        start = time.monotonic()
+        value = compute()
+        cache.set(key, (value, _expires(timeout), time.monotonic() - start), timeout)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return value
+
+
+async def aget_or_set(key, compute, timeout, cache=None, wait=LOCK_WAIT, lock_timeout=LOCK_TIMEOUT):
+    """``get_or_set`` for async views; ``compute`` is a coroutine function."""
+    cache = cache or caches["default"]
+    entry = await cache.aget(key)
+    if entry is not None and _fresh(entry):
+        return entry[0]
+
+    lock_key = f"{key}:lock"
+    locked = await cache.aadd(lock_key, 1, lock_timeout)
+    if not locked:
+        if entry is not None:
+            return entry[0]
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            await asyncio.sleep(POLL_INTERVAL)
+            entry = await cache.aget(key)
+            if entry is not None:
+                return entry[0]
+    try:
+        start = time.monotonic()
+        value = await compute()
+        await cache.aset(key, (value, _expires(timeout), time.monotonic() - start), timeout)
+    finally:
+        if locked:
+            await cache.adelete(lock_key)
+    return value
+
+
+class Namespace:
+    """Keys ``<name>:<generation>:<parts...>`` that ``invalidate()`` retires together."""
+
+    def __init__(self, name, alias="default"):
+        self.name = name
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def _generation_key(self):
+        return f"{self.name}:generation"
+
+    def version(self):
+        token = self.cache.get(self._generation_key)
+        if token is None:
+            self.cache.add(self._generation_key, uuid.uuid4().hex, None)
+            token = self.cache.get(self._generation_key)
+        return token
+
+    async def aversion(self):
+        token = await self.cache.aget(self._generation_key)
+        if token is None:
+            await self.cache.aadd(self._generation_key, uuid.uuid4().hex, None)
+            token = await self.cache.aget(self._generation_key)
+        return token
+
+    def key(self, *parts):
+        return ":".join([self.name, self.version(), *map(str, parts)])
+
+    async def akey(self, *parts):
+        return ":".join([self.name, await self.aversion(), *map(str, parts)])
+
+    def invalidate(self):
+        """Start a new generation once the current transaction commits."""
+        transaction.on_commit(lambda: self.cache.set(self._generation_key, uuid.uuid4().hex, None))
+
+    def get_or_set(self, parts, compute, timeout, **options):
+        return get_or_set(self.key(*parts), compute, timeout, cache=self.cache, **options)
+
+    async def aget_or_set(self, parts, compute, timeout, **options):
+        return await aget_or_set(await self.akey(*parts), compute, timeout, cache=self.cache, **options)
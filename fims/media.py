@@ -0,0 +1,139 @@
+"""
+Media (photo) serving.
+
+``serve_media`` serves the family photos and their renditions under
+``MEDIA_URL``; other files under ``MEDIA_ROOT`` (exports, imports) are only
+reachable through their own login-protected views.
+
+Photos are stored by content hash (``family.storage``), so their URL changes
+whenever their bytes do; ``family.images.media_url`` adds a ``?v=`` token to
+the other URLs (see ``family.images.version``). A request whose URL is content
+addressed, or carries the current token, is answered with
+``Cache-Control: immutable`` and a one-year max-age, so browsers stop asking
+for it. Everything else is cached for ``MEDIA_MAX_AGE`` seconds and
+revalidated with its ``ETag``/``Last-Modified``.
+
+Single byte ranges are served as 206 responses. With ``MEDIA_SENDFILE``
+set to ``"x-sendfile"`` (Apache mod_xsendfile, lighttpd) or
+``"x-accel-redirect"`` (nginx, with an ``internal`` location
+``MEDIA_ACCEL_PREFIX`` aliased to ``MEDIA_ROOT``) Django only checks the
+request and sets the headers; the web server sends the file and handles
+ranges itself.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from family.images import version
+from family.storage import is_hashed
+
+PUBLIC_DIRS = ("pictures/", "renditions/")
+IMMUTABLE = "public, max-age=31536000, immutable"
+MAX_AGE = 3600
+BLOCK_SIZE = 64 * 1024
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _etag(name, stat):
+    if is_hashed(name):
+        return '"%s"' % posixpath.basename(name).split(".")[0]
+    return '"%x-%x"' % (stat.st_mtime_ns, stat.st_size)
+
+
+def _byte_range(header, size):
+    """``(start, end)`` of a single ``Range`` header, ``None`` to send everything, or ``False`` if unsatisfiable."""
+    match = RANGE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        # malformed or multiple ranges: a full response is always allowed
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def _chunks(file, length):
+    with file:
+        while length > 0:
+            data = file.read(min(BLOCK_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+
+def _sendfile(name, path):
+    mode = getattr(settings, "MEDIA_SENDFILE", None)
+    response = HttpResponse()
+    if mode == "x-sendfile":
+        response["X-Sendfile"] = path
+    else:
+        response["X-Accel-Redirect"] = getattr(settings, "MEDIA_ACCEL_PREFIX", "/protected-media/") + name
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    name = posixpath.normpath(path).lstrip("/")
+    if not name.startswith(PUBLIC_DIRS):
+        raise Http404
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, name)
+        stat = os.stat(full_path)
+    except (OSError, ValueError):
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    token = version(name, stat)
+    headers = {
+        "ETag": _etag(name, stat),
+        "Last-Modified": http_date(stat.st_mtime),
+        "Cache-Control": (
+            IMMUTABLE if token == "" or request.GET.get("v") == token
+            else f"public, max-age={getattr(settings, 'MEDIA_MAX_AGE', MAX_AGE)}"
+        ),
+    }
+    not_modified = get_conditional_response(request, etag=headers["ETag"], last_modified=int(stat.st_mtime))
+    if not_modified is not None:
+        for header, value in headers.items():
+            not_modified[header] = value
+        return not_modified
+
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if getattr(settings, "MEDIA_SENDFILE", None):
+        response = _sendfile(name, full_path)
+        response["Content-Type"] = content_type
+    else:
+        byte_range = None
+        if "HTTP_RANGE" in request.META and request.META.get("HTTP_IF_RANGE", headers["ETag"]) == headers["ETag"]:
+            byte_range = _byte_range(request.META["HTTP_RANGE"], stat.st_size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{stat.st_size}"
+        elif byte_range:
+            start, end = byte_range
+            file = open(full_path, "rb")
+            file.seek(start)
+            response = StreamingHttpResponse(_chunks(file, end - start + 1), status=206, content_type=content_type)
+            response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+            response["Content-Length"] = end - start + 1
+        else:
+            response = FileResponse(open(full_path, "rb"), content_type=content_type)
+    response["Accept-Ranges"] = "bytes"
+    for header, value in headers.items():
+        response[header] = value
+    return response
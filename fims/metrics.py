@@ -0,0 +1,157 @@
+"""
+Per-request SQL and latency metrics.
+
+``RequestMetricsMiddleware`` (fims.middleware) installs a ``QueryRecorder``
+with ``connection.execute_wrapper`` for the duration of each request and
+hands the totals to ``REGISTRY``, which keeps Prometheus-style counters and
+histograms per view. ``metrics_view`` serves them in the text exposition
+format at ``/metrics``.
+
+The registry lives in the worker process, so each process of a multi-worker
+deployment reports its own numbers; scrape them per process (or sum them
+with the usual ``sum by (view)`` queries).
+"""
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class QueryRecorder:
+    """``execute_wrapper`` counting queries, their time and repeated statements."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        """Queries that repeat a statement already run in this request."""
+        return self.count - len(self.statements)
+
+    def most_repeated(self):
+        """``(sql, times)`` of the statement run most often, or ``(None, 0)``."""
+        return self.statements.most_common(1)[0] if self.statements else (None, 0)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = Counter()        # (view, method, status)
+        self.slow = Counter()            # view
+        self.queries = Counter()         # view
+        self.query_seconds = Counter()   # view
+        self.duplicates = Counter()      # view
+        self.durations = {}              # view -> Histogram
+        self.query_counts = {}           # view -> Histogram
+
+    def record(self, view, method, status, seconds, recorder, slow):
+        with self._lock:
+            self.requests[view, method, status] += 1
+            self.queries[view] += recorder.count
+            self.query_seconds[view] += recorder.seconds
+            self.duplicates[view] += recorder.duplicates
+            if slow:
+                self.slow[view] += 1
+            self.durations.setdefault(view, Histogram(DURATION_BUCKETS)).observe(seconds)
+            self.query_counts.setdefault(view, Histogram(QUERY_BUCKETS)).observe(recorder.count)
+
+    def render(self):
+        with self._lock:
+            lines = []
+            _counter(lines, "fims_requests_total", "Requests handled.",
+                     {(("view", v), ("method", m), ("status", s)): n for (v, m, s), n in self.requests.items()})
+            _counter(lines, "fims_slow_requests_total", "Requests over the slow thresholds.", _by_view(self.slow))
+            _counter(lines, "fims_sql_queries_total", "SQL queries run.", _by_view(self.queries))
+            _counter(lines, "fims_sql_duplicate_queries_total", "SQL queries repeating a statement of the same request.",
+                     _by_view(self.duplicates))
+            _counter(lines, "fims_sql_seconds_total", "Time spent in SQL.", _by_view(self.query_seconds))
+            _histogram(lines, "fims_request_duration_seconds", "Response time.", self.durations)
+            _histogram(lines, "fims_request_sql_queries", "SQL queries per request.", self.query_counts)
+        return "\n".join(lines) + "\n"
+
+
+def _by_view(counter):
+    return {(("view", view),): value for view, value in counter.items()}
+
+
+def _labels(pairs):
+    return ",".join('%s="%s"' % (name, str(value).replace("\\", "\\\\").replace('"', '\\"')) for name, value in pairs)
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _counter(lines, name, help_text, values):
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+    for labels, value in sorted(values.items()):
+        lines.append(f"{name}{{{_labels(labels)}}} {_number(value)}")
+
+
+def _histogram(lines, name, help_text, histograms):
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for view, histogram in sorted(histograms.items()):
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            lines.append(f'{name}_bucket{{{_labels([("view", view), ("le", bound)])}}} {count}')
+        lines.append(f'{name}_bucket{{{_labels([("view", view), ("le", "+Inf")])}}} {histogram.total}')
+        lines.append(f'{name}_sum{{{_labels([("view", view)])}}} {_number(histogram.sum)}')
+        lines.append(f'{name}_count{{{_labels([("view", view)])}}} {histogram.total}')
+
+
+REGISTRY = Registry()
+
+
+def _has_token(request):
+    token = getattr(settings, "METRICS_TOKEN", None)
+    scheme, _, credentials = request.headers.get("Authorization", "").partition(" ")
+    return bool(token) and scheme.lower() == "bearer" and constant_time_compare(credentials, token)
+
+
+def metrics_view(request):
+    """
+    Prometheus text endpoint, for staff users and scrapers sending
+    ``Authorization: Bearer <METRICS_TOKEN>``.
+
+    ``METRICS_ALLOWED_IPS`` is empty by default: behind a reverse proxy on the
+    same host every request arrives from 127.0.0.1, so listing an address only
+    makes sense when it is the scraper's own.
+    """
+    allowed = request.META.get("REMOTE_ADDR") in getattr(settings, "METRICS_ALLOWED_IPS", [])
+    if not (allowed or _has_token(request) or request.user.is_staff):
+        return HttpResponseForbidden()
+    return HttpResponse(REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
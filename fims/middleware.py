@@ -0,0 +1,60 @@
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from .metrics import REGISTRY, QueryRecorder
+
+logger = logging.getLogger("fims.requests")
+
+
+class RequestMetricsMiddleware:
+    """
+    Record each request's SQL count, SQL time, repeated statements, view and
+    response time in ``fims.metrics.REGISTRY`` and log them as one JSON line:
+    at INFO normally, at WARNING once a request passes
+    ``METRICS_SLOW_REQUEST_MS`` or ``METRICS_SLOW_QUERY_COUNT``, with the most
+    repeated statement when it ran ``METRICS_REPEATED_QUERY_THRESHOLD`` times
+    or more (the usual sign of an N+1 loop).
+
+    Streaming responses are timed until the response object is returned,
+    not until the last chunk is sent.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, "METRICS_SLOW_REQUEST_MS", 500)
+        self.slow_queries = getattr(settings, "METRICS_SLOW_QUERY_COUNT", 50)
+        self.repeated_threshold = getattr(settings, "METRICS_REPEATED_QUERY_THRESHOLD", 5)
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        seconds = time.perf_counter() - start
+
+        match = request.resolver_match
+        view = (match.view_name or match._func_path) if match else "<unresolved>"
+        slow = seconds * 1000 >= self.slow_ms or recorder.count >= self.slow_queries
+        REGISTRY.record(view, request.method, response.status_code, seconds, recorder, slow)
+
+        level = logging.WARNING if slow else logging.INFO
+        if logger.isEnabledFor(level):
+            entry = {
+                "view": view,
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "ms": round(seconds * 1000, 1),
+                "sql_count": recorder.count,
+                "sql_ms": round(recorder.seconds * 1000, 1),
+                "sql_duplicates": recorder.duplicates,
+            }
+            sql, times = recorder.most_repeated()
+            if times >= self.repeated_threshold:
+                entry["repeated_sql"] = {"sql": sql[:300], "times": times}
+            logger.log(level, json.dumps(entry))
+        return response
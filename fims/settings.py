@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -42,9 +43,13 @@ INSTALLED_APPS = [
     'family',
     'dashboard',
     'location',
+    'exports',
+    'api',
+    'rest_framework',
 ]
 
 MIDDLEWARE = [
+    'fims.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -127,8 +132,91 @@ STATICFILES_DIRS = [
 ]
 
 
+# collectstatic target; in production the web server serves it under STATIC_URL
+# with a far-future Cache-Control (the names carry a content hash)
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage" if DEBUG
+        else "fims.storage.CompressedManifestStaticFilesStorage",
+    },
+}
+
 MEDIA_URL = "/media/"
-MEDIA_ROOT = os.path.join(BASE_DIR, 'static')
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Photos under MEDIA_URL are served by fims.media.serve_media. Set to
+# "x-sendfile" (Apache/lighttpd) or "x-accel-redirect" (nginx: an internal
+# location MEDIA_ACCEL_PREFIX aliased to MEDIA_ROOT) to let the web server
+# send the file; MEDIA_MAX_AGE is the browser cache lifetime of URLs without
+# a content version (seconds)
+MEDIA_SENDFILE = None
+MEDIA_ACCEL_PREFIX = "/protected-media/"
+MEDIA_MAX_AGE = 3600
+
+# Background exports (0 workers runs jobs inline in the request); finished
+# jobs and their files are deleted by manage.py cleanup_exports once older
+# than EXPORT_JOB_RETENTION (seconds)
+EXPORT_JOB_WORKERS = 2
+EXPORT_JOB_TIMEOUT = 1800
+EXPORT_JOB_RETENTION = 24 * 3600
+
+# PDF reports are spooled in memory up to this size, then on disk (bytes)
+PDF_SPOOL_BYTES = 8 * 1024 * 1024
+
+# Soft-deleted rows older than this are moved to the *_archive tables
+# by manage.py archive_deleted
+SOFT_DELETE_ARCHIVE_DAYS = 90
+
+# Photos are stored by content hash (family.storage); one whose last reference
+# was released at least this long ago may be deleted by archive_deleted (seconds)
+PHOTO_RECLAIM_GRACE_SECONDS = 3600
+
+# Rendered family detail blocks and list rows stay cached this long at most;
+# edits replace them straight away (seconds)
+FAMILY_FRAGMENT_TIMEOUT = 24 * 3600
+
+# State/city catalogue: server-side cache lifetime and browser max-age (seconds)
+LOCATION_CATALOGUE_TIMEOUT = 3600
+LOCATION_CATALOGUE_MAX_AGE = 300
+
+# /changes/ stops at a gap in the change-log sequence while a transaction may
+# still commit into it; off MySQL (where in-flight rows can be detected) a gap
+# is waited out for this long after the entry following it (seconds)
+CHANGE_FEED_GAP_TIMEOUT = 3600
+
+# Email outbox drained by manage.py send_outbox (delays in seconds; the retry
+# delay doubles per failed attempt up to the maximum)
+EMAIL_OUTBOX_BATCH_SIZE = 50
+EMAIL_OUTBOX_MAX_ATTEMPTS = 6
+EMAIL_OUTBOX_RETRY_DELAY = 60
+EMAIL_OUTBOX_MAX_DELAY = 3600
+
+# Request instrumentation (fims.middleware.RequestMetricsMiddleware): requests
+# over either threshold are logged as warnings, with the most repeated SQL
+# statement if it ran at least METRICS_REPEATED_QUERY_THRESHOLD times.
+# /metrics answers staff users and requests with "Authorization: Bearer
+# <METRICS_TOKEN>"; METRICS_ALLOWED_IPS may list scraper addresses, but never
+# a reverse proxy's (behind one every request comes from its address).
+METRICS_SLOW_REQUEST_MS = 500
+METRICS_SLOW_QUERY_COUNT = 50
+METRICS_REPEATED_QUERY_THRESHOLD = 5
+METRICS_TOKEN = os.environ.get('FIMS_METRICS_TOKEN')
+METRICS_ALLOWED_IPS = []
+
+# REST API (/api/v1/): read-only, for logged-in users or HTTP Basic integrations
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': [
+        'rest_framework.permissions.IsAuthenticated',
+    ],
+    'ALLOWED_VERSIONS': ['v1'],
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -146,8 +234,68 @@ DATABASES = {
     }
 }
 
+# Cache (see fims.cache): "locmem" is per process and is what the test runner
+# uses; "file" is shared by the processes of one host; "redis" by every host
+# (needs the redis package and a server at FIMS_REDIS_URL). Choose with the
+# FIMS_CACHE environment variable. Only redis makes cache.add atomic across
+# processes, which the accounts.throttle bucket lock relies on.
+TESTING = sys.argv[1:2] == ['test']
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'fims',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('FIMS_CACHE_DIR', os.path.join(BASE_DIR, 'cache')),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('FIMS_REDIS_URL', 'redis://127.0.0.1:6379/1'),
+    },
+}
+CACHES = {
+    'default': {
+        **CACHE_BACKENDS[os.environ.get('FIMS_CACHE', 'locmem' if TESTING else 'file')],
+        'KEY_PREFIX': 'fims',
+        'TIMEOUT': 300,
+    },
+}
+
+# Sessions are read from the cache and written through to the database
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
 AUTH_USER_MODEL = 'accounts.CustomUser'
 
+AUTHENTICATION_BACKENDS = ['accounts.backends.EmailBackend']
+
+# New passwords are hashed with FIMS_PASSWORD_HASHER; a stored hash made with
+# any other hasher below (or with fewer iterations) is still accepted and is
+# rehashed at the next login. "argon2" and "bcrypt" need argon2-cffi / bcrypt.
+# Tests use MD5, which is fast and not meant for real passwords.
+PASSWORD_HASHER_CHOICES = {
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'bcrypt': 'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'pbkdf2_sha1': 'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+}
+PASSWORD_HASHERS = list(dict.fromkeys([
+    *(['django.contrib.auth.hashers.MD5PasswordHasher'] if TESTING else []),
+    PASSWORD_HASHER_CHOICES[os.environ.get('FIMS_PASSWORD_HASHER', 'pbkdf2')],
+    *PASSWORD_HASHER_CHOICES.values(),
+]))
+
+# Login and password reset attempts per client address and per email:
+# {scope: (attempts, refilled over seconds)}, see accounts.throttle
+THROTTLE_RATES = {
+    'login_ip': (20, 60),
+    'login_email': (5, 300),
+    'reset_ip': (5, 3600),
+    'reset_email': (3, 3600),
+}
+
 LOGIN_URL = 'login_page'
 
 # Email 
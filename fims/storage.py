@@ -0,0 +1,36 @@
+"""
+Static files storage.
+
+``collectstatic`` writes every asset under its content-hashed name (see
+``ManifestStaticFilesStorage``) and, for text assets, a gzip copy next to it
+when that is smaller, so the web server can send ``/static/`` with a
+far-future ``Cache-Control`` and precompressed bodies (nginx
+``gzip_static on``) without Django in the path.
+"""
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+COMPRESSIBLE = {".css", ".js", ".svg", ".txt", ".json", ".html", ".xml", ".map"}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if not dry_run and hashed_name and not isinstance(processed, Exception):
+                self._compress(hashed_name)
+            yield name, hashed_name, processed
+
+    def _compress(self, name):
+        if os.path.splitext(name)[1].lower() not in COMPRESSIBLE:
+            return
+        with self.open(name) as source:
+            data = source.read()
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        if len(compressed) < len(data):
+            target = name + ".gz"
+            if self.exists(target):
+                self.delete(target)
+            self._save(target, ContentFile(compressed))
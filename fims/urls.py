@@ -17,16 +17,19 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
+
+from .media import serve_media
+from .metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
+    path(settings.MEDIA_URL.strip('/') + '/<path:path>', serve_media, name='media'),
     path('', include('accounts.urls')),
     path('', include('family.urls')),
     path('', include('dashboard.urls')),
     path('', include('location.urls')),
+    path('', include('exports.urls')),
+    path('', include('api.urls')),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-
@@ -0,0 +1,46 @@
+"""
+Workbook builders for the state and city exports.
+
+They write into any file object so the views and background export jobs
+share one implementation.
+"""
+from openpyxl import Workbook
+from openpyxl.styles import PatternFill, Font, Alignment
+
+
+def write_state_workbook(states, output):
+    workbook = Workbook()
+    worksheet = workbook.active
+    worksheet.title = 'State'
+
+    worksheet.merge_cells('A1:C1')
+    worksheet['A1'].value = "State List"
+    worksheet['A1'].fill = PatternFill("solid", fgColor="246BA1")
+    worksheet['A1'].font = Font(bold=True, color="FFFFFF")
+    worksheet['A1'].alignment = Alignment(horizontal="center")
+
+    worksheet.append(['ID', 'Name', 'Status'])
+
+    for count, state in enumerate(states, start=1):
+        worksheet.append([count, state.state_name, state.status])
+
+    workbook.save(output)
+
+
+def write_city_workbook(cities, output):
+    workbook = Workbook()
+    worksheet = workbook.active
+    worksheet.title = 'City'
+
+    worksheet.merge_cells('A1:D1')
+    worksheet['A1'].value = "City List"
+    worksheet['A1'].fill = PatternFill("solid", fgColor="246BA1")
+    worksheet['A1'].font = Font(bold=True, color="FFFFFF")
+    worksheet['A1'].alignment = Alignment(horizontal="center")
+
+    worksheet.append(['ID', 'Name', 'State', 'Status'])
+
+    for count, city in enumerate(cities.select_related('state'), start=1):
+        worksheet.append([count, city.city_name, city.state.state_name, city.status])
+
+    workbook.save(output)
@@ -1,3 +1,110 @@
+from datetime import date
+from unittest import mock
+
 from django.test import TestCase
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from family.models import FamilyHead, FamilyMember, Hobby, State, City, statusChoice
+
+AJAX = {"HTTP_X_REQUESTED_WITH": "XMLHttpRequest"}
+
+
+class CursorListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(email="admin@example.com", password="Secret@123")
+        cls.states = [State.objects.create(state_name=f"State {i:02}") for i in range(12)]
+        for state in cls.states:
+            City.objects.create(state=state, city_name=f"City of {state.state_name}")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_state_cursor_pages_over_ajax(self):
+        first = self.client.get(reverse("state_list") + "?cursor=", **AJAX).json()
+        self.assertTrue(first["has_next"])
+        self.assertIn("State 11", first["state_html"])
+        self.assertNotIn("State 01", first["state_html"])
+
+        second = self.client.get(reverse("state_list"), {"cursor": first["next_cursor"]}, **AJAX).json()
+        self.assertFalse(second["has_next"])
+        self.assertIn("State 01", second["state_html"])
+        self.assertNotIn("State 11", second["state_html"])
+
+        back = self.client.get(
+            reverse("state_list"), {"cursor": second["prev_cursor"], "direction": "prev"}, **AJAX,
+        ).json()
+        self.assertEqual(back["state_html"], first["state_html"])
+
+    def test_city_cursor_page_renders_links(self):
+        response = self.client.get(reverse("city_list"), {"cursor": "", "search": "City"})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "City of State 11")
+        self.assertContains(response, "State 11</td>")
+        self.assertContains(response, "&search=City")
+
+        ajax = self.client.get(reverse("city_list"), {"cursor": ""}, **AJAX).json()
+        self.assertIn("City of State 11", ajax["city_html"])
+        self.assertTrue(ajax["has_next"])
+
+    def test_city_page_loads_states_with_the_rows(self):
+        self.client.get(reverse("city_list"), {"cursor": ""}, **AJAX)
+        # the user, and the page with its states (the session is cached)
+        with self.assertNumQueries(2):
+            self.client.get(reverse("city_list"), {"cursor": ""}, **AJAX)
+
+
+class BulkDeleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(email="admin@example.com", password="Secret@123")
+        cls.states = [State.objects.create(state_name=name) for name in ("Gujarat", "Kerala")]
+        cls.cities = [City.objects.create(state=state, city_name=f"City of {state.state_name}") for state in cls.states]
+        cls.heads = []
+        for city in cls.cities:
+            head = FamilyHead.objects.create(
+                name="Aarav", surname="Shah", dob=date(1980, 1, 1), mobno="9876543210", address="Street",
+                state=city.state, city=city, pincode="395001", photo="pictures/head.jpg",
+            )
+            FamilyMember.objects.create(family_head=head, member_name="Diya", member_dob=date(2005, 1, 1))
+            Hobby.objects.create(family_head=head, hobby="Reading")
+            cls.heads.append(head)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_state_delete_cascades(self):
+        response = self.client.post(reverse("bulk_delete_states"), {"ids": [self.states[0].pk]})
+        self.assertEqual(response.json(), {
+            "success": True, "deleted": {"states": 1, "cities": 1, "heads": 1, "members": 1, "hobbies": 1},
+        })
+        self.assertEqual(
+            list(FamilyHead.all_objects.order_by("id").values_list("status", flat=True)),
+            [statusChoice.INACTIVE, statusChoice.ACTIVE],
+        )
+        self.assertFalse(City.objects.filter(pk=self.cities[0].pk).exists())
+        self.assertEqual(
+            list(FamilyMember.objects.order_by("id").values_list("status", flat=True)),
+            [statusChoice.INACTIVE, statusChoice.ACTIVE],
+        )
+
+    def test_city_delete_cascades(self):
+        response = self.client.post(reverse("bulk_delete_cities"), {"ids": [city.pk for city in self.cities]})
+        self.assertEqual(response.json(), {"success": True, "deleted": {"cities": 2, "heads": 2, "members": 2, "hobbies": 2}})
+        self.assertEqual(State.objects.count(), 2)
+        self.assertFalse(FamilyHead.objects.filter(status=statusChoice.ACTIVE).exists())
+        self.assertFalse(Hobby.objects.filter(status=statusChoice.ACTIVE).exists())
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.post(reverse("bulk_delete_states")).status_code, 400)
+        self.assertEqual(self.client.post(reverse("bulk_delete_cities"), {"ids": ["x"]}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("bulk_delete_states")).status_code, 405)
 
-# Create your tests here.
+    def test_errors_are_logged_not_returned(self):
+        with mock.patch("location.views.soft_delete_states", side_effect=RuntimeError("table is locked")), \
+                self.assertLogs("location.views", "ERROR") as logs:
+            response = self.client.post(reverse("bulk_delete_states"), {"ids": [self.states[0].pk]})
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json()["errorMessage"], "Could not delete the selected states.")
+        self.assertIn("table is locked", logs.output[0])
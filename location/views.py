@@ -1,20 +1,25 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.paginator import Paginator
 from django.http import HttpResponse, JsonResponse
 from django.template.loader import render_to_string
 from django.db.models import Q
-from openpyxl import Workbook
-from openpyxl.styles import PatternFill, Font, Alignment
+from django.views.decorators.http import require_POST
+from asgiref.sync import sync_to_async
 from family.models import State, City, statusChoice
+from family.cascade import soft_delete_states, soft_delete_cities
 from .forms import StateForm, CityForm
+from .exports import write_state_workbook, write_city_workbook
 from family.utils import decode_id
+from family.pagination import apage_context
+import logging
+
+logger = logging.getLogger(__name__)
 
 # ----------------------------- STATE VIEWS -----------------------------
 
 @login_required(login_url='login_page')
-def state_list(request):
+async def state_list(request):
     try:
         states = State.objects.exclude(status=statusChoice.DELETE).order_by('-created_at')
 
@@ -22,25 +27,17 @@ def state_list(request):
         if search:
             states = states.filter(Q(state_name__icontains=search))
 
-        paginator = Paginator(states, 10)
-        page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
-        total_pages = page_obj.paginator.num_pages
-
-        context = {
-            'page_obj': page_obj,
-            'lastPage': total_pages,
-            'totalPagelist': [n + 1 for n in range(total_pages)],
-        }
+        context = await apage_context(request, states, 10, count_key=f"state_list:{search or ''}")
 
         # Handle AJAX pagination/search
         if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-            state_html = render_to_string('state_list_template.html', context, request=request)
-            return JsonResponse({'state_html': state_html})
+            state_html = await sync_to_async(render_to_string)('state_list_template.html', context, request=request)
+            return JsonResponse({'state_html': state_html, **context.get('cursor', {})})
 
-        return render(request, 'state_list.html', context)
+        return await sync_to_async(render)(request, 'state_list.html', context)
 
     except Exception as e:
+        logger.exception("Error in state_list: %s", e)
         messages.error(request, f"An error occurred while loading states: {str(e)}")
         return redirect('dashboard')
 
@@ -91,7 +88,6 @@ def delete_state(request, hashid):
     try:
         pk = decode_id(hashid)
         state = get_object_or_404(State, id=pk)
-        City.objects.filter(state=state).update(status=statusChoice.DELETE)
         state.soft_delete()
         messages.success(request, 'State and related cities deleted successfully!')
     except ValueError:
@@ -101,6 +97,21 @@ def delete_state(request, hashid):
     return redirect('state_list')
 
 
+@login_required(login_url='login_page')
+@require_POST
+def bulk_delete_states(request):
+    try:
+        ids = [decode_id(hashid) for hashid in request.POST.getlist('ids')]
+        if not ids:
+            return JsonResponse({"success": False, "errorMessage": "No states selected."}, status=400)
+        return JsonResponse({"success": True, "deleted": soft_delete_states(ids)})
+    except ValueError:
+        return JsonResponse({"success": False, "errorMessage": "Invalid state ID."}, status=400)
+    except Exception:
+        logger.exception("Error in bulk_delete_states")
+        return JsonResponse({"success": False, "errorMessage": "Could not delete the selected states."}, status=500)
+
+
 @login_required(login_url='login_page')
 def state_excel(request):
     try:
@@ -114,22 +125,7 @@ def state_excel(request):
         )
         response['Content-Disposition'] = 'attachment; filename="state.xlsx"'
 
-        workbook = Workbook()
-        worksheet = workbook.active
-        worksheet.title = 'State'
-
-        worksheet.merge_cells('A1:C1')
-        worksheet['A1'].value = "State List"
-        worksheet['A1'].fill = PatternFill("solid", fgColor="246BA1")
-        worksheet['A1'].font = Font(bold=True, color="FFFFFF")
-        worksheet['A1'].alignment = Alignment(horizontal="center")
-
-        worksheet.append(['ID', 'Name', 'Status'])
-
-        for count, state in enumerate(states, start=1):
-            worksheet.append([count, state.state_name, state.status])
-
-        workbook.save(response)
+        write_state_workbook(states, response)
         return response
 
     except Exception as e:
@@ -140,33 +136,25 @@ def state_excel(request):
 # ----------------------------- CITY VIEWS -----------------------------
 
 @login_required(login_url='login_page')
-def city_list(request):
+async def city_list(request):
     try:
-        cities = City.objects.exclude(status=statusChoice.DELETE).order_by('-created_at')
+        cities = City.objects.exclude(status=statusChoice.DELETE).select_related('state').order_by('-created_at')
         search = request.GET.get('search')
         if search:
             cities = cities.filter(
                 Q(city_name__icontains=search) | Q(state__state_name__icontains=search)
             )
 
-        paginator = Paginator(cities, 10)
-        page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
-        total_pages = page_obj.paginator.num_pages
-
-        context = {
-            'page_obj': page_obj,
-            'lastPage': total_pages,
-            'totalPagelist': [n + 1 for n in range(total_pages)],
-        }
+        context = await apage_context(request, cities, 10, count_key=f"city_list:{search or ''}")
 
         if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-            city_html = render_to_string('city_list_template.html', context, request=request)
-            return JsonResponse({'city_html': city_html})
+            city_html = await sync_to_async(render_to_string)('city_list_template.html', context, request=request)
+            return JsonResponse({'city_html': city_html, **context.get('cursor', {})})
 
-        return render(request, 'city_list.html', context)
+        return await sync_to_async(render)(request, 'city_list.html', context)
 
     except Exception as e:
+        logger.exception("Error in city_list: %s", e)
         messages.error(request, f"An error occurred while loading cities: {str(e)}")
         return redirect('dashboard')
 
@@ -226,6 +214,21 @@ def delete_city(request, hashid):
     return redirect('city_list')
 
 
+@login_required(login_url='login_page')
+@require_POST
+def bulk_delete_cities(request):
+    try:
+        ids = [decode_id(hashid) for hashid in request.POST.getlist('ids')]
+        if not ids:
+            return JsonResponse({"success": False, "errorMessage": "No cities selected."}, status=400)
+        return JsonResponse({"success": True, "deleted": soft_delete_cities(ids)})
+    except ValueError:
+        return JsonResponse({"success": False, "errorMessage": "Invalid city ID."}, status=400)
+    except Exception:
+        logger.exception("Error in bulk_delete_cities")
+        return JsonResponse({"success": False, "errorMessage": "Could not delete the selected cities."}, status=500)
+
+
 @login_required(login_url='login_page')
 def city_excel(request):
     try:
@@ -241,22 +244,7 @@ def city_excel(request):
         )
         response['Content-Disposition'] = 'attachment; filename="city.xlsx"'
 
-        workbook = Workbook()
-        worksheet = workbook.active
-        worksheet.title = 'City'
-
-        worksheet.merge_cells('A1:D1')
-        worksheet['A1'].value = "City List"
-        worksheet['A1'].fill = PatternFill("solid", fgColor="246BA1")
-        worksheet['A1'].font = Font(bold=True, color="FFFFFF")
-        worksheet['A1'].alignment = Alignment(horizontal="center")
-
-        worksheet.append(['ID', 'Name', 'State', 'Status'])
-
-        for count, city in enumerate(cities, start=1):
-            worksheet.append([count, city.city_name, city.state.state_name, city.status])
-
-        workbook.save(response)
+        write_city_workbook(cities, response)
         return response
 
     except Exception as e:
@@ -1,9 +1,32 @@
-
 const state = document.getElementById("id_state")
+let locations = null
+
+function loadLocations() {
+    // one ETag'd document for every state; the browser revalidates it from its cache
+    if (!locations) {
+        locations = fetch("/locations/")
+            .then(res => {
+                if (!res.ok) throw new Error(`Loading locations failed: ${res.status}`);
+                return res.json();
+            })
+            .then(data => {
+                const cities = {};
+                data.states.forEach(s => { cities[s.id] = s.cities; });
+                return cities;
+            })
+            .catch(err => {
+                // forget the failure so the next change of state tries again
+                locations = null;
+                throw err;
+            })
+    }
+    return locations
+}
+
 state.addEventListener("change", function () {
     let state_id = this.value;
-    fetch("/get_cities/" + state_id)
-        .then(res => res.json())
+    loadLocations()
+        .then(cities => cities[state_id] || [])
         .then(data => {
             let cityDropdown = document.getElementById("id_city");
             cityDropdown.innerHTML = "";
@@ -14,4 +37,5 @@ state.addEventListener("change", function () {
                 cityDropdown.appendChild(option);
             });
         })
-})
\ No newline at end of file
+        .catch(err => console.log("Something went wrong.", err))
+})